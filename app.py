@@ -1,7 +1,6 @@
 
 import secrets
 from flask import Flask, render_template, request, jsonify
-import json
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -9,13 +8,30 @@ import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 from dotenv import load_dotenv
-from database import get_session, MotKabye
-from sqlalchemy import or_, func
+from database import (get_session, get_engine, init_app, capacites_schema, pragmas_effectifs,
+                      statistiques_pool, commence_par, projection, verifier_version, ConflitVersion, MotKabye)
+from migration import derniere_version
+from sqlalchemy.orm import undefer_group
+from sqlalchemy.orm.exc import StaleDataError
 from flask_cors import CORS
 
 from utils.helpers import json_to_list, list_to_json, allowed_file, upload_image_cloudinary, supprimer_image_cloudinary
+from utils.normalisation import normaliser, plier
+from utils.recherche import rechercher_ids, ordonner_selon, GROUPES_CHAMPS
+from utils.autocompletion import enregistrer_consultation
+from utils.instantane import instantane
+from utils.export import reponse_fragments, format_demande
+from utils.serialisation import KABYE, reponse_conflit
+from utils.cache_http import conditionnel
+from utils.compression import init_compression, metriques_compression
+from utils.lots import repondre_lot
+from utils.statistiques import lire_statistiques
+from utils.artefacts import lire_manifeste, revisions_courantes, planifier_reconstruction, init_telechargements
+from utils.pagination import paginer, paginer_trie, url_page, taille_page, CurseurInvalide, TAILLE_PAGE_LISTE
 
 from routes.francais import francais_bp
+from routes.recherche import recherche_bp
+from routes.synchronisation import synchronisation_bp
 
 from validation import validation_bp
 from validation_fr import validation_fr_bp
@@ -26,6 +42,15 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Session SQLAlchemy partagée, libérée à la fin de chaque requête
+init_app(app)
+
+# Compression gzip / brotli des réponses JSON et HTML
+init_compression(app)
+
+# Exports statiques ouverts par un lien de téléchargement (sans nginx)
+init_telechargements(app)
+
 # CONFIGURER LA CLÉ SECRÈTE POUR LES SESSIONS
 app.secret_key = secrets.token_hex(32)  # 32 octets = 64 caractères hexadécimaux
 
@@ -97,11 +122,24 @@ def initialiser_donnees():
         session.close()
 
 
+def verifier_schema():
+    """Lire la carte du schéma au démarrage et signaler les migrations en attente"""
+    try:
+        version = capacites_schema()['version']
+        if version < derniere_version():
+            print(f"⚠️ Schéma en version {version}/{derniere_version()} : lancer 'python migration.py'")
+    except Exception as e:
+        print(f"Erreur de lecture du schéma: {e}")
+
+
+verifier_schema()
 
 # Enregistrer le blueprint (ajoutez cette ligne avant les routes)
 app.register_blueprint(validation_bp, url_prefix='/validation')
 app.register_blueprint(validation_fr_bp, url_prefix='/validation-fr')
 app.register_blueprint(francais_bp, url_prefix='/francais')
+app.register_blueprint(recherche_bp)
+app.register_blueprint(synchronisation_bp)
 
 @app.route('/')
 def accueil():
@@ -112,7 +150,8 @@ def editer_mot(mot_id):
     """Page d'édition d'un mot"""
     session = get_session()
     try:
-        mot = session.query(MotKabye).filter(MotKabye.id == mot_id).first()
+        # Le formulaire affiche tous les champs : une seule requête
+        mot = session.query(MotKabye).options(undefer_group('details')).filter(MotKabye.id == mot_id).first()
         if not mot:
             return "Mot non trouvé", 404
         
@@ -140,7 +179,8 @@ def editer_mot(mot_id):
             'image_url': mot.image_url or '',
             'verifie_par': mot.verifie_par or '',
             'date_ajout': mot.date_ajout.strftime("%Y-%m-%d %H:%M:%S") if mot.date_ajout else '',
-            'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else ''
+            'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else '',
+            'version': mot.version
         }
         
         return render_template('formulaire.html', mot=mot_dict, edition=True)
@@ -175,10 +215,13 @@ def sauvegarder_mot():
             if not mot:
                 return jsonify({'success': False, 'error': 'Mot non trouvé'})
             
+            # Refuser d'écraser une modification faite depuis l'ouverture du formulaire
+            verifier_version(mot, data.get('version'))
+            
             # Vérifier si le nom a changé et s'il existe déjà
-            if mot.mot_kabye.lower() != data['mot_kabye'].lower():
+            if normaliser(mot.mot_kabye) != normaliser(data['mot_kabye']):
                 mot_existe = session.query(MotKabye).filter(
-                    func.lower(MotKabye.mot_kabye) == data['mot_kabye'].lower(),
+                    MotKabye.cle_recherche == normaliser(data['mot_kabye']),
                     MotKabye.id != mot_id
                 ).first()
                 if mot_existe:
@@ -207,7 +250,7 @@ def sauvegarder_mot():
             # MODE CRÉATION
             # Vérifier si le mot existe déjà
             mot_existe = session.query(MotKabye).filter(
-                func.lower(MotKabye.mot_kabye) == data['mot_kabye'].lower()
+                MotKabye.cle_recherche == normaliser(data['mot_kabye'])
             ).first()
             
             if mot_existe:
@@ -276,9 +319,12 @@ def sauvegarder_mot():
             'success': True, 
             'message': message,
             'image_url': image_url,
-            'mot_id': mot.id
+            'mot_id': mot.id,
+            'version': mot.version
         })
             
+    except (ConflitVersion, StaleDataError):
+        return reponse_conflit(session, MotKabye, mot_id)
     except Exception as e:
         session.rollback()
         return jsonify({'success': False, 'error': str(e)})
@@ -324,33 +370,35 @@ def liste_mots():
         terme_recherche = request.args.get('q', '').strip().lower()
         champ_recherche = request.args.get('champ', 'tous')
         initiale = request.args.get('initiale', '').upper()
+        tri = request.args.get('tri', 'recents')
+        curseur = request.args.get('curseur')
         
-        # Requête de base
-        query = session.query(MotKabye)
+        # Requête de base : seulement les colonnes affichées
+        query = session.query(*projection(MotKabye, MotKabye.COLONNES_LISTE))
         
         # Filtrer par initiale si spécifiée
         if initiale and len(initiale) == 1:
-            query = query.filter(MotKabye.mot_kabye.startswith(initiale))
+            query = query.filter(commence_par(MotKabye.cle_pliee, plier(initiale)))
         
         # Filtrer par terme de recherche si spécifié
         if terme_recherche:
-            if champ_recherche in ['tous', 'kabye']:
-                query = query.filter(
-                    or_(
-                        MotKabye.mot_kabye.ilike(f'%{terme_recherche}%'),
-                        MotKabye.variantes_orthographiques.ilike(f'%{terme_recherche}%')
-                    )
-                )
-            elif champ_recherche in ['tous', 'francais']:
-                query = query.filter(
-                    or_(
-                        MotKabye.traduction_francaise.ilike(f'%{terme_recherche}%'),
-                        MotKabye.sens_multiple.ilike(f'%{terme_recherche}%')
-                    )
-                )
+            # Index plein texte : résultats classés par pertinence et limités
+            ids_pertinence = rechercher_ids(session, MotKabye, terme_recherche,
+                                            GROUPES_CHAMPS[MotKabye.__tablename__].get(champ_recherche))
+            query = query.filter(MotKabye.id.in_(ids_pertinence))
         
-        # Trier par date de modification
-        mots = query.order_by(MotKabye.date_modification.desc()).all()
+        # Résultats d'une recherche classés par pertinence (déjà bornés), sinon
+        # pages par clé dans l'ordre des modifications ou l'ordre kabiyè
+        page = None
+        if terme_recherche and tri != 'alpha':
+            mots = ordonner_selon(query.all(), ids_pertinence)
+        else:
+            ordre = 'alpha' if tri == 'alpha' else 'recents'
+            try:
+                page = paginer(query, MotKabye, ordre, curseur, TAILLE_PAGE_LISTE)
+            except CurseurInvalide:
+                page = paginer(query, MotKabye, ordre, None, TAILLE_PAGE_LISTE)
+            mots = page.elements
         
         # Convertir pour l'affichage
         mots_affichage = []
@@ -371,146 +419,86 @@ def liste_mots():
                              mots=mots_affichage, 
                              terme_recherche=terme_recherche,
                              nombre_resultats=len(mots_affichage),
+                             total_mots=len(instantane(MotKabye)),
                              champ_recherche=champ_recherche,
-                             initiale_recherche=initiale)
+                             initiale_recherche=initiale,
+                             tri=tri,
+                             page_suivante=url_page(page.next_cursor) if page else None,
+                             page_precedente=url_page(page.prev_cursor) if page else None)
     finally:
         session.close()
 
 @app.route('/api/mots')
+@conditionnel(MotKabye)
 def api_mots():
-    """API pour récupérer les mots en JSON"""
-    session = get_session()
+    """API pour récupérer les mots en JSON (servie depuis l'instantané en mémoire).
+
+    Avec ?limite= ou ?curseur=, renvoie une page {mots, next_cursor, prev_cursor}
+    dans l'ordre ?ordre=recents (défaut) ou alpha ; sans, la liste complète,
+    envoyée en flux (?format=json ou ndjson, gzip si le client l'accepte).
+    """
+    mots = instantane(MotKabye)
+    limite = request.args.get('limite', type=int)
+    curseur = request.args.get('curseur')
+    if not limite and not curseur:
+        format = format_demande()
+        if format is None:
+            return jsonify({'error': 'Format inconnu (json ou ndjson)'}), 400
+        reponse = reponse_fragments(KABYE.fragments(mots.fiches), format)
+        if mots.revision is not None:
+            # Point de départ de la synchronisation incrémentale (/api/mots/changes)
+            reponse.headers['X-Revision-Dictionnaire'] = str(mots.revision)
+        return reponse
+
+    ordre = request.args.get('ordre', 'recents')
+    if ordre not in ('recents', 'alpha'):
+        return jsonify({'error': 'Ordre inconnu (recents ou alpha)'}), 400
+    cles, fiches = mots.ordre(ordre)
     try:
-        mots = session.query(MotKabye).all()
-        result = []
-        for mot in mots:
-            result.append({
-                'id': mot.id,
-                'mot_kabye': mot.mot_kabye,
-                'variantes_orthographiques': json_to_list(mot.variantes_orthographiques),
-                'api': mot.api,
-                'traduction_francaise': mot.traduction_francaise,
-                'sens_multiple': json_to_list(mot.sens_multiple),
-                'synonymes': json_to_list(mot.synonymes),
-                'categorie_grammaticale': mot.categorie_grammaticale,
-                'sous_categorie': mot.sous_categorie,
-                'origine_mot': mot.origine_mot,
-                'exemple_usage': mot.exemple_usage,
-                'traduction_exemple': mot.traduction_exemple,
-                'expressions_associees': json_to_list(mot.expressions_associees),
-                'notes_usage': mot.notes_usage,
-                'image_url': mot.image_url,
-                'statut_validation': mot.statut_validation,
-                'notes_validation': mot.notes_validation,
-                'verifie_par': mot.verifie_par,
-                'date_validation': mot.date_validation,
-                'date_ajout': mot.date_ajout.strftime("%Y-%m-%d %H:%M:%S") if mot.date_ajout else '',
-                'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else ''
-            })
-        return jsonify(result)
-    finally:
-        session.close()
+        page = paginer_trie(cles, fiches, ordre, curseur, taille_page(limite))
+    except CurseurInvalide as e:
+        return jsonify({'error': str(e)}), 400
+    return KABYE.reponse_liste(page.elements, **page.curseurs())
+
+
+@app.route('/api/exports')
+def api_exports():
+    """Manifeste des exports précalculés (fichiers statiques à empreinte, .gz et .br).
+
+    Les fichiers ne changent jamais de contenu : seul ce manifeste est à revalider.
+    """
+    manifeste = lire_manifeste()
+    if manifeste is None or manifeste.get('revisions') != revisions_courantes():
+        # Écriture d'un script ou premier démarrage : rattraper en arrière-plan
+        planifier_reconstruction(0 if manifeste is None else None)
+    if manifeste is None:
+        reponse = jsonify({'error': 'Exports en cours de construction, réessayer dans un instant'})
+        reponse.status_code = 503
+        reponse.headers['Retry-After'] = '5'
+        return reponse
+
+    reponse = jsonify(manifeste)
+    reponse.add_etag()
+    reponse.headers['Cache-Control'] = 'public, no-cache'
+    return reponse.make_conditional(request)
+
 
 @app.route('/api/mot/<int:mot_id>')
+@conditionnel(MotKabye)
 def api_mot_detail(mot_id):
     """API pour récupérer un mot spécifique en JSON"""
-    session = get_session()
-    try:
-        mot = session.query(MotKabye).filter(MotKabye.id == mot_id).first()
-        if mot:
-            result = {
-                'id': mot.id,
-                'mot_kabye': mot.mot_kabye,
-                'variantes_orthographiques': json_to_list(mot.variantes_orthographiques),
-                'api': mot.api,
-                'traduction_francaise': mot.traduction_francaise,
-                'sens_multiple': json_to_list(mot.sens_multiple),
-                'synonymes': json_to_list(mot.synonymes),
-                'categorie_grammaticale': mot.categorie_grammaticale,
-                'sous_categorie': mot.sous_categorie,
-                'origine_mot': mot.origine_mot,
-                'exemple_usage': mot.exemple_usage,
-                'traduction_exemple': mot.traduction_exemple,
-                'expressions_associees': json_to_list(mot.expressions_associees),
-                'notes_usage': mot.notes_usage,
-                'image_url': mot.image_url,
-                'verifie_par': mot.verifie_par,
-                'date_ajout': mot.date_ajout.strftime("%Y-%m-%d %H:%M:%S") if mot.date_ajout else '',
-                'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else ''
-            }
-            return jsonify(result)
-        else:
-            return jsonify({'error': 'Mot non trouvé'}), 404
-    finally:
-        session.close()
+    mot = instantane(MotKabye).mot(mot_id)
+    if mot:
+        enregistrer_consultation(MotKabye, mot.id)
+        return KABYE.reponse(mot, statut=False)
+    else:
+        return jsonify({'error': 'Mot non trouvé'}), 404
+
+@app.route('/api/mots/batch', methods=['POST'])
+def api_mots_batch():
+    """Plusieurs mots en une requête : {"ids": [...], "mots": [...]} (100 au plus)"""
+    return repondre_lot(MotKabye, lambda mot: KABYE.en_dict(mot, statut=False))
 
-def calculer_statistiques(mots):
-    """Calculer les statistiques par personne"""
-    stats_par_personne = {}
-    
-    for mot in mots:
-        verifie_par = mot.verifie_par or 'Non spécifié'
-        
-        if verifie_par not in stats_par_personne:
-            stats_par_personne[verifie_par] = {
-                'total_mots': 0,
-                'mots_par_mois': {},
-                'derniere_activite': '',
-                'categories': {},
-                'evolution_temporelle': []
-            }
-        
-        # Compter le mot
-        stats_par_personne[verifie_par]['total_mots'] += 1
-        
-        # Compter par catégorie
-        categorie = mot.categorie_grammaticale or 'Non spécifiée'
-        stats_par_personne[verifie_par]['categories'][categorie] = \
-            stats_par_personne[verifie_par]['categories'].get(categorie, 0) + 1
-        
-        # Traiter les dates
-        date_ajout = mot.date_ajout
-        if date_ajout:
-            mois_annee = date_ajout.strftime("%Y-%m")
-            
-            # Statistiques par mois
-            stats_par_personne[verifie_par]['mots_par_mois'][mois_annee] = \
-                stats_par_personne[verifie_par]['mots_par_mois'].get(mois_annee, 0) + 1
-            
-            # Dernière activité
-            if not stats_par_personne[verifie_par]['derniere_activite'] or \
-               date_ajout > datetime.strptime(stats_par_personne[verifie_par]['derniere_activite'], "%Y-%m-%d %H:%M:%S"):
-                stats_par_personne[verifie_par]['derniere_activite'] = date_ajout.strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Calculer l'évolution temporelle pour chaque personne
-    for personne, data in stats_par_personne.items():
-        evolution = []
-        cumul = 0
-        
-        # Trier les mois chronologiquement
-        mois_tries = sorted(data['mots_par_mois'].keys())
-        for mois in mois_tries:
-            cumul += data['mots_par_mois'][mois]
-            evolution.append({
-                'mois': mois,
-                'nouveaux_mots': data['mots_par_mois'][mois],
-                'total_cumule': cumul
-            })
-        
-        data['evolution_temporelle'] = evolution
-    
-    # Statistiques globales
-    stats_globales = {
-        'total_mots': len(mots),
-        'nombre_contributeurs': len(stats_par_personne),
-        'moyenne_mots_par_contributeur': len(mots) / len(stats_par_personne) if stats_par_personne else 0,
-        'contributeurs_actifs': len([p for p, d in stats_par_personne.items() if d['total_mots'] >= 5])
-    }
-    
-    return {
-        'par_personne': stats_par_personne,
-        'globales': stats_globales
-    }
 
 @app.route('/statistiques')
 def statistiques():
@@ -518,15 +506,10 @@ def statistiques():
     return render_template('statistiques.html')
 
 @app.route('/api/statistiques')
+@conditionnel(MotKabye)
 def api_statistiques():
-    """API pour récupérer les données statistiques"""
-    session = get_session()
-    try:
-        mots = session.query(MotKabye).all()
-        stats = calculer_statistiques(mots)
-        return jsonify(stats)
-    finally:
-        session.close()
+    """API pour récupérer les données statistiques (agrégats recalculés après modification)"""
+    return jsonify(lire_statistiques(MotKabye))
 
 
 
@@ -547,11 +530,23 @@ def sante():
             'status': 'OK',
             'message': 'Dictionnaire Kabiyè en ligne',
             'timestamp': datetime.now().isoformat(),
-            'total_mots': total_mots
+            'total_mots': total_mots,
+            'pool': statistiques_pool(),
+            'compression': metriques_compression()
         })
     finally:
         session.close()
 
+@app.route('/api/diagnostics')
+def api_diagnostics():
+    """Diagnostics de la base : dialecte, pragmas effectifs, pool et schéma"""
+    return jsonify({
+        'dialecte': get_engine().dialect.name,
+        'pragmas': pragmas_effectifs(),
+        'pool': statistiques_pool(),
+        'version_schema': capacites_schema()['version']
+    })
+
 if __name__ == '__main__':
     # Initialisation au premier démarrage
     initialiser_donnees()
@@ -0,0 +1,154 @@
+# benchmark_projection.py
+"""Mesurer le coût des objets complets face aux projections pour la liste et la file.
+
+Remplit une base SQLite temporaire de lignes synthétiques (textes longs
+compris), puis compare pour chaque vue la requête d'origine, qui charge toutes
+les colonnes en objets ORM, à la projection sur les seules colonnes affichées :
+latence médiane et pic de mémoire Python (tracemalloc).
+
+    python benchmark_projection.py [--lignes 100000] [--repetitions 5]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+TAILLE_LOT = 5000
+
+
+def _texte(hasard, mots):
+    return ' '.join(
+        ''.join(hasard.choices(string.ascii_lowercase + 'ɛɔɩʋŋɖ', k=hasard.randint(2, 9)))
+        for _ in range(mots)
+    )
+
+
+def remplir(lignes):
+    """Insérer des lignes synthétiques aux proportions du dictionnaire réel"""
+    from sqlalchemy import insert
+    from database import get_engine, MotKabye
+
+    hasard = random.Random(42)
+    debut = datetime(2024, 1, 1)
+    table = MotKabye.__table__
+    with get_engine().begin() as connection:
+        for depart in range(0, lignes, TAILLE_LOT):
+            lot = []
+            for i in range(depart, min(depart + TAILLE_LOT, lignes)):
+                mot = _texte(hasard, hasard.randint(1, 2))
+                lot.append({
+                    'mot_kabye': mot,
+                    'api': f'[{mot}]',
+                    'traduction_francaise': _texte(hasard, 3),
+                    'variantes_orthographiques': json.dumps([_texte(hasard, 1)]),
+                    'sens_multiple': json.dumps([_texte(hasard, 4) for _ in range(2)]),
+                    'synonymes': json.dumps([_texte(hasard, 1)]),
+                    'categorie_grammaticale': hasard.choice(['nom', 'verbe', 'adjectif']),
+                    'sous_categorie': 'n.E',
+                    'origine_mot': _texte(hasard, 30),
+                    'exemple_usage': _texte(hasard, 12),
+                    'traduction_exemple': _texte(hasard, 12),
+                    'expressions_associees': json.dumps([_texte(hasard, 8) for _ in range(4)]),
+                    'notes_usage': _texte(hasard, 60),
+                    'image_url': '',
+                    'verifie_par': hasard.choice(['Benjamin', 'Amé', None]),
+                    'date_ajout': debut + timedelta(minutes=i),
+                    'date_modification': debut + timedelta(minutes=i),
+                    'statut_validation': hasard.choice(['valide', 'en_attente', 'a_reviser']),
+                    'notes_validation': _texte(hasard, 10),
+                    'cle_tri': mot,
+                    'cle_pliee': mot,
+                    'cle_recherche': mot,
+                })
+            connection.execute(insert(table), lot)
+
+
+def mesurer(nom, fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    # Mémoire sur une exécution à part : tracemalloc fausserait les durées
+    tracemalloc.start()
+    resultat = fonction()
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del resultat
+    print(f"  {nom:<34} {statistics.median(durees) * 1000:9.1f} ms   {pic / 1e6:8.1f} Mo")
+
+
+def executer(args):
+    from sqlalchemy.orm import undefer
+    from database import get_session, projection, MotKabye
+    from utils.pagination import paginer
+
+    remplir(args.lignes)
+
+    def requete_objets():
+        # Requête d'origine : tous les textes longs chargés avec l'objet
+        return get_session().query(MotKabye).options(undefer('*'))
+
+    def requete_liste():
+        return get_session().query(*projection(MotKabye, MotKabye.COLONNES_LISTE))
+
+    def requete_file():
+        return get_session().query(*projection(MotKabye, MotKabye.COLONNES_FILE))
+
+    def fraiche(fonction):
+        # Session neuve à chaque mesure : pas d'objets déjà présents dans l'identity map
+        def enveloppe():
+            session = get_session()
+            try:
+                return fonction()
+            finally:
+                session.close()
+        return enveloppe
+
+    vues = [
+        ('Liste /mots (page de 100)',
+         lambda q: paginer(q, MotKabye, 'recents', None, 100).elements, requete_liste),
+        ('File de validation (page de 200)',
+         lambda q: paginer(q, MotKabye, 'alpha', None, 200).elements, requete_file),
+        ('File de validation (complète)',
+         lambda q: q.order_by(MotKabye.cle_tri, MotKabye.id).all(), requete_file),
+    ]
+    print(f"{args.lignes} lignes, médiane de {args.repetitions} mesures")
+    for nom, lire, projetee in vues:
+        print(nom)
+        mesurer('avant : objets complets', fraiche(lambda: lire(requete_objets())), args.repetitions)
+        mesurer('après : projection', fraiche(lambda: lire(projetee())), args.repetitions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lignes', type=int, default=100000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--mesurer', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mesurer:
+        executer(args)
+        return
+
+    with tempfile.TemporaryDirectory() as dossier:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(dossier, 'dictionnaire.db')}")
+        subprocess.run([sys.executable, os.path.join(BASE_DIR, 'migration.py')],
+                       env=env, check=True, stdout=subprocess.DEVNULL, cwd=BASE_DIR)
+        subprocess.run([sys.executable, __file__, '--mesurer', '--lignes', str(args.lignes),
+                        '--repetitions', str(args.repetitions)],
+                       env=env, check=True, cwd=BASE_DIR)
+
+
+if __name__ == '__main__':
+    main()
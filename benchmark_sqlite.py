@@ -0,0 +1,153 @@
+# benchmark_sqlite.py
+"""Mesurer le débit de lecture de la file de validation pendant des validations concurrentes.
+
+Compare le profil SQLite d'origine (journal rollback) au profil de performance
+(WAL, synchronous=NORMAL, busy_timeout, mmap, cache) sur une copie de la base.
+Les lectures portent sur /validation/api/mots-a-valider, paginé en SQL :
+/api/mots est servi par l'instantané en mémoire et ne lit plus la base.
+
+    python benchmark_sqlite.py [--duree 10] [--lecteurs 4] [--ecrivains 2]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Réglages d'origine de SQLite, posés explicitement pour le profil « defaut » :
+# journal_mode est persisté dans le fichier, une copie d'une base déjà passée
+# en WAL y resterait si l'on se contentait de ne rien régler
+REGLAGES_ORIGINE = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_CACHE_SIZE': '-2000',
+    'SQLITE_MMAP_SIZE': '0',
+    'SQLITE_TEMP_STORE': 'DEFAULT',
+    'SQLITE_BUSY_TIMEOUT': '5000',  # délai par défaut du module sqlite3 (timeout=5.0)
+}
+
+STATUTS_FILE = ('en_attente', 'tous', 'valide')
+
+
+def lecteur(depart, duree, resultats):
+    """Processus lecteur : parcourir la file de validation page par page (un worker gunicorn)"""
+    from app import app
+    from utils.collation import ALPHABET_KABYE
+    client = app.test_client()
+    ok = erreurs = 0
+    depart.wait()
+    fin = time.time() + duree
+    while time.time() < fin:
+        reponse = client.get('/validation/api/mots-a-valider', query_string={
+            'validateur': 'Test',
+            'statut': random.choice(STATUTS_FILE),
+            'lettre': random.choice(ALPHABET_KABYE),
+            'limite': 50,
+        })
+        if reponse.status_code == 200:
+            ok += 1
+        else:
+            erreurs += 1
+    resultats.put(('lecture', ok, erreurs))
+
+
+def ecrivain(depart, duree, ids, resultats):
+    """Processus écrivain : valider des mots au hasard"""
+    from app import app
+    client = app.test_client()
+    ok = erreurs = 0
+    depart.wait()
+    fin = time.time() + duree
+    while time.time() < fin:
+        reponse = client.post(f'/validation/api/valider/{random.choice(ids)}', json={
+            'validateur': 'Test',
+            'statut': random.choice(['valide', 'a_reviser']),
+            'notes': 'benchmark'
+        })
+        if reponse.status_code == 200 and reponse.get_json().get('success'):
+            ok += 1
+        else:
+            erreurs += 1
+    resultats.put(('ecriture', ok, erreurs))
+
+
+def executer_profil(args):
+    """Lancer lecteurs et écrivains en parallèle sur la base configurée"""
+    import sqlite3
+    from database import pragmas_effectifs
+    chemin = os.environ['DATABASE_URL'].replace('sqlite:///', '', 1)
+    with sqlite3.connect(chemin) as connexion:
+        ids = [row[0] for row in connexion.execute("SELECT id FROM mots_kabye LIMIT 500")]
+    print('  ' + ', '.join(f'{nom}={valeur}' for nom, valeur in pragmas_effectifs().items()))
+
+    resultats = multiprocessing.Queue()
+    # Démarrer la mesure une fois que tous les processus ont importé l'application
+    depart = multiprocessing.Barrier(args.lecteurs + args.ecrivains + 1)
+    processus = [multiprocessing.Process(target=lecteur, args=(depart, args.duree, resultats))
+                 for _ in range(args.lecteurs)]
+    processus += [multiprocessing.Process(target=ecrivain, args=(depart, args.duree, ids, resultats))
+                  for _ in range(args.ecrivains)]
+    for p in processus:
+        p.start()
+    depart.wait()
+
+    totaux = {'lecture': [0, 0], 'ecriture': [0, 0]}
+    for _ in processus:
+        genre, ok, erreurs = resultats.get()
+        totaux[genre][0] += ok
+        totaux[genre][1] += erreurs
+    for p in processus:
+        p.join()
+
+    print(f"  lectures de la file: {totaux['lecture'][0] / args.duree:8.1f} req/s "
+          f"({totaux['lecture'][1]} erreurs)")
+    print(f"  validations        : {totaux['ecriture'][0] / args.duree:8.1f} req/s "
+          f"({totaux['ecriture'][1]} erreurs)")
+
+
+def copier_base(source, destination):
+    """Copie cohérente de la base, pages encore dans le fichier -wal comprises"""
+    import sqlite3
+    with sqlite3.connect(source) as origine, sqlite3.connect(destination) as copie:
+        origine.backup(copie)
+    origine.close()
+    copie.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--duree', type=float, default=10)
+    parser.add_argument('--lecteurs', type=int, default=4)
+    parser.add_argument('--ecrivains', type=int, default=2)
+    parser.add_argument('--base', default=os.path.join(BASE_DIR, 'dictionnaire.db'))
+    parser.add_argument('--profil', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profil:
+        executer_profil(args)
+        return
+
+    for profil in ('defaut', 'performance'):
+        with tempfile.TemporaryDirectory() as dossier:
+            copie = os.path.join(dossier, 'dictionnaire.db')
+            copier_base(args.base, copie)
+            env = dict(os.environ, DATABASE_URL=f'sqlite:///{copie}')
+            env.pop('SQLITE_PROFIL', None)
+            if profil == 'defaut':
+                env.update(REGLAGES_ORIGINE)
+            subprocess.run([sys.executable, os.path.join(BASE_DIR, 'migration.py')],
+                           env=env, check=True, stdout=subprocess.DEVNULL, cwd=BASE_DIR)
+            print(f"Profil {profil} ({args.lecteurs} lecteurs, {args.ecrivains} écrivains, {args.duree:.0f} s)")
+            subprocess.run([sys.executable, __file__, '--profil', profil,
+                            '--duree', str(args.duree), '--lecteurs', str(args.lecteurs),
+                            '--ecrivains', str(args.ecrivains)],
+                           env=env, check=True, cwd=BASE_DIR)
+
+
+if __name__ == '__main__':
+    main()
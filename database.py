@@ -1,15 +1,28 @@
 import os
 import json
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Index
+import threading
+import time
+from itertools import chain
+from sqlalchemy import create_engine, event, inspect, text, and_, func, select, Column, Integer, String, Text, DateTime, Index, ForeignKey, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship, deferred, Session as OrmSession
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from flask import has_app_context
+from flask.globals import app_ctx
+
+from utils.normalisation import normaliser, plier, squelette
+from utils.collation import cle_tri
+from utils.pagination import sans_null
 
 load_dotenv()
 
 Base = declarative_base()
 
+# Chaîne comparée octet par octet (ordre des points de code) sur PostgreSQL aussi,
+# pour que les recherches par préfixe et les tris binaires utilisent l'index
+ChaineBinaire = String(255).with_variant(String(255, collation='C'), 'postgresql')
+
 class MotKabye(Base):
     __tablename__ = 'mots_kabye'
     
@@ -22,11 +35,12 @@ class MotKabye(Base):
     synonymes = Column(Text)
     categorie_grammaticale = Column(String(100))
     sous_categorie = Column(String(100))
-    origine_mot = Column(Text)
-    exemple_usage = Column(Text)
-    traduction_exemple = Column(Text)
-    expressions_associees = Column(Text)
-    notes_usage = Column(Text)
+    # Textes longs (groupe « details ») chargés seulement à la première lecture
+    origine_mot = deferred(Column(Text), group='details')
+    exemple_usage = deferred(Column(Text), group='details')
+    traduction_exemple = deferred(Column(Text), group='details')
+    expressions_associees = deferred(Column(Text), group='details')
+    notes_usage = deferred(Column(Text), group='details')
     image_url = Column(Text)
     verifie_par = Column(String(100))
     date_ajout = Column(DateTime, default=datetime.now)
@@ -34,15 +48,48 @@ class MotKabye(Base):
 
     # Champs de validation
     statut_validation = Column(String(50), default='en_attente')  # en_attente, valide, a_reviser, rejete
-    notes_validation = Column(Text)
+    notes_validation = deferred(Column(Text), group='details')
     date_validation = Column(DateTime)
     # valider_par = Column(String(100))
+
+    # Version de la ligne, incrémentée et vérifiée à chaque UPDATE (verrouillage optimiste)
+    version = Column(Integer, nullable=False, server_default='1')
+
+    # Clés de recherche calculées à l'écriture (voir utils/normalisation.py)
+    cle_recherche = Column(ChaineBinaire)  # NFC + casse repliée
+    cle_pliee = Column(ChaineBinaire)      # idem, sans tons ni accents
+    cle_tri = Column(ChaineBinaire)        # ordre alphabétique kabiyè (utils/collation.py)
+    cle_squelette = Column(ChaineBinaire)  # transcription ASCII approximative (recherche floue)
+    glose_squelette = deferred(Column(Text))  # idem pour la traduction
+    CHAMP_MOT = 'mot_kabye'
+    CHAMP_GLOSE = 'traduction_francaise'
+    LANGUE = 'kabye'
     
+    # Valeurs des champs listes, indexées dans mots_kabye_valeurs
+    valeurs = relationship('ValeurMotKabye', cascade='all, delete-orphan',
+                           order_by='ValeurMotKabye.position')
+    CHAMPS_LISTES = ('variantes_orthographiques', 'sens_multiple', 'synonymes', 'expressions_associees')
+
+    # Colonnes lues par la liste des mots et par la file de validation
+    COLONNES_LISTE = ('id', 'mot_kabye', 'api', 'traduction_francaise', 'exemple_usage', 'verifie_par',
+                      'categorie_grammaticale', 'date_modification', 'image_url', 'cle_tri')
+    COLONNES_FILE = ('id', 'mot_kabye', 'api', 'traduction_francaise', 'sens_multiple', 'exemple_usage',
+                     'traduction_exemple', 'categorie_grammaticale', 'verifie_par', 'date_modification',
+                     'statut_validation', 'notes_validation', 'date_validation', 'cle_tri')
+
     # Ajoutez un index pour les recherches de validation
     __table_args__ = (
         Index('idx_statut_validation', 'statut_validation'),
         Index('idx_verifie_par', 'verifie_par'),
+        Index('idx_kabye_cle_recherche', 'cle_recherche'),
+        Index('idx_kabye_cle_pliee', 'cle_pliee'),
+        Index('idx_kabye_cle_tri', 'cle_tri', 'id'),
+        Index('idx_kabye_date_modification', 'date_modification', 'id'),
+        # Ordres de pagination par clé, NULL compris (utils/pagination.py)
+        Index('idx_kabye_ordre_alpha', sans_null(cle_tri, ''), id),
+        Index('idx_kabye_ordre_recents', sans_null(date_modification, datetime.min), id),
     )
+    __mapper_args__ = {'version_id_col': version}
 
 def get_database_url():
     # En production sur Render, utiliser la variable d'environnement
@@ -52,17 +99,184 @@ def get_database_url():
     # En développement local avec SQLite
     return 'sqlite:///dictionnaire.db'
 
+# Profil de connexion SQLite appliqué à chaque nouvelle connexion.
+# SQLITE_PROFIL=defaut désactive le profil : aucun pragma n'est posé, mais un
+# fichier déjà passé en WAL y reste (journal_mode est persisté dans la base).
+PROFIL_SQLITE = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -64000)),  # négatif = en Kio
+    'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
+
+def profil_sqlite_actif():
+    return os.getenv('SQLITE_PROFIL', 'performance') != 'defaut'
+
+
+def _appliquer_profil_sqlite(engine):
+    """Appliquer les pragmas du profil à chaque connexion SQLite ouverte"""
+    @event.listens_for(engine, 'connect')
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for nom, valeur in PROFIL_SQLITE.items():
+                cursor.execute(f"PRAGMA {nom}={valeur}")
+        finally:
+            cursor.close()
+
+
+def pragmas_effectifs():
+    """Valeurs réellement appliquées sur une connexion du pool (SQLite uniquement)"""
+    engine = get_engine()
+    if engine.dialect.name != 'sqlite':
+        return {}
+    with engine.connect() as connection:
+        return {
+            nom: connection.exec_driver_sql(f"PRAGMA {nom}").scalar()
+            for nom in PROFIL_SQLITE
+        }
+
+
+# Moteur unique par processus (créé à la première utilisation)
+_engine = None
+_engine_lock = threading.Lock()
+
+# Compteurs du pool de connexions pour mesurer la réutilisation
+_stats_pool = {
+    'connexions_creees': 0,
+    'emprunts': 0,
+    'restitutions': 0,
+}
+
+
+def _enregistrer_evenements_pool(engine):
+    """Compter les connexions créées et empruntées au pool"""
+    @event.listens_for(engine, 'connect')
+    def _connexion_creee(dbapi_connection, connection_record):
+        _stats_pool['connexions_creees'] += 1
+
+    @event.listens_for(engine, 'checkout')
+    def _connexion_empruntee(dbapi_connection, connection_record, connection_proxy):
+        _stats_pool['emprunts'] += 1
+
+    @event.listens_for(engine, 'checkin')
+    def _connexion_restituee(dbapi_connection, connection_record):
+        _stats_pool['restitutions'] += 1
+
+
+def get_engine():
+    """Retourner le moteur du processus, en le créant une seule fois"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(
+                    get_database_url(),
+                    pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+                    max_overflow=int(os.getenv('DB_MAX_OVERFLOW', 10)),
+                    pool_pre_ping=True,
+                    pool_recycle=int(os.getenv('DB_POOL_RECYCLE', 1800)),
+                )
+                _enregistrer_evenements_pool(engine)
+                if engine.dialect.name == 'sqlite' and profil_sqlite_actif():
+                    _appliquer_profil_sqlite(engine)
+                Session.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
 def init_db():
-    engine = create_engine(get_database_url())
-    Base.metadata.create_all(engine)
-    return engine
+    """Conservé pour les scripts existants : retourne le moteur partagé"""
+    return get_engine()
+
+
+def _portee_session():
+    """Une session par contexte d'application Flask, sinon une par thread"""
+    if has_app_context():
+        return id(app_ctx._get_current_object())
+    return threading.get_ident()
+
+
+# Registre de sessions partagé par app.py et tous les blueprints
+Session = scoped_session(sessionmaker(), scopefunc=_portee_session)
+
 
 def get_session():
-    engine = init_db()
-    Session = sessionmaker(bind=engine)
+    """Retourner la session du contexte courant (liée au moteur partagé)"""
+    get_engine()
     return Session()
 
 
+def init_app(app):
+    """Libérer automatiquement la session à la fin de chaque contexte Flask"""
+    @app.teardown_appcontext
+    def fermer_session(exception=None):
+        Session.remove()
+
+
+def projection(modele, noms):
+    """Colonnes à passer à session.query() : des lignes légères au lieu d'objets complets.
+
+    Les colonnes absentes d'un ancien schéma sont omises.
+    """
+    table = modele.__tablename__
+    return [getattr(modele, nom) for nom in noms if a_colonnes(table, nom)]
+
+
+# Carte des capacités du schéma, lue une fois au démarrage (voir migration.py)
+_capacites = None
+
+
+def capacites_schema():
+    """Tables, colonnes et version du schéma, mises en cache pour le processus"""
+    global _capacites
+    if _capacites is None:
+        with get_engine().connect() as connection:
+            inspecteur = inspect(connection)
+            tables = {
+                nom: frozenset(col['name'] for col in inspecteur.get_columns(nom))
+                for nom in inspecteur.get_table_names()
+            }
+            version = 0
+            if 'schema_version' in tables:
+                version = connection.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+        _capacites = {'version': version, 'tables': tables}
+    return _capacites
+
+
+def a_colonnes(table, *noms):
+    """Vérifier dans la carte des capacités que la table possède ces colonnes"""
+    colonnes = capacites_schema()['tables'].get(table, frozenset())
+    return all(nom in colonnes for nom in noms)
+
+
+def a_table(table):
+    return table in capacites_schema()['tables']
+
+
+def statistiques_pool():
+    """Statistiques du pool de connexions (réutilisation des connexions)"""
+    engine = get_engine()
+    pool = engine.pool
+    emprunts = _stats_pool['emprunts']
+    creees = _stats_pool['connexions_creees']
+    stats = {
+        'classe_pool': type(pool).__name__,
+        'etat': pool.status(),
+        'connexions_creees': creees,
+        'emprunts': emprunts,
+        'restitutions': _stats_pool['restitutions'],
+        'taux_reutilisation': round(1 - creees / emprunts, 4) if emprunts else 0,
+    }
+    for nom in ('size', 'checkedin', 'checkedout', 'overflow'):
+        if hasattr(pool, nom):
+            stats[nom] = getattr(pool, nom)()
+    return stats
+
+
 
 class MotFrancais(Base):
     __tablename__ = 'mots_francais'
@@ -76,10 +290,11 @@ class MotFrancais(Base):
     antonymes = Column(Text)  # JSON list
     categorie_grammaticale = Column(String(100))
     sous_categorie = Column(String(100))
-    exemple_usage = Column(Text)
-    traduction_exemple = Column(Text)
-    expressions_associees = Column(Text)  # JSON list
-    notes_usage = Column(Text)
+    # Textes longs (groupe « details ») chargés seulement à la première lecture
+    exemple_usage = deferred(Column(Text), group='details')
+    traduction_exemple = deferred(Column(Text), group='details')
+    expressions_associees = deferred(Column(Text), group='details')  # JSON list
+    notes_usage = deferred(Column(Text), group='details')
     image_url = Column(Text)
     verifie_par = Column(String(100))
     date_ajout = Column(DateTime, default=datetime.now)
@@ -87,11 +302,436 @@ class MotFrancais(Base):
     
     # Champs de validation
     statut_validation = Column(String(50), default='en_attente')
-    notes_validation = Column(Text)
+    notes_validation = deferred(Column(Text), group='details')
     date_validation = Column(DateTime)
+    version = Column(Integer, nullable=False, server_default='1')
+
+    # Clés de recherche calculées à l'écriture
+    cle_recherche = Column(ChaineBinaire)
+    cle_pliee = Column(ChaineBinaire)
+    cle_tri = Column(ChaineBinaire)
+    cle_squelette = Column(ChaineBinaire)
+    glose_squelette = deferred(Column(Text))
+    CHAMP_MOT = 'mot_francais'
+    CHAMP_GLOSE = 'traduction_kabye'
+    LANGUE = 'francais'
     
+    # Valeurs des champs listes, indexées dans mots_francais_valeurs
+    valeurs = relationship('ValeurMotFrancais', cascade='all, delete-orphan',
+                           order_by='ValeurMotFrancais.position')
+    CHAMPS_LISTES = ('variantes_orthographiques', 'sens_multiple', 'synonymes', 'antonymes', 'expressions_associees')
+
+    COLONNES_LISTE = ('id', 'mot_francais', 'traduction_kabye', 'exemple_usage', 'verifie_par',
+                      'categorie_grammaticale', 'date_modification', 'image_url', 'cle_tri')
+    COLONNES_FILE = ('id', 'mot_francais', 'traduction_kabye', 'sens_multiple', 'exemple_usage',
+                     'traduction_exemple', 'categorie_grammaticale', 'verifie_par', 'date_modification',
+                     'statut_validation', 'notes_validation', 'date_validation', 'cle_tri')
+
     __table_args__ = (
         Index('idx_francais_statut_validation', 'statut_validation'),
         Index('idx_francais_verifie_par', 'verifie_par'),
         Index('idx_mot_francais', 'mot_francais'),
-    )
\ No newline at end of file
+        Index('idx_francais_cle_recherche', 'cle_recherche'),
+        Index('idx_francais_cle_pliee', 'cle_pliee'),
+        Index('idx_francais_cle_tri', 'cle_tri', 'id'),
+        Index('idx_francais_date_modification', 'date_modification', 'id'),
+        Index('idx_francais_ordre_alpha', sans_null(cle_tri, ''), id),
+        Index('idx_francais_ordre_recents', sans_null(date_modification, datetime.min), id),
+    )
+    __mapper_args__ = {'version_id_col': version}
+
+
+# ---------------------------------------------------------------------------
+# Champs listes normalisés (une ligne par valeur)
+#
+# Les colonnes JSON restent la source lue par les routes ; ces tables sont
+# tenues à jour à chaque flush et servent aux recherches exactes / par préfixe.
+# ---------------------------------------------------------------------------
+
+class ValeurMotKabye(Base):
+    __tablename__ = 'mots_kabye_valeurs'
+
+    id = Column(Integer, primary_key=True)
+    mot_id = Column(Integer, ForeignKey('mots_kabye.id', ondelete='CASCADE'), nullable=False)
+    type_valeur = Column(String(50), nullable=False)  # nom du champ liste d'origine
+    position = Column(Integer, nullable=False)
+    valeur = Column(Text, nullable=False)
+    valeur_normalisee = Column(ChaineBinaire, nullable=False)
+
+    __table_args__ = (
+        Index('idx_kabye_valeurs_recherche', 'type_valeur', 'valeur_normalisee'),
+        Index('idx_kabye_valeurs_mot', 'mot_id'),
+    )
+
+
+class ValeurMotFrancais(Base):
+    __tablename__ = 'mots_francais_valeurs'
+
+    id = Column(Integer, primary_key=True)
+    mot_id = Column(Integer, ForeignKey('mots_francais.id', ondelete='CASCADE'), nullable=False)
+    type_valeur = Column(String(50), nullable=False)
+    position = Column(Integer, nullable=False)
+    valeur = Column(Text, nullable=False)
+    valeur_normalisee = Column(ChaineBinaire, nullable=False)
+
+    __table_args__ = (
+        Index('idx_francais_valeurs_recherche', 'type_valeur', 'valeur_normalisee'),
+        Index('idx_francais_valeurs_mot', 'mot_id'),
+    )
+
+
+def elements_liste(donnees):
+    """Textes d'un champ liste stocké en JSON (expressions : le texte de l'expression)"""
+    if not donnees:
+        return []
+    try:
+        elements = json.loads(donnees) if isinstance(donnees, str) else donnees
+    except json.JSONDecodeError:
+        elements = [item for item in donnees.split(';')]
+    if not isinstance(elements, list):
+        elements = [elements]
+    textes = []
+    for element in elements:
+        if isinstance(element, dict):
+            element = element.get('expression', '')
+        element = str(element).strip() if element is not None else ''
+        if element:
+            textes.append(element)
+    return textes
+
+
+def lignes_valeurs(mot):
+    """(type_valeur, position, valeur, valeur_normalisee) pour chaque champ liste du mot"""
+    lignes = []
+    for champ in mot.CHAMPS_LISTES:
+        for position, valeur in enumerate(elements_liste(getattr(mot, champ))):
+            lignes.append((champ, position, valeur, normaliser(valeur)[:255]))
+    return lignes
+
+
+def cles_mot(texte, langue):
+    """Clés de recherche et de tri persistées pour un mot vedette"""
+    return {
+        'cle_recherche': normaliser(texte)[:255],
+        'cle_pliee': plier(texte)[:255],
+        'cle_tri': cle_tri(texte, langue),
+        'cle_squelette': squelette(texte)[:255],
+    }
+
+
+def _synchroniser_valeurs(mot):
+    classe = mot.__mapper__.relationships['valeurs'].mapper.class_
+    mot.valeurs = [
+        classe(type_valeur=type_valeur, position=position, valeur=valeur, valeur_normalisee=normalisee)
+        for type_valeur, position, valeur, normalisee in lignes_valeurs(mot)
+    ]
+
+
+@event.listens_for(OrmSession, 'before_flush')
+def _maintenir_tables_derivees(session, flush_context, instances):
+    """Mettre à jour les clés et valeurs normalisées des mots créés ou modifiés"""
+    with session.no_autoflush:
+        for mot in list(session.new) + list(session.dirty):
+            if not isinstance(mot, (MotKabye, MotFrancais)):
+                continue
+            etat = inspect(mot)
+            if etat.pending or etat.attrs[mot.CHAMP_MOT].history.has_changes():
+                for nom, valeur in cles_mot(getattr(mot, mot.CHAMP_MOT), mot.LANGUE).items():
+                    setattr(mot, nom, valeur)
+            if etat.pending or etat.attrs[mot.CHAMP_GLOSE].history.has_changes():
+                mot.glose_squelette = squelette(getattr(mot, mot.CHAMP_GLOSE))
+            if etat.pending or any(etat.attrs[champ].history.has_changes() for champ in mot.CHAMPS_LISTES):
+                _synchroniser_valeurs(mot)
+
+
+# ---------------------------------------------------------------------------
+# Révisions et notifications de modification (caches en mémoire du processus)
+# ---------------------------------------------------------------------------
+
+class RevisionDictionnaire(Base):
+    """Compteur incrémenté par chaque transaction qui modifie une table de mots.
+
+    Partagé par tous les workers : un cache construit à la révision n reste
+    valable tant que la base est à la révision n.
+    """
+    __tablename__ = 'revisions_dictionnaire'
+
+    nom_table = Column(String(50), primary_key=True)
+    revision = Column(Integer, nullable=False, default=0)
+    date_modification = Column(DateTime, default=datetime.now)
+    # Révision jusqu'à laquelle les suppressions ont été purgées du journal
+    revision_purge = Column(Integer, nullable=False, default=0)
+    # Révision à laquelle statistiques_contributions a été recalculée (-1 : jamais)
+    revision_statistiques = Column(Integer, nullable=False, default=-1)
+
+
+class JournalModification(Base):
+    """Dernière modification de chaque mot, pour la synchronisation incrémentale.
+
+    Écrit dans la transaction de la modification ; une nouvelle modification
+    d'un mot remplace la précédente (compactage), une suppression laisse une
+    entrée 'delete' (pierre tombale).
+    """
+    __tablename__ = 'journal_modifications'
+
+    id = Column(Integer, primary_key=True)
+    nom_table = Column(String(50), nullable=False)
+    mot_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)  # insert, update, delete
+    revision = Column(Integer, nullable=False)
+    date_modification = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        Index('idx_journal_revision', 'nom_table', 'revision', 'id'),
+        Index('idx_journal_mot', 'nom_table', 'mot_id'),
+    )
+
+
+class BailValidation(Base):
+    """Réservation temporaire d'un mot par un validateur (un seul bail actif par mot)"""
+    __tablename__ = 'baux_validation'
+
+    id = Column(Integer, primary_key=True)
+    nom_table = Column(String(50), nullable=False)
+    mot_id = Column(Integer, nullable=False)
+    validateur = Column(String(100), nullable=False)
+    date_expiration = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('nom_table', 'mot_id', name='uq_baux_mot'),
+        Index('idx_baux_validateur', 'nom_table', 'validateur'),
+    )
+
+
+class StatistiqueContribution(Base):
+    """Nombre de mots par contributeur, mois d'ajout et catégorie (agrégat recalculé par GROUP BY)"""
+    __tablename__ = 'statistiques_contributions'
+
+    id = Column(Integer, primary_key=True)
+    nom_table = Column(String(50), nullable=False)
+    contributeur = Column(String(100))
+    mois = Column(String(7))  # AAAA-MM de date_ajout
+    categorie = Column(String(100))
+    nombre = Column(Integer, nullable=False)
+    derniere_activite = Column(DateTime)
+
+    __table_args__ = (
+        Index('idx_statistiques_table', 'nom_table'),
+    )
+
+
+# Relire la révision persistée au plus une fois par intervalle (en secondes) ;
+# un commit du processus lui-même la fait relire immédiatement
+REVISION_INTERVALLE = float(os.getenv('REVISION_INTERVALLE', 1))
+_revisions = {}
+
+
+def etat_revision(table):
+    """(révision, date de la dernière écriture) de la table, (None, None) sans table des révisions"""
+    entree = _revisions.get(table)
+    if entree is None or time.monotonic() - entree[0] > REVISION_INTERVALLE:
+        etat = (None, None)
+        if a_table(RevisionDictionnaire.__tablename__):
+            with get_engine().connect() as connection:
+                etat = tuple(connection.execute(
+                    select(RevisionDictionnaire.revision, RevisionDictionnaire.date_modification)
+                    .where(RevisionDictionnaire.nom_table == table)
+                ).one_or_none() or (None, None))
+        entree = (time.monotonic(), etat)
+        _revisions[table] = entree
+    return entree[1]
+
+
+def revision_dictionnaire(table):
+    """Révision courante de la table (None si la table des révisions n'existe pas encore)"""
+    return etat_revision(table)[0]
+
+
+_observateurs = []
+
+
+def abonner_modifications(fonction):
+    """Appeler fonction(tables) après chaque commit modifiant des mots.
+
+    tables associe chaque table modifiée à l'ensemble des ids ajoutés, modifiés
+    ou supprimés ; la parcourir donne les noms de tables.
+    """
+    _observateurs.append(fonction)
+    return fonction
+
+
+def incrementer_revision(connection, table):
+    """Incrémenter la révision de la table et retourner la nouvelle valeur.
+
+    Le verrou pris sur la ligne est gardé jusqu'au commit : les révisions
+    d'une table sont validées dans l'ordre croissant.
+    """
+    revisions = RevisionDictionnaire.__table__
+    connection.execute(
+        revisions.update()
+        .where(revisions.c.nom_table == table)
+        .values(revision=revisions.c.revision + 1, date_modification=datetime.now())
+    )
+    return connection.execute(
+        select(revisions.c.revision).where(revisions.c.nom_table == table)
+    ).scalar()
+
+
+def journaliser(connection, table, revision, changements):
+    """Inscrire [(mot_id, operation)] au journal en remplaçant les entrées précédentes"""
+    if not changements:
+        return
+    journal = JournalModification.__table__
+    connection.execute(
+        journal.delete().where(journal.c.nom_table == table,
+                               journal.c.mot_id.in_({mot_id for mot_id, _ in changements}))
+    )
+    # Une seule entrée par mot : la dernière opération de la transaction
+    dernieres = dict(changements)
+    maintenant = datetime.now()
+    connection.execute(journal.insert(), [
+        {'nom_table': table, 'mot_id': mot_id, 'operation': operation,
+         'revision': revision, 'date_modification': maintenant}
+        for mot_id, operation in dernieres.items()
+    ])
+
+
+def ids_modifies_depuis(session, table, revision):
+    """Ids modifiés depuis la révision d'après le journal (None s'il ne suffit pas : absent ou purgé)"""
+    if not a_table(JournalModification.__tablename__):
+        return None
+    revisions = RevisionDictionnaire.__table__
+    purge = session.execute(
+        select(revisions.c.revision_purge).where(revisions.c.nom_table == table)
+    ).scalar() or 0
+    if revision < purge:
+        return None
+    journal = JournalModification.__table__
+    return set(session.execute(
+        select(journal.c.mot_id).where(journal.c.nom_table == table, journal.c.revision > revision)
+    ).scalars())
+
+
+# Durée de conservation des suppressions dans le journal
+JOURNAL_RETENTION_JOURS = int(os.getenv('JOURNAL_RETENTION_JOURS', 90))
+
+
+def purger_journal(connection, jours=None):
+    """Oublier les suppressions plus anciennes que la durée de conservation.
+
+    revision_purge retient la plus haute révision oubliée : un client dont la
+    position est antérieure doit tout resynchroniser.
+    """
+    jours = JOURNAL_RETENTION_JOURS if jours is None else jours
+    limite = datetime.now() - timedelta(days=jours)
+    journal = JournalModification.__table__
+    revisions = RevisionDictionnaire.__table__
+    for table in (MotKabye.__tablename__, MotFrancais.__tablename__):
+        condition = and_(journal.c.nom_table == table, journal.c.operation == 'delete',
+                         journal.c.date_modification < limite)
+        maximum = connection.execute(select(func.max(journal.c.revision)).where(condition)).scalar()
+        if maximum is None:
+            continue
+        resultat = connection.execute(journal.delete().where(condition))
+        connection.execute(
+            revisions.update()
+            .where(revisions.c.nom_table == table, revisions.c.revision_purge < maximum)
+            .values(revision_purge=maximum)
+        )
+        print(f"✓ {resultat.rowcount} suppression(s) purgée(s) du journal {table} (jusqu'à la révision {maximum})")
+
+
+@event.listens_for(OrmSession, 'after_flush')
+def _noter_tables_modifiees(session, flush_context):
+    changements = {}
+    for objet in chain(session.new, session.dirty, session.deleted):
+        if isinstance(objet, (MotKabye, MotFrancais)):
+            if objet in session.deleted:
+                operation = 'delete'
+            elif objet in session.new:
+                operation = 'insert'
+            elif session.is_modified(objet, include_collections=False):
+                operation = 'update'
+            else:
+                continue
+            changements.setdefault(objet.__tablename__, []).append((objet.id, operation))
+    noter_modifications(session, changements)
+
+
+def noter_modifications(session, changements):
+    """Inscrire {table: [(mot_id, operation)]} dans la transaction en cours de la session.
+
+    Sert au flush de l'ORM comme aux opérations exécutées directement en SQL :
+    la révision de chaque table n'est incrémentée qu'une fois par transaction,
+    le journal est tenu à jour et les observateurs sont prévenus au commit.
+    Retourne {table: révision} (vide si la table des révisions n'existe pas).
+    """
+    tables = session.info.setdefault('tables_modifiees', {})
+    for table, liste in changements.items():
+        tables.setdefault(table, set()).update(mot_id for mot_id, _ in liste)
+
+    if not changements or not a_table(RevisionDictionnaire.__tablename__):
+        return {}
+    # Une seule incrémentation par transaction, validée avec les données
+    revisions = session.info.setdefault('revisions_transaction', {})
+    connection = session.connection()
+    for table in changements:
+        if table not in revisions:
+            revisions[table] = incrementer_revision(connection, table)
+    if a_table(JournalModification.__tablename__):
+        for table, liste in changements.items():
+            journaliser(connection, table, revisions[table], liste)
+    return revisions
+
+
+@event.listens_for(OrmSession, 'after_commit')
+def _notifier_modifications(session):
+    session.info.pop('revisions_transaction', None)
+    tables = session.info.pop('tables_modifiees', None)
+    if tables:
+        for table in tables:
+            _revisions.pop(table, None)
+        for fonction in _observateurs:
+            fonction(tables)
+
+
+@event.listens_for(OrmSession, 'after_rollback')
+def _oublier_modifications(session):
+    session.info.pop('tables_modifiees', None)
+    session.info.pop('revisions_transaction', None)
+
+
+class ConflitVersion(Exception):
+    """Le client a modifié une version de la ligne qui n'est plus la version courante"""
+
+
+def verifier_version(mot, version_lue):
+    """Lever ConflitVersion si la version lue par le client (formulaire, JSON) a changé depuis.
+
+    Sans version fournie, seul le contrôle de version_id_col au commit s'applique
+    (StaleDataError si la ligne change entre la lecture et l'écriture).
+    """
+    if version_lue in (None, ''):
+        return
+    if int(version_lue) != mot.version:
+        raise ConflitVersion(mot.id)
+
+
+def commence_par(colonne, prefixe_normalise):
+    """Condition de préfixe exprimée en intervalle, utilisable par un index B-tree"""
+    return and_(colonne >= prefixe_normalise, colonne < prefixe_normalise + '\U0010ffff')
+
+
+def correspondance_valeurs(modele, types_valeur, terme, prefixe=True):
+    """Condition SQL : le mot a une valeur (de ces types) égale au terme ou qui le commence.
+
+    Utilise l'index (type_valeur, valeur_normalisee) de la table des valeurs.
+    """
+    classe = modele.__mapper__.relationships['valeurs'].mapper.class_
+    terme = normaliser(terme)[:255]
+    condition = classe.valeur_normalisee == terme
+    if prefixe:
+        condition = commence_par(classe.valeur_normalisee, terme)
+    return modele.id.in_(
+        select(classe.mot_id).where(classe.type_valeur.in_(types_valeur), condition)
+    )
@@ -1,48 +1,415 @@
 # migration.py (fichier séparé)
-import sqlite3
-import os
+"""Migrations versionnées du schéma, à lancer une seule fois au déploiement.
 
-def migrer_database():
-    """Ajouter les colonnes manquantes"""
-    db_path = 'dictionnaire.db'  
-    
-    if not os.path.exists(db_path):
-        print(f"✗ Base de données {db_path} non trouvée")
+    python migration.py            # appliquer les migrations en attente
+    python migration.py statut     # afficher la version du schéma
+    python migration.py recalculer [valeurs|cles|fts|statistiques]
+                                   # recalculer les données dérivées
+    python migration.py purger [jours]
+                                   # oublier les suppressions anciennes du journal
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, text, select, delete, insert, update, bindparam, DateTime, Text, String, Integer
+from sqlalchemy.schema import CreateIndex
+
+from utils.normalisation import squelette
+from database import (Base, ChaineBinaire, get_engine, lignes_valeurs, cles_mot, MotKabye, MotFrancais,
+                      ValeurMotKabye, ValeurMotFrancais, RevisionDictionnaire,
+                      JournalModification, StatistiqueContribution, BailValidation, purger_journal)
+from utils.recherche import CHAMPS_FTS, table_fts
+from utils.statistiques import rafraichir_statistiques
+
+# Liste ordonnée des migrations : (version, description, fonction)
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Déclarer une étape de migration"""
+    def decorateur(fonction):
+        MIGRATIONS.append((version, description, fonction))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fonction
+    return decorateur
+
+
+# ---------------------------------------------------------------------------
+# Outils communs SQLite / PostgreSQL
+# ---------------------------------------------------------------------------
+
+def colonnes(connection, table):
+    """Noms des colonnes d'une table"""
+    return {col['name'] for col in inspect(connection).get_columns(table)}
+
+
+def ajouter_colonne(connection, table, nom, type_colonne, defaut=None):
+    """Ajouter une colonne si elle n'existe pas encore"""
+    if nom in colonnes(connection, table):
         return False
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    type_sql = type_colonne.compile(dialect=connection.dialect)
+    sql = f'ALTER TABLE {table} ADD COLUMN {nom} {type_sql}'
+    if defaut is not None:
+        sql += f' DEFAULT {defaut}'
+    connection.execute(text(sql))
+    print(f"✓ Colonne {table}.{nom} ajoutée")
+    return True
+
+
+def creer_index(connection, nom, table, expressions, unique=False, methode=None):
+    """Créer un index s'il n'existe pas encore"""
+    connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {nom} "
+        f"ON {table} {f'USING {methode} ' if methode else ''}({', '.join(expressions)})"
+    ))
+
+
+# ---------------------------------------------------------------------------
+# Remplissage des données dérivées (réutilisé par « recalculer »)
+# ---------------------------------------------------------------------------
+
+TAILLE_LOT = 1000
+
+
+class _Ligne:
+    """Vue minimale d'une ligne pour réutiliser les fonctions du modèle"""
+    def __init__(self, modele, ligne):
+        self.CHAMPS_LISTES = modele.CHAMPS_LISTES
+        self.__dict__.update(ligne._mapping)
+
+
+def remplir_valeurs(connection):
+    """Reconstruire les tables de valeurs à partir des colonnes JSON"""
+    for modele, classe in ((MotKabye, ValeurMotKabye), (MotFrancais, ValeurMotFrancais)):
+        table = classe.__table__
+        connection.execute(delete(table))
+        colonnes_source = [modele.__table__.c.id] + [modele.__table__.c[champ] for champ in modele.CHAMPS_LISTES]
+        lot = []
+        total = 0
+        for ligne in connection.execute(select(*colonnes_source)):
+            for type_valeur, position, valeur, normalisee in lignes_valeurs(_Ligne(modele, ligne)):
+                lot.append({'mot_id': ligne.id, 'type_valeur': type_valeur, 'position': position,
+                            'valeur': valeur, 'valeur_normalisee': normalisee})
+            if len(lot) >= TAILLE_LOT:
+                connection.execute(insert(table), lot)
+                total += len(lot)
+                lot = []
+        if lot:
+            connection.execute(insert(table), lot)
+            total += len(lot)
+        print(f"✓ {total} valeurs indexées dans {table.name}")
+
+
+def remplir_cles(connection):
+    """Calculer les clés de recherche et de tri des mots existants"""
+    for modele in (MotKabye, MotFrancais):
+        table = modele.__table__
+        # Seules les colonnes de clés déjà créées par les migrations sont remplies
+        noms = [nom for nom in list(cles_mot('', modele.LANGUE)) + ['glose_squelette']
+                if nom in colonnes(connection, table.name)]
+        # date_modification reprise telle quelle : sans elle, son onupdate daterait
+        # chaque mot du jour du recalcul alors que son contenu n'a pas changé
+        requete = (update(table)
+                   .where(table.c.id == bindparam('_id'))
+                   .values({**{nom: bindparam(f'_{nom}') for nom in noms},
+                            'date_modification': table.c.date_modification}))
+        lot = []
+        total = 0
+        for ligne in connection.execute(select(table.c.id, table.c[modele.CHAMP_MOT], table.c[modele.CHAMP_GLOSE])):
+            cles = cles_mot(ligne[1], modele.LANGUE)
+            cles['glose_squelette'] = squelette(ligne[2])
+            lot.append({'_id': ligne.id, **{f'_{nom}': cles[nom] for nom in noms}})
+            if len(lot) >= TAILLE_LOT:
+                connection.execute(requete, lot)
+                total += len(lot)
+                lot = []
+        if lot:
+            connection.execute(requete, lot)
+            total += len(lot)
+        print(f"✓ Clés calculées pour {total} mots de {table.name}")
+
+
+def reconstruire_index_plein_texte(connection):
+    """Reconstruire les index FTS5 (SQLite) ; le tsvector PostgreSQL est une colonne générée"""
+    if connection.dialect.name != 'sqlite':
+        return
+    for table in CHAMPS_FTS:
+        fts = table_fts(table)
+        if fts in inspect(connection).get_table_names():
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            print(f"✓ Index plein texte {fts} reconstruit")
+
+
+def recalculer_statistiques(connection):
+    """Recalculer les agrégats de contributions servis par /api/statistiques"""
+    revisions = RevisionDictionnaire.__table__
+    for modele in (MotKabye, MotFrancais):
+        revision = connection.execute(
+            select(revisions.c.revision).where(revisions.c.nom_table == modele.__tablename__)
+        ).scalar()
+        rafraichir_statistiques(connection, modele, revision)
+        print(f"✓ Statistiques recalculées pour {modele.__tablename__}")
+
+
+# Données dérivées recalculables, dans l'ordre d'exécution
+RECALCULS = {
+    'valeurs': remplir_valeurs,
+    'cles': remplir_cles,
+    'fts': reconstruire_index_plein_texte,
+    'statistiques': recalculer_statistiques,
+}
+
+
+def recalculer(connection, noms=None):
+    """Recalculer les données dérivées des dictionnaires (toutes par défaut)"""
+    for nom, fonction in RECALCULS.items():
+        if not noms or nom in noms:
+            fonction(connection)
+
+
+# ---------------------------------------------------------------------------
+# Étapes
+# ---------------------------------------------------------------------------
+
+@migration(1, "Tables des dictionnaires kabiyè et français")
+def creer_tables_de_base(connection, dialecte):
+    Base.metadata.create_all(connection, tables=[MotKabye.__table__, MotFrancais.__table__])
+
+
+@migration(2, "Colonnes de validation")
+def ajouter_colonnes_validation(connection, dialecte):
+    for table in (MotKabye.__tablename__, MotFrancais.__tablename__):
+        ajouter_colonne(connection, table, 'statut_validation', String(50), "'en_attente'")
+        ajouter_colonne(connection, table, 'notes_validation', Text())
+        ajouter_colonne(connection, table, 'date_validation', DateTime())
+    creer_index(connection, 'idx_statut_validation', MotKabye.__tablename__, ['statut_validation'])
+    creer_index(connection, 'idx_francais_statut_validation', MotFrancais.__tablename__, ['statut_validation'])
+
+
+@migration(3, "Tables des valeurs des champs listes")
+def creer_tables_valeurs(connection, dialecte):
+    Base.metadata.create_all(connection, tables=[ValeurMotKabye.__table__, ValeurMotFrancais.__table__])
+    remplir_valeurs(connection)
+
+
+@migration(4, "Clés de recherche normalisées")
+def ajouter_cles_recherche(connection, dialecte):
+    for table, prefixe in ((MotKabye.__tablename__, 'kabye'), (MotFrancais.__tablename__, 'francais')):
+        ajouter_colonne(connection, table, 'cle_recherche', ChaineBinaire)
+        ajouter_colonne(connection, table, 'cle_pliee', ChaineBinaire)
+        creer_index(connection, f'idx_{prefixe}_cle_recherche', table, ['cle_recherche'])
+        creer_index(connection, f'idx_{prefixe}_cle_pliee', table, ['cle_pliee'])
+    remplir_cles(connection)
+
+
+@migration(5, "Clé de tri alphabétique (ordre kabiyè)")
+def ajouter_cle_tri(connection, dialecte):
+    for table, prefixe in ((MotKabye.__tablename__, 'kabye'), (MotFrancais.__tablename__, 'francais')):
+        ajouter_colonne(connection, table, 'cle_tri', ChaineBinaire)
+        creer_index(connection, f'idx_{prefixe}_cle_tri', table, ['cle_tri', 'id'])
+    remplir_cles(connection)
+
+
+@migration(6, "Index plein texte (FTS5 / tsvector)")
+def creer_index_plein_texte(connection, dialecte):
+    for table, champs in CHAMPS_FTS.items():
+        noms = [nom for nom, _, _ in champs]
+        if dialecte == 'sqlite':
+            fts = table_fts(table)
+            colonnes_fts = ', '.join(noms)
+            nouvelles = ', '.join(f'new.{nom}' for nom in noms)
+            anciennes = ', '.join(f'old.{nom}' for nom in noms)
+            connection.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({colonnes_fts}, "
+                f"content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+            ))
+            # Triggers : l'index suit chaque insertion, modification et suppression
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {colonnes_fts}) VALUES (new.id, {nouvelles}); END"
+            ))
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {colonnes_fts}) VALUES ('delete', old.id, {anciennes}); END"
+            ))
+            connection.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {colonnes_fts} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {colonnes_fts}) VALUES ('delete', old.id, {anciennes}); "
+                f"INSERT INTO {fts}(rowid, {colonnes_fts}) VALUES (new.id, {nouvelles}); END"
+            ))
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        elif dialecte == 'postgresql':
+            if 'recherche_tsv' in colonnes(connection, table):
+                continue
+            vecteur = ' || '.join(
+                f"setweight(to_tsvector('simple', coalesce({nom}, '')), '{classe}')"
+                for nom, _, classe in champs
+            )
+            connection.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN recherche_tsv tsvector "
+                f"GENERATED ALWAYS AS ({vecteur}) STORED"
+            ))
+            creer_index(connection, f'idx_{table}_recherche_tsv', table, ['recherche_tsv'], methode='GIN')
+        print(f"✓ Index plein texte créé pour {table}")
+
+
+@migration(7, "Clés squelettes pour la recherche floue par trigrammes")
+def ajouter_cles_squelettes(connection, dialecte):
+    for table in (MotKabye.__tablename__, MotFrancais.__tablename__):
+        ajouter_colonne(connection, table, 'cle_squelette', ChaineBinaire)
+        ajouter_colonne(connection, table, 'glose_squelette', Text())
+    remplir_cles(connection)
+    if dialecte == 'postgresql':
+        # Sur SQLite l'index de trigrammes est construit en mémoire (utils/trigrammes.py)
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        for table in (MotKabye.__tablename__, MotFrancais.__tablename__):
+            creer_index(connection, f'idx_{table}_cle_squelette_trgm', table,
+                        ['cle_squelette gin_trgm_ops'], methode='GIN')
+            creer_index(connection, f'idx_{table}_glose_squelette_trgm', table,
+                        ['glose_squelette gin_trgm_ops'], methode='GIN')
+
+
+
+@migration(8, "Révisions des dictionnaires (invalidation des caches entre workers)")
+def creer_table_revisions(connection, dialecte):
+    Base.metadata.create_all(connection, tables=[RevisionDictionnaire.__table__])
+    revisions = RevisionDictionnaire.__table__
+    existantes = set(connection.execute(select(revisions.c.nom_table)).scalars())
+    for table in (MotKabye.__tablename__, MotFrancais.__tablename__):
+        if table not in existantes:
+            connection.execute(insert(revisions).values(
+                nom_table=table, revision=0, date_modification=datetime.now()))
+
+
+
+@migration(9, "Index de pagination par clé (date de modification)")
+def ajouter_index_pagination(connection, dialecte):
+    # L'ordre alphabétique utilise déjà l'index (cle_tri, id) de la migration 5
+    creer_index(connection, 'idx_kabye_date_modification', MotKabye.__tablename__, ['date_modification', 'id'])
+    creer_index(connection, 'idx_francais_date_modification', MotFrancais.__tablename__, ['date_modification', 'id'])
+
+
+@migration(10, "Journal des modifications (synchronisation incrémentale)")
+def creer_journal_modifications(connection, dialecte):
+    ajouter_colonne(connection, RevisionDictionnaire.__tablename__, 'revision_purge', Integer(), defaut=0)
+    Base.metadata.create_all(connection, tables=[JournalModification.__table__])
+    # Les entrées existantes n'ont pas d'historique : un client qui n'a jamais
+    # synchronisé repart de la révision 0 et reçoit tout par l'export complet
+
+
+@migration(11, "Agrégats des statistiques de contributions")
+def creer_statistiques_contributions(connection, dialecte):
+    ajouter_colonne(connection, RevisionDictionnaire.__tablename__, 'revision_statistiques', Integer(), defaut=-1)
+    Base.metadata.create_all(connection, tables=[StatistiqueContribution.__table__])
+    # Remplies au premier appel de /api/statistiques (revision_statistiques = -1)
+
+
+@migration(12, "Baux de validation (répartition du travail entre validateurs)")
+def creer_baux_validation(connection, dialecte):
+    Base.metadata.create_all(connection, tables=[BailValidation.__table__])
+
+
+@migration(13, "Version des lignes (verrouillage optimiste)")
+def ajouter_version_lignes(connection, dialecte):
+    for table in (MotKabye.__tablename__, MotFrancais.__tablename__):
+        ajouter_colonne(connection, table, 'version', Integer(), defaut=1)
+
+
+@migration(14, "Index des ordres de pagination sur COALESCE (lignes sans date ou sans clé de tri)")
+def ajouter_index_ordres_sans_null(connection, dialecte):
+    # Mêmes expressions que les requêtes de utils/pagination.py, index défini sur les modèles
+    for modele in (MotKabye, MotFrancais):
+        for index in modele.__table__.indexes:
+            if index.name.endswith(('_ordre_alpha', '_ordre_recents')):
+                # IF NOT EXISTS comme creer_index() : la réflexion ignore les index d'expression
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+@migration(15, "Clés de tri : séparateurs de tête classés après les lettres (affixes en fin de liste)")
+def reclasser_affixes(connection, dialecte):
+    remplir_cles(connection)
+
+# ---------------------------------------------------------------------------
+# Exécution
+# ---------------------------------------------------------------------------
+
+def _creer_table_version(connection):
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(255), "
+        "date_application TIMESTAMP)"
+    ))
+
+
+def version_actuelle(connection):
+    """Dernière version appliquée (0 si aucune)"""
+    _creer_table_version(connection)
+    return connection.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def appliquer_migrations(engine=None):
+    """Appliquer dans l'ordre les migrations qui ne l'ont pas encore été"""
+    engine = engine or get_engine()
+    dialecte = engine.dialect.name
+    appliquees = 0
+
+    with engine.begin() as connection:
+        depart = version_actuelle(connection)
+
+    for version, description, fonction in MIGRATIONS:
+        if version <= depart:
+            continue
+        with engine.begin() as connection:
+            if dialecte == 'postgresql':
+                # Empêcher deux déploiements simultanés d'appliquer la même étape
+                connection.execute(text("SELECT pg_advisory_xact_lock(726001)"))
+            if version <= version_actuelle(connection):
+                continue
+            print(f"→ Migration {version} : {description}")
+            fonction(connection, dialecte)
+            connection.execute(
+                text("INSERT INTO schema_version (version, description, date_application) "
+                     "VALUES (:version, :description, :date)"),
+                {'version': version, 'description': description, 'date': datetime.now()}
+            )
+            appliquees += 1
+
+    with engine.connect() as connection:
+        finale = version_actuelle(connection)
+        connection.commit()
+    print(f"✓ Schéma à jour (version {finale}, {appliquees} migration(s) appliquée(s))")
+    return finale
+
+
+def migrer_database():
+    """Point d'entrée historique"""
     try:
-        # Vérifier les colonnes existantes
-        cursor.execute("PRAGMA table_info(mots_kabye)")
-        colonnes = [col[1] for col in cursor.fetchall()]
-        
-        print("Colonnes actuelles:", colonnes)
-        
-        # Ajouter les colonnes manquantes
-        if 'statut_validation' not in colonnes:
-            cursor.execute("ALTER TABLE mots_kabye ADD COLUMN statut_validation TEXT DEFAULT 'en_attente'")
-            print("✓ Colonne statut_validation ajoutée")
-        
-        if 'notes_validation' not in colonnes:
-            cursor.execute("ALTER TABLE mots_kabye ADD COLUMN notes_validation TEXT")
-            print("✓ Colonne notes_validation ajoutée")
-        
-        if 'date_validation' not in colonnes:
-            cursor.execute("ALTER TABLE mots_kabye ADD COLUMN date_validation DATETIME")
-            print("✓ Colonne date_validation ajoutée")
-        
-        conn.commit()
-        print("✓ Migration terminée avec succès")
+        appliquer_migrations()
         return True
-        
     except Exception as e:
         print(f"✗ Erreur lors de la migration: {e}")
-        conn.rollback()
         return False
-    finally:
-        conn.close()
+
+
+def derniere_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
 
 if __name__ == "__main__":
-    migrer_database()
\ No newline at end of file
+    commande = sys.argv[1] if len(sys.argv) > 1 else 'appliquer'
+    if commande == 'statut':
+        with get_engine().connect() as connection:
+            print(f"Version du schéma : {version_actuelle(connection)} / {derniere_version()}")
+            connection.commit()
+    elif commande == 'recalculer':
+        with get_engine().begin() as connection:
+            recalculer(connection, sys.argv[2:])
+    elif commande == 'purger':
+        with get_engine().begin() as connection:
+            purger_journal(connection, int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif commande == 'appliquer':
+        sys.exit(0 if migrer_database() else 1)
+    else:
+        print(__doc__)
+        sys.exit(2)
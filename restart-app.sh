@@ -18,6 +18,13 @@ source venv/bin/activate
 python3 --version
 pip list | grep -E "(Flask|gunicorn)"
 
+# Migrations du schéma
+echo "🗄️ Application des migrations..."
+python3 migration.py || exit 1
+
+echo "📦 Construction des exports du dictionnaire..."
+python3 -m utils.artefacts
+
 # Démarrer Gunicorn
 echo "🚀 Démarrage de Gunicorn..."
 gunicorn --bind 0.0.0.0:5000 app:app --daemon
@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, request, jsonify, Response
-from database import get_session, MotFrancais
-from sqlalchemy import or_, func
+from flask import Blueprint, render_template, request, jsonify, redirect
+from database import (get_session, commence_par, projection, revision_dictionnaire, verifier_version,
+                      ConflitVersion, MotFrancais)
+from sqlalchemy.orm import undefer_group
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime
-import json
 
 # Importer tes fonctions utilitaires depuis app.py
 from utils.helpers import (
@@ -12,6 +13,17 @@ from utils.helpers import (
     upload_image_cloudinary,
     supprimer_image_cloudinary
 )
+from utils.normalisation import normaliser, plier
+from utils.recherche import rechercher_ids, ordonner_selon, GROUPES_CHAMPS
+from utils.autocompletion import enregistrer_consultation
+from utils.instantane import instantane
+from utils.export import reponse_fragments, format_demande
+from utils.serialisation import FRANCAIS, reponse_conflit
+from utils.cache_http import conditionnel
+from utils.artefacts import lire_manifeste, url_telechargement
+from utils.lots import repondre_lot
+from utils.statistiques import lire_statistiques
+from utils.pagination import paginer, url_page, CurseurInvalide, TAILLE_PAGE_LISTE
 
 francais_bp = Blueprint('francais', __name__)
 
@@ -29,7 +41,8 @@ def editer_mot_francais(mot_id):
     
     session = get_session()
     try:
-        mot = session.query(MotFrancais).filter(MotFrancais.id == mot_id).first()
+        # Le formulaire affiche tous les champs : une seule requête
+        mot = session.query(MotFrancais).options(undefer_group('details')).filter(MotFrancais.id == mot_id).first()
         if not mot:
             return "Mot non trouvé", 404
         
@@ -51,7 +64,8 @@ def editer_mot_francais(mot_id):
             'image_url': mot.image_url or '',
             'verifie_par': mot.verifie_par or '',
             'date_ajout': mot.date_ajout.strftime("%Y-%m-%d %H:%M:%S") if mot.date_ajout else '',
-            'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else ''
+            'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else '',
+            'version': mot.version
         }
         
         return render_template('formulaire_francais.html', mot=mot_dict, edition=True)
@@ -86,10 +100,13 @@ def sauvegarder_mot_francais():
             if not mot:
                 return jsonify({'success': False, 'error': 'Mot non trouvé'})
             
+            # Refuser d'écraser une modification faite depuis l'ouverture du formulaire
+            verifier_version(mot, data.get('version'))
+            
             # Vérifier si le nom a changé et s'il existe déjà
-            if mot.mot_francais.lower() != data['mot_francais'].lower():
+            if normaliser(mot.mot_francais) != normaliser(data['mot_francais']):
                 mot_existe = session.query(MotFrancais).filter(
-                    func.lower(MotFrancais.mot_francais) == data['mot_francais'].lower(),
+                    MotFrancais.cle_recherche == normaliser(data['mot_francais']),
                     MotFrancais.id != mot_id
                 ).first()
                 if mot_existe:
@@ -115,7 +132,7 @@ def sauvegarder_mot_francais():
         else:
             # MODE CRÉATION
             mot_existe = session.query(MotFrancais).filter(
-                func.lower(MotFrancais.mot_francais) == data['mot_francais'].lower()
+                MotFrancais.cle_recherche == normaliser(data['mot_francais'])
             ).first()
             
             if mot_existe:
@@ -183,9 +200,12 @@ def sauvegarder_mot_francais():
             'success': True, 
             'message': message,
             'image_url': image_url,
-            'mot_id': mot.id
+            'mot_id': mot.id,
+            'version': mot.version
         })
             
+    except (ConflitVersion, StaleDataError):
+        return reponse_conflit(session, MotFrancais, mot_id)
     except Exception as e:
         session.rollback()
         return jsonify({'success': False, 'error': str(e)})
@@ -232,29 +252,32 @@ def liste_mots_francais():
         terme_recherche = request.args.get('q', '').strip().lower()
         champ_recherche = request.args.get('champ', 'tous')
         initiale = request.args.get('initiale', '').upper()
+        tri = request.args.get('tri', 'recents')
+        curseur = request.args.get('curseur')
         
-        query = session.query(MotFrancais)
+        # Seulement les colonnes affichées
+        query = session.query(*projection(MotFrancais, MotFrancais.COLONNES_LISTE))
         
         if initiale and len(initiale) == 1:
-            query = query.filter(MotFrancais.mot_francais.startswith(initiale))
+            query = query.filter(commence_par(MotFrancais.cle_pliee, plier(initiale)))
         
         if terme_recherche:
-            if champ_recherche in ['tous', 'francais']:
-                query = query.filter(
-                    or_(
-                        MotFrancais.mot_francais.ilike(f'%{terme_recherche}%'),
-                        MotFrancais.variantes_orthographiques.ilike(f'%{terme_recherche}%')
-                    )
-                )
-            elif champ_recherche in ['tous', 'kabye']:
-                query = query.filter(
-                    or_(
-                        MotFrancais.traduction_kabye.ilike(f'%{terme_recherche}%'),
-                        MotFrancais.sens_multiple.ilike(f'%{terme_recherche}%')
-                    )
-                )
+            # Index plein texte : résultats classés par pertinence et limités
+            ids_pertinence = rechercher_ids(session, MotFrancais, terme_recherche,
+                                            GROUPES_CHAMPS[MotFrancais.__tablename__].get(champ_recherche))
+            query = query.filter(MotFrancais.id.in_(ids_pertinence))
         
-        mots = query.order_by(MotFrancais.date_modification.desc()).all()
+        # Pertinence pour une recherche (déjà bornée), sinon pages par clé
+        page = None
+        if terme_recherche and tri != 'alpha':
+            mots = ordonner_selon(query.all(), ids_pertinence)
+        else:
+            ordre = 'alpha' if tri == 'alpha' else 'recents'
+            try:
+                page = paginer(query, MotFrancais, ordre, curseur, TAILLE_PAGE_LISTE)
+            except CurseurInvalide:
+                page = paginer(query, MotFrancais, ordre, None, TAILLE_PAGE_LISTE)
+            mots = page.elements
         
         mots_affichage = []
         for mot in mots:
@@ -273,118 +296,94 @@ def liste_mots_francais():
                              mots=mots_affichage, 
                              terme_recherche=terme_recherche,
                              nombre_resultats=len(mots_affichage),
+                             total_mots=len(instantane(MotFrancais)),
                              champ_recherche=champ_recherche,
-                             initiale_recherche=initiale)
+                             initiale_recherche=initiale,
+                             tri=tri,
+                             page_suivante=url_page(page.next_cursor) if page else None,
+                             page_precedente=url_page(page.prev_cursor) if page else None)
     finally:
         session.close()
 
 @francais_bp.route('/api/mots_francais')
+@conditionnel(MotFrancais)
 def api_mots_francais():
-    """API pour récupérer les mots français en JSON"""
-    from database import MotFrancais
-    
-    session = get_session()
-    try:
-        mots = session.query(MotFrancais).all()
-        result = []
-        for mot in mots:
-            result.append({
-                'id': mot.id,
-                'mot_francais': mot.mot_francais,
-                'variantes_orthographiques': json_to_list(mot.variantes_orthographiques),
-                'traduction_kabye': mot.traduction_kabye,
-                'sens_multiple': json_to_list(mot.sens_multiple),
-                'synonymes': json_to_list(mot.synonymes),
-                'antonymes': json_to_list(mot.antonymes),
-                'categorie_grammaticale': mot.categorie_grammaticale,
-                'sous_categorie': mot.sous_categorie,
-                'exemple_usage': mot.exemple_usage,
-                'traduction_exemple': mot.traduction_exemple,
-                'expressions_associees': json_to_list(mot.expressions_associees),
-                'notes_usage': mot.notes_usage,
-                'image_url': mot.image_url,
-                'verifie_par': mot.verifie_par,
-                'date_ajout': mot.date_ajout.strftime("%Y-%m-%d %H:%M:%S") if mot.date_ajout else '',
-                'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else ''
-            })
-        return jsonify(result)
-    finally:
-        session.close()
+    """API pour récupérer les mots français en JSON (en flux, ?format=json ou ndjson)"""
+    format = format_demande()
+    if format is None:
+        return jsonify({'error': 'Format inconnu (json ou ndjson)'}), 400
+    return reponse_fragments(FRANCAIS.fragments(instantane(MotFrancais).fiches, statut=False), format)
+
 
 @francais_bp.route('/api/mot_francais/<int:mot_id>')
+@conditionnel(MotFrancais)
 def get_mot_francais(mot_id):
-    session = get_session()
-    try:
-        mot = session.query(MotFrancais).filter(MotFrancais.id == mot_id).first()
-        
-        if not mot:
-            return jsonify({'error': 'Mot non trouvé'}), 404
-        
-        return jsonify({
-            'mot_francais': mot.mot_francais,
-            'traduction_kabye': mot.traduction_kabye,
-            'categorie': mot.categorie_grammaticale,
-            'synonymes': json_to_list(mot.synonymes),
-            'antonymes': json_to_list(mot.antonymes),
-            'exemple': mot.exemple_usage,
-            'traduction_exemple': mot.traduction_exemple,
-            'notes': mot.notes_usage,
-            'image_url': mot.image_url,
-            'verifie_par': mot.verifie_par,
-            'date_ajout': mot.date_ajout.strftime("%Y-%m-%d %H:%M:%S") if mot.date_ajout else '',
-            'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else '',
-            'date_validation': mot.date_validation
-        })
-    finally:
-        session.close()
+    mot = instantane(MotFrancais).mot(mot_id)
+    if not mot:
+        return jsonify({'error': 'Mot non trouvé'}), 404
+
+    enregistrer_consultation(MotFrancais, mot.id)
+    return jsonify(detail_api_francais(mot))
+
+
+@francais_bp.route('/api/mots_francais/batch', methods=['POST'])
+def get_mots_francais():
+    """Plusieurs mots en une requête, par ids ou par vedettes"""
+    return repondre_lot(MotFrancais, lambda mot: {'id': mot.id, **detail_api_francais(mot)})
+
+
+def detail_api_francais(mot):
+    """Représentation JSON d'une fiche française (/api/mot_francais/<id>)"""
+    return {
+        'mot_francais': mot.mot_francais,
+        'traduction_kabye': mot.traduction_kabye,
+        'categorie': mot.categorie_grammaticale,
+        'synonymes': mot.synonymes,
+        'antonymes': mot.antonymes,
+        'exemple': mot.exemple_usage,
+        'traduction_exemple': mot.traduction_exemple,
+        'notes': mot.notes_usage,
+        'image_url': mot.image_url,
+        'verifie_par': mot.verifie_par,
+        'date_ajout': mot.date_ajout.strftime("%Y-%m-%d %H:%M:%S") if mot.date_ajout else '',
+        'date_modification': mot.date_modification.strftime("%Y-%m-%d %H:%M:%S") if mot.date_modification else '',
+        'date_validation': mot.date_validation
+    }
+
+
+@francais_bp.route('/statistiques')
+def statistiques_francais():
+    """Page de statistiques des contributions au dictionnaire français"""
+    return render_template('statistiques.html', url_api='/francais/api/statistiques',
+                           url_retour='/francais/mots_francais', dictionnaire='français → kabiyè')
+
+
+@francais_bp.route('/api/statistiques')
+@conditionnel(MotFrancais)
+def api_statistiques_francais():
+    """Statistiques des contributions au dictionnaire français"""
+    return jsonify(lire_statistiques(MotFrancais))
 
 
 @francais_bp.route('/telecharger_json_francais')
+@conditionnel(MotFrancais)
 def telecharger_json_francais():
-    from database import MotFrancais
-    
-    session = get_session()
-    try:
-        mots = session.query(MotFrancais).all()
-        
-        data = []
-        for mot in mots:
-            data.append({
-                'id': mot.id,
-                'mot_francais': mot.mot_francais,
-                'variantes_orthographiques': json_to_list(mot.variantes_orthographiques),
-                'traduction_kabye': mot.traduction_kabye,
-                'sens_multiple': json_to_list(mot.sens_multiple),
-                'synonymes': json_to_list(mot.synonymes),
-                'antonymes': json_to_list(mot.antonymes),
-                'categorie_grammaticale': mot.categorie_grammaticale,
-                'sous_categorie': mot.sous_categorie,
-                'exemple_usage': mot.exemple_usage,
-                'traduction_exemple': mot.traduction_exemple,
-                'expressions_associees': json_to_list(mot.expressions_associees),
-                'notes_usage': mot.notes_usage,
-                'image_url': mot.image_url,
-                'verifie_par': mot.verifie_par,
+    """Export complet (?format=ndjson pour une ligne par mot, gzip si accepté).
 
-                # 📅 Dates
-                'date_ajout': str(mot.date_ajout) if mot.date_ajout else None,
-                'date_modification': str(mot.date_modification) if mot.date_modification else None,
+    Redirige vers l'export précalculé s'il est à jour, servi sans Python par
+    nginx ; sinon l'envoie en flux.
+    """
+    format = format_demande()
+    if format is None:
+        return jsonify({'error': 'Format inconnu (json ou ndjson)'}), 400
 
-                # ✅ VALIDATION (AJOUT ICI)
-                'statut_validation': mot.statut_validation,
-                'notes_validation': mot.notes_validation,
-                'date_validation': str(mot.date_validation) if mot.date_validation else None
-            })
-        
-        json_data = json.dumps(data, ensure_ascii=False, indent=2)
+    extension = 'ndjson' if format == 'ndjson' else 'json'
+    nom_fichier = f'dictionnaire_francais_kabye.{extension}'
+    manifeste = lire_manifeste()
+    table = MotFrancais.__tablename__
+    if manifeste and manifeste['revisions'].get(table) == revision_dictionnaire(table):
+        # Même nom de fichier que l'envoi en flux : le lien reste un téléchargement
+        return redirect(url_telechargement(manifeste['fichiers']['francais'][format]['url'], nom_fichier))
 
-        return Response(
-            json_data,
-            mimetype="application/json",
-            headers={
-                "Content-Disposition": "attachment;filename=dictionnaire_francais_kabye.json"
-            }
-        )
-        
-    finally:
-        session.close()
\ No newline at end of file
+    return reponse_fragments(FRANCAIS.fragments(instantane(MotFrancais).fiches), format,
+                             nom_fichier=nom_fichier)
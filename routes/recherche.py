@@ -0,0 +1,62 @@
+from flask import Blueprint, request, jsonify
+from database import get_session, MotKabye, MotFrancais
+
+from utils.trigrammes import recherche_floue, SEUIL_DEFAUT
+from utils.autocompletion import completer
+from utils.cache_http import conditionnel
+
+recherche_bp = Blueprint('recherche', __name__)
+
+# Dictionnaire interrogé selon le paramètre « lang »
+MODELES_PAR_LANGUE = {
+    'kabye': MotKabye,
+    'francais': MotFrancais,
+}
+
+
+@recherche_bp.route('/api/recherche/floue')
+@conditionnel(MotKabye, MotFrancais)
+def api_recherche_floue():
+    """Recherche approximative par trigrammes (fautes, lettres kabiyè tapées en ASCII)"""
+    requete = request.args.get('q', '').strip()
+    langue = request.args.get('lang', 'kabye')
+    k = min(max(request.args.get('k', 10, type=int), 1), 50)
+    seuil = min(max(request.args.get('seuil', SEUIL_DEFAUT, type=float), 0.0), 1.0)
+
+    if langue not in MODELES_PAR_LANGUE:
+        return jsonify({'error': 'Langue inconnue (kabye ou francais)'}), 400
+    if not requete:
+        return jsonify({'requete': requete, 'lang': langue, 'resultats': []})
+
+    session = get_session()
+    try:
+        resultats = recherche_floue(session, MODELES_PAR_LANGUE[langue], requete, k, seuil)
+        return jsonify({'requete': requete, 'lang': langue, 'seuil': seuil, 'resultats': resultats})
+    except Exception as e:
+        print(f"Erreur dans api_recherche_floue: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
+
+
+@recherche_bp.route('/api/autocomplete')
+def api_autocomplete():
+    """Complétions de la saisie en cours (vedettes et variantes), pour la frappe au clavier"""
+    requete = request.args.get('q', '')
+    langue = request.args.get('lang', 'kabye')
+    n = min(max(request.args.get('n', 10, type=int), 1), 50)
+
+    if langue not in MODELES_PAR_LANGUE:
+        return jsonify({'error': 'Langue inconnue (kabye ou francais)'}), 400
+    if not requete.strip():
+        return jsonify({'requete': requete, 'lang': langue, 'suggestions': []})
+
+    session = get_session()
+    try:
+        suggestions = completer(session, MODELES_PAR_LANGUE[langue], requete, n)
+        return jsonify({'requete': requete, 'lang': langue, 'suggestions': suggestions})
+    except Exception as e:
+        print(f"Erreur dans api_autocomplete: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
@@ -0,0 +1,94 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import select, tuple_
+
+from database import get_engine, a_table, MotKabye, MotFrancais, JournalModification, RevisionDictionnaire
+from utils.instantane import charger_fiches
+from utils.serialisation import SERIALISEURS
+from utils.cache_http import conditionnel
+from utils.pagination import taille_page
+
+synchronisation_bp = Blueprint('synchronisation', __name__)
+
+MODELES_PAR_LANGUE = {
+    'kabye': MotKabye,
+    'francais': MotFrancais,
+}
+
+
+def _lire_position(since):
+    """« révision » ou « révision.id » (reprise au milieu d'une révision) -> (révision, id)"""
+    revision, _, journal_id = (since or '0').partition('.')
+    return int(revision), int(journal_id) if journal_id else None
+
+
+@synchronisation_bp.route('/api/changes')
+@synchronisation_bp.route('/api/mots/changes')
+@conditionnel(MotKabye, MotFrancais)
+def api_changes():
+    """Entrées modifiées depuis une révision, pour tenir à jour une copie hors ligne.
+
+    Chaque mot apparaît au plus une fois, avec sa dernière opération ; les
+    suppressions sont des pierres tombales {id, operation: 'delete'}. Tant que
+    a_suivre est vrai, rappeler avec since=next_since. 410 si les suppressions
+    postérieures à since ont été purgées : il faut alors tout recharger
+    (/api/mots, dont l'en-tête X-Revision-Dictionnaire donne la révision).
+    """
+    langue = request.args.get('lang', 'kabye')
+    if langue not in MODELES_PAR_LANGUE:
+        return jsonify({'error': 'Langue inconnue (kabye ou francais)'}), 400
+    try:
+        revision_depart, id_depart = _lire_position(request.args.get('since'))
+    except ValueError:
+        return jsonify({'error': 'Paramètre since invalide (révision ou révision.id)'}), 400
+    limite = taille_page(request.args.get('limit', type=int))
+
+    if not a_table(JournalModification.__tablename__):
+        return jsonify({'error': 'Journal des modifications indisponible (migration en attente)'}), 503
+
+    modele = MODELES_PAR_LANGUE[langue]
+    table = modele.__tablename__
+    journal = JournalModification.__table__
+    revisions = RevisionDictionnaire.__table__
+    try:
+        with get_engine().connect() as connection:
+            purge = connection.execute(
+                select(revisions.c.revision_purge).where(revisions.c.nom_table == table)
+            ).scalar() or 0
+            if revision_depart < purge:
+                return jsonify({'error': 'Historique purgé, resynchronisation complète nécessaire',
+                                'revision_purge': purge}), 410
+
+            requete = select(journal.c.id, journal.c.mot_id, journal.c.operation, journal.c.revision) \
+                .where(journal.c.nom_table == table)
+            if id_depart is None:
+                requete = requete.where(journal.c.revision > revision_depart)
+            else:
+                requete = requete.where(tuple_(journal.c.revision, journal.c.id) > tuple_(revision_depart, id_depart))
+            entrees = connection.execute(
+                requete.order_by(journal.c.revision, journal.c.id).limit(limite + 1)
+            ).all()
+            a_suivre = len(entrees) > limite
+            entrees = entrees[:limite]
+
+            ids = [entree.mot_id for entree in entrees if entree.operation != 'delete']
+            fiches = {fiche.id: fiche for fiche in charger_fiches(modele, connection, ids)} if ids else {}
+    except Exception as e:
+        print(f"Erreur dans api_changes: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    changements = []
+    for entree in entrees:
+        changement = {'id': entree.mot_id, 'operation': entree.operation, 'revision': entree.revision}
+        if entree.operation != 'delete':
+            fiche = fiches.get(entree.mot_id)
+            if fiche is None:
+                # Supprimé depuis la lecture du journal : la suppression suivra
+                continue
+            changement['mot'] = SERIALISEURS[table].en_dict(fiche)
+        changements.append(changement)
+
+    if a_suivre:
+        suivant = f"{entrees[-1].revision}.{entrees[-1].id}"
+    else:
+        suivant = str(entrees[-1].revision if entrees else revision_depart)
+    return jsonify({'lang': langue, 'changes': changements, 'next_since': suivant, 'a_suivre': a_suivre})
@@ -6,6 +6,12 @@ cd /home/ubuntu/dictionnaire-kabye
 # Activer l'environnement virtuel (optionnel mais recommandé)
 source venv/bin/activate
 
+# Appliquer les migrations du schéma (une seule fois, avant le démarrage)
+python3 migration.py || exit 1
+
+# Exports précalculés du dictionnaire, servis par nginx
+python3 -m utils.artefacts
+
 # Démarrer l'application avec Gunicorn
 gunicorn --bind 0.0.0.0:5000 app:app --daemon
 
@@ -23,10 +23,31 @@ chmod +x run.sh
 # Configurer Nginx
 sudo tee /etc/nginx/sites-available/dictionnaire-kabye > /dev/null <<EOF
 
+# ?telechargement=nom.json (redirection de /francais/telecharger_json_francais) :
+# l'export est envoyé en pièce jointe sous ce nom ; un en-tête vide n'est pas envoyé
+map \$arg_telechargement \$disposition_export {
+    "~^[A-Za-z0-9_.-]+\$"  "attachment; filename=\$arg_telechargement";
+    default               "";
+}
+
 server {
     listen 80;
     server_name _;
 
+    # Exports précalculés (utils/artefacts.py) : noms à empreinte, contenu immuable.
+    # gzip_static envoie le .gz voisin aux clients qui l'acceptent ; avec le
+    # module ngx_brotli, ajouter « brotli_static on; » pour les .br.
+    location /static/exports/ {
+        alias /home/ubuntu/dictionnaire-kabye/static/exports/;
+        gzip_static on;
+        add_header Cache-Control "public, max-age=31536000, immutable";
+        add_header Access-Control-Allow-Origin "*";
+        add_header Content-Disposition \$disposition_export;
+        location = /static/exports/manifest.json {
+            add_header Cache-Control "no-cache";
+        }
+    }
+
     location / {
         proxy_pass http://127.0.0.1:5000;
         proxy_set_header Host \$host;
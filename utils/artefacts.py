@@ -0,0 +1,241 @@
+# utils/artefacts.py
+"""Exports complets du dictionnaire, précalculés en fichiers statiques.
+
+    python -m utils.artefacts      # construire les exports de la révision courante
+
+Chaque fichier porte l'empreinte de son contenu dans son nom : il ne change
+jamais et nginx peut le servir tel quel, avec sa version .gz (et .br si le
+module brotli est installé), sans passer par Python. manifest.json désigne
+les fichiers de la dernière construction.
+"""
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from flask import request
+
+from database import abonner_modifications, revision_dictionnaire, MotKabye, MotFrancais
+from utils.export import morceaux_fragments
+from utils.instantane import instantane
+from utils.serialisation import SERIALISEURS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DOSSIER = Path(os.getenv('DOSSIER_EXPORTS', Path(__file__).resolve().parent.parent / 'static' / 'exports'))
+URL_DOSSIER = '/static/exports'
+MANIFESTE = 'manifest.json'
+
+# Nom proposé au navigateur pour un export ouvert par un lien de
+# téléchargement (?telechargement=nom.json), repris en Content-Disposition
+PARAMETRE_TELECHARGEMENT = 'telechargement'
+_NOM_TELECHARGEMENT = re.compile(r'^[A-Za-z0-9_.-]+$')
+
+# Les écritures rapprochées (session de validation...) ne déclenchent qu'une
+# reconstruction, au plus tard DELAI_ARTEFACTS secondes après la première
+DELAI_ARTEFACTS = float(os.getenv('DELAI_ARTEFACTS', 30))
+
+LANGUES = {
+    'kabye': MotKabye,
+    'francais': MotFrancais,
+}
+
+
+def _empreinte(donnees):
+    return hashlib.blake2b(donnees, digest_size=8).hexdigest()
+
+
+def _ecrire(nom, donnees):
+    """Écrire le fichier s'il n'existe pas déjà (même nom = même contenu), sans état intermédiaire visible"""
+    chemin = DOSSIER / nom
+    if not chemin.exists():
+        temporaire = DOSSIER / f'.{nom}.{os.getpid()}'
+        temporaire.write_bytes(donnees)
+        os.replace(temporaire, chemin)
+    return nom
+
+
+def _publier(prefixe, extension, donnees):
+    """Fichier brut et ses versions compressées ; retourne l'entrée du manifeste"""
+    nom = _ecrire(f'{prefixe}-{_empreinte(donnees)}.{extension}', donnees)
+    # mtime=0 : même contenu, mêmes octets compressés d'une construction à l'autre
+    _ecrire(nom + '.gz', gzip.compress(donnees, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _ecrire(nom + '.br', brotli.compress(donnees, quality=11))
+    return {
+        'url': f'{URL_DOSSIER}/{nom}',
+        'octets': len(donnees),
+        'gzip': f'{URL_DOSSIER}/{nom}.gz',
+        'brotli': f'{URL_DOSSIER}/{nom}.br' if brotli is not None else None,
+    }
+
+
+def _ligne_sqlite(valeurs, champs):
+    return [json.dumps(valeurs[champ], ensure_ascii=False) if isinstance(valeurs[champ], list) else valeurs[champ]
+            for champ in champs]
+
+
+def _paquet_sqlite(instantanes):
+    """Base SQLite autonome des deux tables (champs listes en JSON), pour un usage hors ligne"""
+    temporaire = DOSSIER / f'.paquet.{os.getpid()}.sqlite'
+    temporaire.unlink(missing_ok=True)
+    connection = sqlite3.connect(temporaire)
+    try:
+        connection.execute("CREATE TABLE meta (cle TEXT PRIMARY KEY, valeur TEXT)")
+        for instant in instantanes:
+            serialiseur = SERIALISEURS[instant.table]
+            champs = serialiseur.noms()
+            connection.execute(
+                f"CREATE TABLE {instant.table} (id INTEGER PRIMARY KEY, "
+                f"{', '.join(champ for champ in champs if champ != 'id')})"
+            )
+            connection.executemany(
+                f"INSERT INTO {instant.table} ({', '.join(champs)}) VALUES ({', '.join('?' * len(champs))})",
+                (_ligne_sqlite(serialiseur.en_dict(fiche), champs) for fiche in instant.fiches)
+            )
+            connection.execute("INSERT INTO meta VALUES (?, ?)", (f'revision_{instant.table}', str(instant.revision)))
+        connection.commit()
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    donnees = temporaire.read_bytes()
+    temporaire.unlink()
+    return donnees
+
+
+def lire_manifeste():
+    """Manifeste courant (dict), None si aucun export n'a encore été construit"""
+    try:
+        return json.loads((DOSSIER / MANIFESTE).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def revisions_courantes():
+    return {modele.__tablename__: revision_dictionnaire(modele.__tablename__) for modele in LANGUES.values()}
+
+
+def construire_artefacts(force=False):
+    """Construire les exports de la révision courante et publier leur manifeste.
+
+    Un verrou de fichier sérialise les workers ; celui qui arrive après une
+    construction à jour n'a rien à faire.
+    """
+    DOSSIER.mkdir(parents=True, exist_ok=True)
+    with open(DOSSIER / '.verrou', 'w') as verrou:
+        fcntl.flock(verrou, fcntl.LOCK_EX)
+        precedent = lire_manifeste()
+        if not force and precedent and precedent.get('revisions') == revisions_courantes():
+            return precedent
+
+        instantanes = [instantane(modele) for modele in LANGUES.values()]
+        fichiers = {}
+        for (langue, _), instant in zip(LANGUES.items(), instantanes):
+            serialiseur = SERIALISEURS[instant.table]
+            fichiers[langue] = {
+                format: _publier(f'dictionnaire_{langue}', format,
+                                 b''.join(morceaux_fragments(serialiseur.fragments(instant.fiches), format)))
+                for format in ('json', 'ndjson')
+            }
+        fichiers['sqlite'] = _publier('dictionnaire', 'sqlite', _paquet_sqlite(instantanes))
+
+        manifeste = {
+            'date_generation': datetime.now().isoformat(timespec='seconds'),
+            'revisions': {instant.table: instant.revision for instant in instantanes},
+            'fichiers': fichiers,
+        }
+        _ecrire_manifeste(manifeste)
+        _nettoyer(manifeste, precedent)
+        print(f"✓ Exports du dictionnaire reconstruits ({', '.join(f'{t} r{r}' for t, r in manifeste['revisions'].items())})")
+        return manifeste
+
+
+def _ecrire_manifeste(manifeste):
+    temporaire = DOSSIER / f'.{MANIFESTE}.{os.getpid()}'
+    temporaire.write_text(json.dumps(manifeste, ensure_ascii=False, indent=2), encoding='utf-8')
+    os.replace(temporaire, DOSSIER / MANIFESTE)
+
+
+def _entrees(manifeste):
+    for valeur in (manifeste or {}).get('fichiers', {}).values():
+        if 'url' in valeur:
+            yield valeur
+        else:
+            yield from valeur.values()
+
+
+def _urls(manifeste):
+    noms = set()
+    for entree in _entrees(manifeste):
+        for cle in ('url', 'gzip', 'brotli'):
+            if entree.get(cle):
+                noms.add(entree[cle].rsplit('/', 1)[-1])
+    return noms
+
+
+def _nettoyer(manifeste, precedent):
+    """Supprimer les exports périmés, en gardant la génération précédente (téléchargements en cours)"""
+    gardes = _urls(manifeste) | _urls(precedent)
+    for chemin in DOSSIER.iterdir():
+        if chemin.name.startswith('dictionnaire') and chemin.name not in gardes:
+            chemin.unlink(missing_ok=True)
+
+
+_minuterie = None
+_verrou = threading.Lock()
+
+
+def planifier_reconstruction(delai=None):
+    """Reconstruire en arrière-plan après le délai, sauf si c'est déjà prévu"""
+    global _minuterie
+    with _verrou:
+        if _minuterie is not None:
+            return
+        _minuterie = threading.Timer(DELAI_ARTEFACTS if delai is None else delai, _reconstruire)
+        _minuterie.daemon = True
+        _minuterie.start()
+
+
+def _reconstruire():
+    global _minuterie
+    with _verrou:
+        _minuterie = None
+    try:
+        construire_artefacts()
+    except Exception as e:
+        print(f"Erreur dans construire_artefacts: {e}")
+
+
+@abonner_modifications
+def _noter_modifications(tables):
+    planifier_reconstruction()
+
+
+if __name__ == '__main__':
+    construire_artefacts(force=True)
+
+
+def url_telechargement(url, nom_fichier):
+    """URL d'un export à enregistrer sous nom_fichier plutôt qu'à afficher"""
+    return f'{url}?{PARAMETRE_TELECHARGEMENT}={quote(nom_fichier)}'
+
+
+def init_telechargements(app):
+    """Content-Disposition des exports servis par Flask (sans nginx, cf. setup.sh)"""
+    @app.after_request
+    def nommer_telechargement(reponse):
+        nom = request.args.get(PARAMETRE_TELECHARGEMENT)
+        if (nom and reponse.status_code == 200 and request.path.startswith(URL_DOSSIER + '/')
+                and _NOM_TELECHARGEMENT.match(nom)):
+            reponse.headers.set('Content-Disposition', 'attachment', filename=nom)
+        return reponse
@@ -0,0 +1,327 @@
+# utils/autocompletion.py
+
+import heapq
+import re
+import threading
+from collections import Counter
+from itertools import chain
+
+from sqlalchemy import select
+
+from database import get_engine, abonner_modifications, elements_liste, revision_dictionnaire, ids_modifies_depuis
+from utils.normalisation import squelette
+
+# Nombre maximal de complétions demandées (et gardées en cache à chaque nœud)
+TAILLE_MAX = 50
+
+# Les mots validés d'abord, les rejetés en dernier
+RANG_STATUT = {'valide': 0, 'rejete': 2}
+
+# Une vedette peut regrouper plusieurs formes : « aller, partir ; s'en aller »
+_SEPARATEURS_FORMES = re.compile(r'[,;/]')
+
+# Forme par laquelle une entrée répond au préfixe, premier critère du classement :
+# une vedette qui commence par la saisie passe avant un mot de la vedette,
+# qui passe avant une variante orthographique
+FORME_VEDETTE, FORME_MOT_VEDETTE, FORME_VARIANTE = 0, 1, 2
+
+
+def cles_entree(mot, variantes):
+    """Clés squelettes sous lesquelles une entrée est proposée.
+
+    Chaque forme de la vedette et chaque variante, ainsi que chacun de leurs
+    mots, pour compléter « attention » dans « faire attention ». Retourne
+    {clé: (forme, variante)}, variante valant None quand la clé vient de la
+    vedette ; une clé commune à plusieurs formes garde la mieux classée.
+    """
+    cles = {}
+
+    def noter(cle, forme, variante=None):
+        if cle and (cle not in cles or forme < cles[cle][0]):
+            cles[cle] = (forme, variante)
+
+    for texte in _SEPARATEURS_FORMES.split(mot or ''):
+        cle = squelette(texte)
+        noter(cle, FORME_VEDETTE)
+        for partie in cle.split():
+            noter(partie, FORME_MOT_VEDETTE)
+    for variante in elements_liste(variantes):
+        cle = squelette(variante)
+        for partie in [cle] + cle.split():
+            noter(partie, FORME_VARIANTE, variante)
+    return cles
+
+
+class _Noeud:
+    __slots__ = ('etiquette', 'enfants', 'ids', 'meilleurs')
+
+    def __init__(self, etiquette):
+        self.etiquette = etiquette
+        self.enfants = {}
+        self.ids = set()  # (forme, mot_id, variante) des entrées dont c'est une clé
+        self.meilleurs = None  # idem, le mieux classé par entrée du sous-arbre, recalculés à la demande
+
+
+def _prefixe_commun(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class TrieAutocompletion:
+    """Arbre radix (préfixes compressés) clé squelette -> (forme, id, variante) des entrées"""
+
+    __slots__ = ('racine', 'entrees', 'popularite')
+
+    def __init__(self, lignes, popularite):
+        # lignes : (id, mot, traduction, statut_validation, variantes_orthographiques)
+        self.racine = _Noeud('')
+        self.entrees = {}
+        self.popularite = popularite
+        for ligne in lignes:
+            self.ajouter(ligne)
+
+    def _rang(self, reference):
+        forme, mot_id, _ = reference
+        mot, _, statut, _ = self.entrees[mot_id]
+        return (forme, RANG_STATUT.get(statut, 1), -self.popularite[mot_id], len(mot), mot_id)
+
+    def _inserer(self, cle, reference):
+        noeud = self.racine
+        i = 0
+        while True:
+            noeud.meilleurs = None
+            if i == len(cle):
+                noeud.ids.add(reference)
+                return
+            enfant = noeud.enfants.get(cle[i])
+            if enfant is None:
+                feuille = _Noeud(cle[i:])
+                feuille.ids.add(reference)
+                noeud.enfants[cle[i]] = feuille
+                return
+            commun = _prefixe_commun(enfant.etiquette, cle[i:])
+            if commun < len(enfant.etiquette):
+                # Couper l'arête au point de divergence
+                milieu = _Noeud(enfant.etiquette[:commun])
+                enfant.etiquette = enfant.etiquette[commun:]
+                milieu.enfants[enfant.etiquette[0]] = enfant
+                noeud.enfants[cle[i]] = milieu
+                enfant = milieu
+            noeud = enfant
+            i += commun
+
+    def _chemin(self, cle):
+        """Nœuds de la racine jusqu'à la clé exacte (None si la clé est absente)"""
+        chemin = [self.racine]
+        noeud = self.racine
+        i = 0
+        while i < len(cle):
+            enfant = noeud.enfants.get(cle[i])
+            if enfant is None or not cle.startswith(enfant.etiquette, i):
+                return None
+            i += len(enfant.etiquette)
+            noeud = enfant
+            chemin.append(noeud)
+        return chemin
+
+    def _supprimer(self, cle, reference):
+        chemin = self._chemin(cle)
+        if chemin is None:
+            return
+        for noeud in chemin:
+            noeud.meilleurs = None
+        noeud = chemin[-1]
+        noeud.ids.discard(reference)
+        if noeud is self.racine or noeud.ids:
+            return
+        parent = chemin[-2]
+        if not noeud.enfants:
+            del parent.enfants[noeud.etiquette[0]]
+            noeud = parent
+            if noeud is self.racine or noeud.ids or len(noeud.enfants) != 1:
+                return
+        elif len(noeud.enfants) != 1:
+            return
+        # Nœud sans entrée et à enfant unique : fusionner l'arête
+        (enfant,) = noeud.enfants.values()
+        noeud.etiquette += enfant.etiquette
+        noeud.enfants = enfant.enfants
+        noeud.ids = enfant.ids
+
+    def _invalider(self, cle):
+        chemin = self._chemin(cle)
+        for noeud in chemin or ():
+            noeud.meilleurs = None
+
+    def ajouter(self, ligne):
+        mot_id, mot, traduction, statut, variantes = ligne
+        cles = cles_entree(mot, variantes)
+        self.entrees[mot_id] = (mot, traduction, statut, cles)
+        for cle, (forme, variante) in cles.items():
+            self._inserer(cle, (forme, mot_id, variante))
+
+    def retirer(self, mot_id):
+        entree = self.entrees.pop(mot_id, None)
+        if entree is None:
+            return
+        for cle, (forme, variante) in entree[3].items():
+            self._supprimer(cle, (forme, mot_id, variante))
+
+    def reclasser(self, mot_id):
+        """La popularité de l'entrée a changé : oublier les classements qui la contiennent"""
+        entree = self.entrees.get(mot_id)
+        if entree is not None:
+            for cle in entree[3]:
+                self._invalider(cle)
+
+    def _meilleurs(self, noeud):
+        if noeud.meilleurs is None:
+            # Une entrée peut répondre par plusieurs clés : on garde sa meilleure forme
+            candidats = {}
+            for reference in chain(noeud.ids, *(self._meilleurs(enfant) for enfant in noeud.enfants.values())):
+                retenue = candidats.get(reference[1])
+                if retenue is None or reference[0] < retenue[0]:
+                    candidats[reference[1]] = reference
+            noeud.meilleurs = heapq.nsmallest(TAILLE_MAX, candidats.values(), key=self._rang)
+        return noeud.meilleurs
+
+    def _noeud_prefixe(self, prefixe):
+        noeud = self.racine
+        i = 0
+        while i < len(prefixe):
+            enfant = noeud.enfants.get(prefixe[i])
+            if enfant is None:
+                return None
+            reste = prefixe[i:i + len(enfant.etiquette)]
+            if not enfant.etiquette.startswith(reste):
+                return None
+            i += len(enfant.etiquette)
+            noeud = enfant
+        return noeud
+
+    def completer(self, prefixe, n=10):
+        """Les n entrées les mieux classées dont une clé commence par le préfixe.
+
+        variante : la variante orthographique qui a répondu (None pour la vedette).
+        """
+        cle = squelette(prefixe)
+        if not cle:
+            return []
+        noeud = self._noeud_prefixe(cle)
+        if noeud is None:
+            return []
+        resultats = []
+        for _, mot_id, variante in self._meilleurs(noeud)[:n]:
+            mot, traduction, statut, _ = self.entrees[mot_id]
+            resultats.append({
+                'id': mot_id,
+                'mot': mot,
+                'variante': variante,
+                'traduction': traduction,
+                'statut_validation': statut or 'en_attente',
+            })
+        return resultats
+
+
+# Un index par table, (révision, index). Les ids modifiés par les commits du
+# processus sont réappliqués à la requête suivante ; si la révision a avancé
+# davantage (écriture d'un autre worker), ceux du journal aussi. L'index n'est
+# reconstruit, en arrière-plan et hors du verrou, que si le journal a été purgé.
+_index = {}
+_en_attente = {}
+_popularite = {}
+_reconstructions = set()
+_verrou = threading.RLock()
+
+
+@abonner_modifications
+def _noter_modifications(tables):
+    with _verrou:
+        for table, ids in tables.items():
+            if table in _index:
+                modifies, commits = _en_attente.get(table, (set(), 0))
+                _en_attente[table] = (modifies | ids, commits + 1)
+
+
+def _lignes(modele, ids=None):
+    requete = select(
+        modele.id,
+        getattr(modele, modele.CHAMP_MOT),
+        getattr(modele, modele.CHAMP_GLOSE),
+        modele.statut_validation,
+        modele.variantes_orthographiques,
+    )
+    if ids is not None:
+        requete = requete.where(modele.id.in_(ids))
+    return requete
+
+
+def _reconstruire(modele):
+    table = modele.__tablename__
+    try:
+        # Révision lue avant les lignes : au pire des ids déjà indexés sont réappliqués
+        revision = revision_dictionnaire(table)
+        popularite = _popularite.setdefault(table, Counter())
+        with get_engine().connect() as connection:
+            index = TrieAutocompletion(connection.execute(_lignes(modele)), popularite)
+        with _verrou:
+            _index[table] = (revision, index)
+    except Exception as e:
+        print(f"Erreur dans reconstruire_autocompletion: {e}")
+    finally:
+        with _verrou:
+            _reconstructions.discard(table)
+
+
+def _reconstruire_en_arriere_plan(modele):
+    table = modele.__tablename__
+    if table not in _reconstructions:
+        _reconstructions.add(table)
+        threading.Thread(target=_reconstruire, args=(modele,), daemon=True).start()
+
+
+def _index_a_jour(session, modele):
+    table = modele.__tablename__
+    revision = revision_dictionnaire(table)
+    entree = _index.get(table)
+    if entree is None:
+        # Première construction : rien d'autre à servir en attendant
+        popularite = _popularite.setdefault(table, Counter())
+        index = TrieAutocompletion(session.execute(_lignes(modele)), popularite)
+        _index[table] = (revision, index)
+        return index
+
+    revision_index, index = entree
+    ids, commits = _en_attente.pop(table, (set(), 0))
+    if None not in (revision, revision_index) and revision != revision_index + commits:
+        autres = ids_modifies_depuis(session, table, revision_index)
+        if autres is None:
+            _reconstruire_en_arriere_plan(modele)
+        else:
+            ids = ids | autres
+    if ids:
+        for mot_id in ids:
+            index.retirer(mot_id)
+        for ligne in session.execute(_lignes(modele, ids)):
+            index.ajouter(tuple(ligne))
+    _index[table] = (revision, index)
+    return index
+
+
+def completer(session, modele, prefixe, n=10):
+    """Complétions de la vedette, classées par forme (vedette d'abord), statut, popularité puis longueur"""
+    with _verrou:
+        return _index_a_jour(session, modele).completer(prefixe, n)
+
+
+def enregistrer_consultation(modele, mot_id):
+    """Compter une consultation de l'entrée (popularité propre au processus)"""
+    table = modele.__tablename__
+    with _verrou:
+        _popularite.setdefault(table, Counter())[mot_id] += 1
+        entree = _index.get(table)
+        if entree is not None:
+            entree[1].reclasser(mot_id)
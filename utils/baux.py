@@ -0,0 +1,181 @@
+# utils/baux.py
+
+import os
+from datetime import datetime, timedelta
+
+from flask import request, jsonify
+from sqlalchemy import select, delete, update, exists, and_
+from sqlalchemy.dialects.postgresql import insert as insert_postgresql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+
+from database import get_session, a_table, projection, BailValidation
+from utils.file_validation import validateur_demande
+
+# Durée d'un bail sans nouvelles du validateur ; la page ouverte le prolonge
+# régulièrement, un onglet fermé ou un navigateur planté le laisse expirer
+DUREE_BAIL = int(os.getenv('DUREE_BAIL_VALIDATION', 600))
+
+# Mots réservés au plus par validateur et par dictionnaire
+TAILLE_RESERVATION_MAX = 50
+TAILLE_RESERVATION = 20
+
+BAUX = BailValidation.__table__
+
+
+def baux_disponibles():
+    return a_table(BailValidation.__tablename__)
+
+
+def _actifs(modele, maintenant=None):
+    return and_(BAUX.c.nom_table == modele.__tablename__,
+                BAUX.c.date_expiration > (maintenant or datetime.now()))
+
+
+def titulaire(session, modele, mot_id):
+    """Validateur qui tient un bail actif sur le mot (None si le mot est libre)"""
+    return session.execute(
+        select(BAUX.c.validateur).where(_actifs(modele), BAUX.c.mot_id == mot_id)
+    ).scalar()
+
+
+def baux_actifs(session, modele):
+    """{mot_id: validateur} des baux en cours"""
+    return dict(session.execute(select(BAUX.c.mot_id, BAUX.c.validateur).where(_actifs(modele))).all())
+
+
+def reserver(session, file, validateur, nombre):
+    """Compléter jusqu'à `nombre` les mots en attente réservés par le validateur.
+
+    Les baux déjà tenus sont prolongés. Les mots libres sont pris dans
+    l'ordre de la file (filtres de la requête appliqués) : FOR UPDATE SKIP
+    LOCKED sur PostgreSQL, pour que deux réservations simultanées se
+    partagent les mots sans s'attendre ; BEGIN IMMEDIATE sur SQLite, qui
+    sérialise les réservations. L'unicité (table, mot) des baux tranche
+    les derniers conflits.
+    """
+    modele = file.modele
+    table = modele.__tablename__
+    connection = session.connection()
+    dialecte = connection.dialect.name
+    if dialecte == 'sqlite':
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+    maintenant = datetime.now()
+    expiration = maintenant + timedelta(seconds=DUREE_BAIL)
+    session.execute(delete(BAUX).where(BAUX.c.nom_table == table, BAUX.c.date_expiration <= maintenant))
+    tenus = session.execute(
+        update(BAUX).where(BAUX.c.nom_table == table, BAUX.c.validateur == validateur)
+        .values(date_expiration=expiration)
+    ).rowcount
+
+    if tenus < nombre:
+        libres = (
+            file.requete(session, 'en_attente')
+            .with_entities(modele.id)
+            .filter(~exists().where(BAUX.c.nom_table == table, BAUX.c.mot_id == modele.id))
+            .order_by(modele.cle_tri, modele.id)
+            .limit(nombre - tenus)
+        )
+        if dialecte == 'postgresql':
+            libres = libres.with_for_update(skip_locked=True, of=modele)
+        ids = [ligne.id for ligne in libres]
+        if ids:
+            inserer = insert_postgresql if dialecte == 'postgresql' else insert_sqlite
+            session.execute(inserer(BAUX).on_conflict_do_nothing(), [
+                {'nom_table': table, 'mot_id': mot_id, 'validateur': validateur, 'date_expiration': expiration}
+                for mot_id in ids
+            ])
+
+    reserves = select(BAUX.c.mot_id).where(BAUX.c.nom_table == table, BAUX.c.validateur == validateur)
+    mots = (
+        session.query(*projection(modele, modele.COLONNES_FILE))
+        .filter(modele.id.in_(reserves))
+        .order_by(modele.cle_tri, modele.id)
+        .all()
+    )
+    return mots, expiration
+
+
+def prolonger(session, modele, validateur):
+    """Repousser l'expiration des baux en cours du validateur ; (nombre, expiration)"""
+    expiration = datetime.now() + timedelta(seconds=DUREE_BAIL)
+    nombre = session.execute(
+        update(BAUX).where(_actifs(modele), BAUX.c.validateur == validateur)
+        .values(date_expiration=expiration)
+    ).rowcount
+    return nombre, expiration
+
+
+def liberer(session, modele, validateur, ids=None):
+    """Rendre les mots réservés par le validateur (tous, ou seulement ceux de ids)"""
+    requete = delete(BAUX).where(BAUX.c.nom_table == modele.__tablename__, BAUX.c.validateur == validateur)
+    if ids is not None:
+        requete = requete.where(BAUX.c.mot_id.in_(ids))
+    return session.execute(requete).rowcount
+
+
+def validateur_bail():
+    """Validateur d'une requête de bail : corps JSON (sendBeacon compris), sinon paramètre ou Referer"""
+    donnees = request.get_json(silent=True, force=True)
+    if isinstance(donnees, dict) and donnees.get('validateur'):
+        return donnees['validateur']
+    return validateur_demande()
+
+
+def _executer(nom, fonction):
+    """Exécuter fonction(session) dans une transaction et renvoyer sa réponse JSON"""
+    if not baux_disponibles():
+        return jsonify({'error': 'Baux de validation indisponibles (migration en attente)'}), 503
+    session = get_session()
+    try:
+        resultat = fonction(session)
+        session.commit()
+        return jsonify(resultat)
+    except Exception as e:
+        session.rollback()
+        print(f"Erreur dans {nom}: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        session.close()
+
+
+def repondre_reservation(file, validateur):
+    """{mots, expiration, duree} : le lot réservé par le validateur, dans l'ordre de la file"""
+    donnees = request.get_json(silent=True, force=True)
+    if not isinstance(donnees, dict):
+        donnees = {}
+    try:
+        nombre = int(donnees.get('nombre', TAILLE_RESERVATION))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'nombre doit être un entier'}), 400
+    nombre = max(1, min(nombre, TAILLE_RESERVATION_MAX))
+
+    def reserver_lot(session):
+        mots, expiration = reserver(session, file, validateur, nombre)
+        avec_statut = file.colonnes_validation()
+        return {
+            'mots': [file.ligne(mot, avec_statut) for mot in mots],
+            'expiration': expiration.strftime("%Y-%m-%d %H:%M:%S"),
+            'duree': DUREE_BAIL,
+        }
+    return _executer('reserver_mots', reserver_lot)
+
+
+def repondre_prolongation(modele, validateur):
+    def prolonger_baux(session):
+        nombre, expiration = prolonger(session, modele, validateur)
+        return {'baux': nombre, 'expiration': expiration.strftime("%Y-%m-%d %H:%M:%S")}
+    return _executer('prolonger_baux', prolonger_baux)
+
+
+def repondre_liberation(modele, validateur):
+    donnees = request.get_json(silent=True, force=True)
+    ids = donnees.get('ids') if isinstance(donnees, dict) else None
+    if ids is not None and not (isinstance(ids, list) and all(isinstance(mot_id, int) for mot_id in ids)):
+        return jsonify({'error': 'ids doit être une liste d\'entiers'}), 400
+    return _executer('liberer_baux', lambda session: {'liberes': liberer(session, modele, validateur, ids)})
+
+
+def repondre_baux_actifs(modele):
+    """{baux: {mot_id: validateur}} pour marquer dans la file les mots pris par d'autres"""
+    return _executer('baux_actifs', lambda session: {'baux': baux_actifs(session, modele), 'duree': DUREE_BAIL})
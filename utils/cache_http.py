@@ -0,0 +1,74 @@
+# utils/cache_http.py
+
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import request, make_response, Response
+
+from database import etat_revision
+from utils.compression import encodage_accepte
+
+
+def validateurs_cache(tables):
+    """ETag et Last-Modified de la requête courante, d'après les révisions des tables.
+
+    L'ETag réunit les révisions et une empreinte de la variante demandée
+    (chemin, paramètres, encodage accepté) : deux corps différents n'ont
+    jamais le même ETag. (None, None) si les révisions ne sont pas disponibles.
+    """
+    etats = [etat_revision(table) for table in tables]
+    if any(revision is None for revision, _ in etats):
+        return None, None
+    # Les dates d'écriture distinguent aussi deux bases restaurées au même numéro
+    dates_ecriture = ','.join(str(date) for _, date in etats)
+    variante = f"{request.full_path}|{encodage_accepte() or ''}|{dates_ecriture}"
+    empreinte = hashlib.blake2b(variante.encode('utf-8'), digest_size=8).hexdigest()
+    etag = '.'.join(str(revision) for revision, _ in etats) + '-' + empreinte
+
+    dates = [date for _, date in etats if date]
+    # Les dates sont enregistrées à l'heure locale du serveur (datetime.now)
+    derniere = max(dates).astimezone(timezone.utc).replace(microsecond=0) if dates else None
+    return etag, derniere
+
+
+def conditionnel(*modeles, prive=False):
+    """Réponses conditionnelles pour une vue qui ne lit que ces tables.
+
+    Si le client présente l'ETag courant (If-None-Match), ou à défaut une date
+    If-Modified-Since postérieure à la dernière écriture, la vue n'est pas
+    exécutée et la réponse est un 304 vide. Le client revalide à chaque usage
+    (no-cache) ; une écriture d'un autre worker est vue au plus après
+    REVISION_INTERVALLE.
+    """
+    tables = [modele.__tablename__ for modele in modeles]
+    cache_control = 'private, no-cache' if prive else 'public, no-cache'
+
+    def decorateur(vue):
+        @wraps(vue)
+        def enveloppe(*args, **kwargs):
+            etag, derniere = validateurs_cache(tables)
+            if etag is None:
+                return vue(*args, **kwargs)
+
+            if request.if_none_match:
+                # Comparaison faible : la compression rend l'ETag faible (W/)
+                non_modifie = request.if_none_match.contains_weak(etag)
+            else:
+                non_modifie = bool(derniere and request.if_modified_since
+                                   and derniere <= request.if_modified_since)
+
+            if non_modifie:
+                reponse = Response(status=304)
+            else:
+                reponse = make_response(vue(*args, **kwargs))
+                if reponse.status_code != 200:
+                    return reponse
+            reponse.set_etag(etag)
+            if derniere:
+                reponse.last_modified = derniere
+            reponse.headers['Cache-Control'] = cache_control
+            reponse.vary.add('Accept-Encoding')
+            return reponse
+        return enveloppe
+    return decorateur
@@ -0,0 +1,65 @@
+# utils/collation.py
+
+from utils.normalisation import plier
+
+# Ordre alphabétique kabiyè (kp est une lettre à part, classée après k)
+ALPHABET_KABYE = ['a', 'b', 'c', 'd', 'ɖ', 'e', 'ɛ', 'f', 'g', 'ɣ', 'h', 'i', 'ɩ', 'j', 'k', 'kp', 'l', 'm',
+                  'n', 'ñ', 'ŋ', 'o', 'ɔ', 'p', 's', 't', 'u', 'ʋ', 'v', 'w', 'y', 'z']
+
+# Le digramme kp est d'abord remplacé par un caractère privé, puis toutes les
+# lettres sont traduites en un seul caractère ASCII dont l'ordre binaire suit
+# l'alphabet (à partir de '!'). Dans le mot, les séparateurs passent avant toute
+# lettre ; les caractères inconnus passent après, précédés de '~' pour garder leur
+# ordre relatif. Les séparateurs en tête (affixes « -bɛ », « - ɛhɩɖɛ ») sont classés
+# comme des caractères inconnus : les affixes restent après les mots, comme avant.
+_DIGRAMME_KP = '\ue000'
+_PREMIER_RANG = 0x21
+SEPARATEURS = " -'’"
+
+
+class _TableTri(dict):
+    def __missing__(self, code):
+        valeur = '~' + chr(code)
+        self[code] = valeur
+        return valeur
+
+
+_TABLE_KABYE = _TableTri({
+    ord(_DIGRAMME_KP if lettre == 'kp' else lettre): chr(_PREMIER_RANG + rang)
+    for rang, lettre in enumerate(ALPHABET_KABYE)
+})
+_TABLE_KABYE.update({ord(sep): ' ' for sep in SEPARATEURS})
+
+# Le rang d'une lettre de la clé, pour retrouver l'initiale d'une clé de tri
+_LETTRE_PAR_CODE = {chr(_PREMIER_RANG + rang): lettre for rang, lettre in enumerate(ALPHABET_KABYE)}
+
+_TABLE_FRANCAIS = str.maketrans({'œ': 'oe', 'æ': 'ae', '-': ' ', "'": ' ', '’': ' '})
+
+
+def _tete(plie):
+    """(séparateurs de tête traduits après toute lettre, reste du mot)"""
+    reste = plie.lstrip(SEPARATEURS)
+    return ''.join('~' + sep for sep in plie[:len(plie) - len(reste)]), reste
+
+
+def cle_tri_kabye(texte):
+    """Clé de tri binaire selon l'alphabet kabiyè (tons et casse ignorés)"""
+    tete, reste = _tete(plier(texte))
+    return tete + reste.replace('kp', _DIGRAMME_KP).translate(_TABLE_KABYE)
+
+
+def cle_tri_francais(texte):
+    """Clé de tri binaire pour le français (accents et casse ignorés)"""
+    tete, reste = _tete(plier(texte))
+    return tete + reste.translate(_TABLE_FRANCAIS)
+
+
+def cle_tri(texte, langue='kabye'):
+    if langue == 'kabye':
+        return cle_tri_kabye(texte)[:255]
+    return cle_tri_francais(texte)[:255]
+
+
+def lettre_initiale(cle):
+    """Lettre kabiyè correspondant au premier caractère d'une clé de tri"""
+    return _LETTRE_PAR_CODE.get(cle[:1], '') if cle else ''
@@ -0,0 +1,155 @@
+# utils/compression.py
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# En dessous, les en-têtes de compression coûtent plus qu'ils ne rapportent
+SEUIL_COMPRESSION = int(os.getenv('SEUIL_COMPRESSION', 1024))
+
+# Volume maximal des corps compressés gardés en mémoire par processus
+CACHE_COMPRESSION_OCTETS = int(os.getenv('CACHE_COMPRESSION_OCTETS', 32 * 1024 * 1024))
+
+TYPES_COMPRESSIBLES = {'application/json', 'text/html', 'text/plain', 'application/x-ndjson'}
+
+# Niveaux modérés : le résultat est mis en cache, mais la première requête attend
+NIVEAU_GZIP = 6
+QUALITE_BROTLI = 5
+
+
+def encodage_accepte():
+    """Encodage retenu pour la requête courante : 'br', 'gzip' ou None"""
+    encodages = request.accept_encodings
+    if brotli is not None and encodages['br'] > 0:
+        return 'br'
+    if encodages['gzip'] > 0:
+        return 'gzip'
+    return None
+
+
+def _compresser(donnees, encodage):
+    if encodage == 'br':
+        return brotli.compress(donnees, quality=QUALITE_BROTLI)
+    return gzip.compress(donnees, compresslevel=NIVEAU_GZIP, mtime=0)
+
+
+class _CacheCompression:
+    """LRU des corps compressés, borné en octets"""
+
+    def __init__(self, capacite):
+        self.capacite = capacite
+        self.taille = 0
+        self.entrees = OrderedDict()
+        self.verrou = threading.Lock()
+
+    def lire(self, cle):
+        with self.verrou:
+            valeur = self.entrees.get(cle)
+            if valeur is not None:
+                self.entrees.move_to_end(cle)
+            return valeur
+
+    def ecrire(self, cle, valeur):
+        if len(valeur) > self.capacite // 4:
+            return
+        with self.verrou:
+            ancienne = self.entrees.pop(cle, None)
+            if ancienne is not None:
+                self.taille -= len(ancienne)
+            self.entrees[cle] = valeur
+            self.taille += len(valeur)
+            while self.taille > self.capacite:
+                _, sortie = self.entrees.popitem(last=False)
+                self.taille -= len(sortie)
+
+
+_cache = _CacheCompression(CACHE_COMPRESSION_OCTETS)
+
+_metriques = {
+    'reponses_compressees': 0,
+    'succes_cache': 0,
+    'octets_avant': 0,
+    'octets_apres': 0,
+    'secondes_compression': 0.0,
+}
+_verrou_metriques = threading.Lock()
+
+
+def metriques_compression():
+    """Compteurs du processus : réponses compressées, cache, taux et temps de compression"""
+    with _verrou_metriques:
+        metriques = dict(_metriques)
+    metriques['taux'] = round(metriques['octets_avant'] / metriques['octets_apres'], 2) \
+        if metriques['octets_apres'] else None
+    metriques['octets_cache'] = _cache.taille
+    return metriques
+
+
+def _compressible(reponse):
+    return (reponse.status_code == 200
+            and not reponse.direct_passthrough
+            and not reponse.is_streamed
+            and 'Content-Encoding' not in reponse.headers
+            and reponse.mimetype in TYPES_COMPRESSIBLES)
+
+
+def init_compression(app):
+    """Compresser à la volée les réponses JSON et HTML (gzip, ou brotli si installé).
+
+    Les corps compressés sont gardés par (encodage, ETag) : l'ETag de
+    conditionnel() résume déjà la route, les paramètres et la révision des
+    tables. Sans ETag, la clé est l'empreinte du corps lui-même.
+    """
+    @app.after_request
+    def compresser_reponse(reponse):
+        if not _compressible(reponse):
+            return reponse
+        reponse.vary.add('Accept-Encoding')
+        encodage = encodage_accepte()
+        if encodage is None or (reponse.content_length or 0) < SEUIL_COMPRESSION:
+            return reponse
+
+        donnees = reponse.get_data()
+        etag, faible = reponse.get_etag()
+        if etag:
+            cle = (encodage, etag)
+        else:
+            cle = (encodage, hashlib.blake2b(donnees, digest_size=16).digest())
+
+        debut = time.perf_counter()
+        compresse = _cache.lire(cle)
+        en_cache = compresse is not None
+        if not en_cache:
+            compresse = _compresser(donnees, encodage)
+            _cache.ecrire(cle, compresse)
+        duree = time.perf_counter() - debut
+
+        with _verrou_metriques:
+            _metriques['reponses_compressees'] += 1
+            _metriques['succes_cache'] += en_cache
+            _metriques['octets_avant'] += len(donnees)
+            _metriques['octets_apres'] += len(compresse)
+            _metriques['secondes_compression'] += duree
+
+        reponse.set_data(compresse)
+        reponse.headers['Content-Encoding'] = encodage
+        if etag and not faible:
+            # Un ETag fort désigne des octets précis : la variante compressée
+            # n'est équivalente que faiblement (comparaison faible de If-None-Match)
+            reponse.set_etag(etag, weak=True)
+        reponse.headers.add(
+            'Server-Timing',
+            f'compression;dur={duree * 1000:.2f};desc="{encodage} '
+            f'{len(donnees) / max(len(compresse), 1):.1f}x{" cache" if en_cache else ""}"'
+        )
+        return reponse
@@ -0,0 +1,139 @@
+# utils/export.py
+
+import json
+import zlib
+
+from flask import Response, request, stream_with_context
+from sqlalchemy import select
+
+from database import get_engine, a_colonnes
+
+# Lignes lues par aller-retour (curseur côté serveur sur PostgreSQL)
+TAILLE_LOT = 500
+
+# Taille approximative des morceaux envoyés au client
+TAILLE_MORCEAU = 64 * 1024
+
+FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def lire_par_lots(modele, taille_lot=TAILLE_LOT):
+    """Lignes de la table (mappings colonne -> valeur) par id croissant, sans tout charger.
+
+    Les colonnes absentes d'un ancien schéma sont simplement omises.
+    """
+    table = modele.__table__
+    colonnes = [colonne for colonne in table.columns if a_colonnes(table.name, colonne.name)]
+    with get_engine().connect() as connection:
+        resultat = connection.execution_options(yield_per=taille_lot).execute(
+            select(*colonnes).order_by(table.c.id)
+        )
+        for ligne in resultat:
+            yield ligne._mapping
+
+
+def _dumps(objet):
+    return json.dumps(objet, ensure_ascii=False, default=str)
+
+
+def morceaux_json(elements, format='json', dumps=_dumps):
+    """Texte du document, élément par élément : tableau JSON ou une ligne par élément"""
+    if format == 'ndjson':
+        for element in elements:
+            yield dumps(element) + '\n'
+        return
+    yield '['
+    premier = True
+    for element in elements:
+        if premier:
+            premier = False
+            yield dumps(element)
+        else:
+            yield ',' + dumps(element)
+    yield ']\n'
+
+
+def morceaux_fragments(fragments, format='json'):
+    """Même document à partir de fragments JSON déjà encodés (octets)"""
+    if format == 'ndjson':
+        for fragment in fragments:
+            yield fragment + b'\n'
+        return
+    yield b'['
+    premier = True
+    for fragment in fragments:
+        if premier:
+            premier = False
+            yield fragment
+        else:
+            yield b',' + fragment
+    yield b']\n'
+
+
+def _regrouper(morceaux, taille=TAILLE_MORCEAU):
+    """Encoder en UTF-8 et regrouper les petits morceaux (moins d'écritures WSGI)"""
+    tampon = []
+    longueur = 0
+    for morceau in morceaux:
+        donnees = morceau if isinstance(morceau, bytes) else morceau.encode('utf-8')
+        tampon.append(donnees)
+        longueur += len(donnees)
+        if longueur >= taille:
+            yield b''.join(tampon)
+            tampon = []
+            longueur = 0
+    if tampon:
+        yield b''.join(tampon)
+
+
+def _gzip(blocs, niveau=6):
+    compresseur = zlib.compressobj(niveau, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloc in blocs:
+        donnees = compresseur.compress(bloc)
+        if donnees:
+            yield donnees
+    yield compresseur.flush()
+
+
+def gzip_demande():
+    """Compresser si le client l'accepte, sauf ?gzip=0"""
+    return request.args.get('gzip', '1') != '0' and request.accept_encodings['gzip'] > 0
+
+
+def reponse_flux(elements, format='json', nom_fichier=None, dumps=_dumps, compresser=None):
+    """Réponse Flask générée au fil de l'eau : la mémoire du worker ne dépend pas du volume.
+
+    elements est un itérable de dicts (générateur de lignes, fiches de
+    l'instantané...) parcouru pendant l'envoi de la réponse.
+    """
+    return _reponse(morceaux_json(elements, format, dumps), format, nom_fichier, compresser)
+
+
+def reponse_fragments(fragments, format='json', nom_fichier=None, compresser=None):
+    """Comme reponse_flux(), pour des fragments déjà encodés (voir utils/serialisation.py)"""
+    return _reponse(morceaux_fragments(fragments, format), format, nom_fichier, compresser)
+
+
+def _reponse(morceaux, format, nom_fichier, compresser):
+    if compresser is None:
+        compresser = gzip_demande()
+    blocs = _regrouper(morceaux)
+    if compresser:
+        blocs = _gzip(blocs)
+
+    reponse = Response(stream_with_context(blocs), mimetype=FORMATS[format])
+    reponse.headers['Vary'] = 'Accept-Encoding'
+    if compresser:
+        reponse.headers['Content-Encoding'] = 'gzip'
+    if nom_fichier:
+        reponse.headers['Content-Disposition'] = f'attachment;filename={nom_fichier}'
+    return reponse
+
+
+def format_demande(defaut='json'):
+    """Format choisi par ?format= (json ou ndjson), None s'il est inconnu"""
+    format = request.args.get('format', defaut)
+    return format if format in FORMATS else None
@@ -0,0 +1,142 @@
+# utils/file_validation.py
+
+from urllib.parse import urlparse, parse_qs
+
+from flask import request, jsonify
+from sqlalchemy import func, false
+
+from database import get_session, a_colonnes, commence_par, projection, MotKabye, MotFrancais
+from utils.helpers import json_to_list
+from utils.normalisation import plier
+from utils.collation import ALPHABET_KABYE
+from utils.recherche import condition_recherche
+from utils.pagination import paginer, taille_page, CurseurInvalide
+
+
+def validateur_demande():
+    """Nom du validateur : paramètre ?validateur=, sinon celui de la page d'origine (Referer)"""
+    validateur = request.args.get('validateur', '')
+    if not validateur:
+        referrer = request.headers.get('Referer', '')
+        if referrer:
+            validateur = parse_qs(urlparse(referrer).query).get('validateur', [''])[0]
+    return validateur
+
+
+class FileValidation:
+    """File de travail des validateurs d'un dictionnaire.
+
+    Filtres (statut, lettre, contributeur, recherche), ordre alphabétique
+    (cle_tri, id) et pagination par clé sont tous exécutés en SQL ; le total
+    de la sélection est servi à part, pour ne pas recompter à chaque page.
+    """
+
+    def __init__(self, modele, champs):
+        self.modele = modele
+        self.champs = champs  # champs propres au dictionnaire, en tête de chaque ligne
+
+    def colonnes_validation(self):
+        return a_colonnes(self.modele.__tablename__, 'statut_validation', 'notes_validation', 'date_validation')
+
+    def requete(self, session, statut=None):
+        """Lignes de la file (colonnes COLONNES_FILE) filtrées selon les paramètres de la requête"""
+        modele = self.modele
+        statut = statut or request.args.get('statut', 'tous')
+        lettre = request.args.get('lettre', '')
+        contributeur = request.args.get('contributeur', '')
+        recherche = request.args.get('search', '')
+
+        query = session.query(*projection(modele, modele.COLONNES_FILE))
+
+        if lettre and lettre in ALPHABET_KABYE:
+            # Préfixe sur la clé pliée (indexée), 'kp' compris
+            query = query.filter(commence_par(modele.cle_pliee, plier(lettre)))
+
+        if self.colonnes_validation():
+            if statut == 'en_attente':
+                query = query.filter(
+                    (modele.statut_validation == 'en_attente') |
+                    (modele.statut_validation == None) |
+                    (modele.statut_validation == '')
+                )
+            elif statut in ('valide', 'a_reviser', 'rejete'):
+                query = query.filter(modele.statut_validation == statut)
+        else:
+            # Ancien schéma : un mot vérifié par quelqu'un compte comme validé,
+            # les statuts a_reviser et rejete n'existent pas
+            if statut == 'valide':
+                query = query.filter(modele.verifie_par != None)
+            elif statut == 'en_attente':
+                query = query.filter(modele.verifie_par == None)
+            elif statut in ('a_reviser', 'rejete'):
+                query = query.filter(false())
+
+        if contributeur and contributeur != 'tous':
+            query = query.filter(modele.verifie_par == contributeur)
+
+        if recherche:
+            # Index plein texte, sans limite : la pagination et le total portent
+            # sur tous les mots trouvés, toujours triés par cle_tri
+            query = query.filter(condition_recherche(session, modele, recherche))
+        return query
+
+    def ligne(self, mot, avec_statut=True):
+        resultat = {'id': mot.id}
+        for champ in self.champs:
+            valeur = getattr(mot, champ)
+            resultat[champ] = (valeur or '') if champ == 'api' else valeur
+        resultat.update({
+            'sens_multiple': json_to_list(mot.sens_multiple),
+            'exemple_usage': mot.exemple_usage or '',
+            'traduction_exemple': mot.traduction_exemple or '',
+            'categorie_grammaticale': mot.categorie_grammaticale or '',
+            'verifie_par': mot.verifie_par or '',
+        })
+        if avec_statut:
+            resultat['statut_validation'] = mot.statut_validation or 'en_attente'
+            resultat['notes_validation'] = mot.notes_validation or ''
+            resultat['date_validation'] = mot.date_validation.strftime("%Y-%m-%d") if mot.date_validation else ''
+        else:
+            resultat['statut_validation'] = 'valide' if mot.verifie_par else 'en_attente'
+            resultat['notes_validation'] = ''
+            resultat['date_validation'] = mot.date_modification.strftime("%Y-%m-%d") if mot.date_modification else ''
+        return resultat
+
+    def reponse_page(self):
+        """Avec ?limite= ou ?curseur= : {mots, next_cursor, prev_cursor} ; sans, toute la sélection"""
+        limite = request.args.get('limite', type=int)
+        curseur = request.args.get('curseur')
+        session = get_session()
+        try:
+            avec_statut = self.colonnes_validation()
+            query = self.requete(session)
+            if limite or curseur:
+                page = paginer(query, self.modele, 'alpha', curseur, taille_page(limite))
+                return jsonify({'mots': [self.ligne(mot, avec_statut) for mot in page.elements],
+                                **page.curseurs()})
+            # Ordre alphabétique calculé à l'écriture (colonne cle_tri indexée)
+            mots = query.order_by(self.modele.cle_tri, self.modele.id).all()
+            return jsonify([self.ligne(mot, avec_statut) for mot in mots])
+        except CurseurInvalide as e:
+            return jsonify({'error': str(e)}), 400
+        except Exception as e:
+            print(f"Erreur dans mots_a_valider: {e}")
+            return jsonify({'error': str(e), 'details': 'Erreur serveur lors du filtrage'}), 500
+        finally:
+            session.close()
+
+    def reponse_total(self):
+        """{total} : nombre de mots de la sélection, en un COUNT"""
+        session = get_session()
+        try:
+            total = self.requete(session).with_entities(func.count(self.modele.id)).scalar()
+            return jsonify({'total': total})
+        except Exception as e:
+            print(f"Erreur dans total_a_valider: {e}")
+            return jsonify({'error': str(e)}), 500
+        finally:
+            session.close()
+
+
+FILE_KABYE = FileValidation(MotKabye, ('mot_kabye', 'api', 'traduction_francaise'))
+FILE_FRANCAIS = FileValidation(MotFrancais, ('mot_francais', 'traduction_kabye'))
@@ -0,0 +1,129 @@
+# utils/instantane.py
+
+import threading
+
+from sqlalchemy import select
+
+from database import get_engine, a_colonnes, abonner_modifications, revision_dictionnaire, MotKabye, MotFrancais
+from utils.helpers import json_to_list
+from utils.normalisation import normaliser
+from utils.pagination import cle_ordre
+
+# Colonnes calculées, inutiles aux routes de lecture
+_COLONNES_INTERNES = {'cle_pliee', 'cle_squelette', 'glose_squelette'}
+
+
+class _Fiche:
+    """Ligne figée d'un dictionnaire : colonnes en attributs, champs listes déjà décodés"""
+    __slots__ = ()
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.id}>'
+
+
+def _classe_fiche(modele):
+    champs = tuple(
+        attribut.key for attribut in modele.__mapper__.column_attrs
+        if attribut.key not in _COLONNES_INTERNES
+    )
+    return type(f'Fiche{modele.__name__}', (_Fiche,), {'__slots__': champs, 'CHAMPS': champs})
+
+
+FICHES = {modele: _classe_fiche(modele) for modele in (MotKabye, MotFrancais)}
+
+
+class Instantane:
+    """Copie en lecture seule d'une table à une révision donnée.
+
+    Les fiches ne sont jamais modifiées : une écriture produit un nouvel
+    instantané qui remplace l'ancien d'une seule affectation.
+    """
+
+    __slots__ = ('table', 'revision', 'fiches', 'par_id', 'par_vedette', '_ordres')
+
+    def __init__(self, table, revision, fiches):
+        self.table = table
+        self.revision = revision
+        self.fiches = tuple(fiches)  # par id croissant
+        self.par_id = {fiche.id: fiche for fiche in self.fiches}
+        par_vedette = {}
+        for fiche in self.fiches:
+            if fiche.cle_recherche:
+                par_vedette.setdefault(fiche.cle_recherche, []).append(fiche)
+        self.par_vedette = {cle: tuple(liste) for cle, liste in par_vedette.items()}
+        self._ordres = {}
+
+    def mot(self, mot_id):
+        return self.par_id.get(mot_id)
+
+    def vedette(self, texte):
+        """Fiches dont la vedette est exactement ce texte (casse et forme Unicode ignorées)"""
+        return self.par_vedette.get(normaliser(texte)[:255], ())
+
+    def ordre(self, nom):
+        """(clés croissantes, fiches dans le même ordre), calculées au premier usage"""
+        resultat = self._ordres.get(nom)
+        if resultat is None:
+            triees = sorted(self.fiches, key=lambda fiche: cle_ordre(fiche, nom))
+            resultat = ([cle_ordre(fiche, nom) for fiche in triees], triees)
+            self._ordres[nom] = resultat
+        return resultat
+
+    def __len__(self):
+        return len(self.fiches)
+
+
+def charger_fiches(modele, connection, ids=None):
+    """Fiches de la table par id croissant (seulement ces ids si précisés)"""
+    classe = FICHES[modele]
+    table = modele.__tablename__
+    # Sur un ancien schéma, les colonnes absentes restent à None
+    presentes = [champ for champ in classe.CHAMPS if a_colonnes(table, champ)]
+    absentes = [champ for champ in classe.CHAMPS if champ not in presentes]
+    listes = set(modele.CHAMPS_LISTES)
+    requete = select(*(getattr(modele, champ) for champ in presentes)).order_by(modele.id)
+    if ids is not None:
+        requete = requete.where(modele.id.in_(ids))
+    fiches = []
+    for ligne in connection.execute(requete):
+        fiche = classe.__new__(classe)
+        for champ in absentes:
+            setattr(fiche, champ, None)
+        for champ, valeur in zip(presentes, ligne):
+            setattr(fiche, champ, json_to_list(valeur) if champ in listes else valeur)
+        fiches.append(fiche)
+    return fiches
+
+
+def _construire(modele, revision):
+    with get_engine().connect() as connection:
+        fiches = charger_fiches(modele, connection)
+    return Instantane(modele.__tablename__, revision, fiches)
+
+
+_instantanes = {}
+_perimes = set()
+_verrou = threading.Lock()
+
+
+@abonner_modifications
+def _perimer(tables):
+    _perimes.update(tables)
+
+
+def instantane(modele):
+    """Instantané courant de la table, reconstruit si sa révision a changé"""
+    table = modele.__tablename__
+    revision = revision_dictionnaire(table)
+    courant = _instantanes.get(table)
+    if courant is not None and courant.revision == revision and table not in _perimes:
+        return courant
+    with _verrou:
+        courant = _instantanes.get(table)
+        if courant is None or courant.revision != revision or table in _perimes:
+            # Lire la révision avant les lignes : au pire l'instantané est plus
+            # récent que sa révision et sera reconstruit une fois de trop
+            _perimes.discard(table)
+            courant = _construire(modele, revision)
+            _instantanes[table] = courant
+    return courant
@@ -0,0 +1,72 @@
+# utils/lots.py
+
+from flask import request, jsonify
+
+from utils.instantane import instantane
+
+# Ids et vedettes acceptés par requête
+TAILLE_LOT_MAX = 100
+
+
+class LotInvalide(ValueError):
+    pass
+
+
+def lire_lot():
+    """(ids, vedettes) du corps JSON {"ids": [...], "mots": [...]}, sans doublons et dans l'ordre"""
+    donnees = request.get_json(silent=True)
+    if not isinstance(donnees, dict):
+        raise LotInvalide("Corps JSON attendu : {\"ids\": [...], \"mots\": [...]}")
+    ids = donnees.get('ids') or []
+    vedettes = donnees.get('mots') or []
+    if not isinstance(ids, list) or not isinstance(vedettes, list):
+        raise LotInvalide("ids et mots doivent être des listes")
+    try:
+        ids = list(dict.fromkeys(int(mot_id) for mot_id in ids))
+    except (TypeError, ValueError):
+        raise LotInvalide("ids doit contenir des entiers")
+    if not all(isinstance(vedette, str) for vedette in vedettes):
+        raise LotInvalide("mots doit contenir des chaînes")
+    vedettes = list(dict.fromkeys(vedettes))
+    if len(ids) + len(vedettes) > TAILLE_LOT_MAX:
+        raise LotInvalide(f"Au plus {TAILLE_LOT_MAX} ids et mots par requête")
+    return ids, vedettes
+
+
+def repondre_lot(modele, serialiser):
+    """Réponse d'une route /batch : les fiches demandées, lues dans l'instantané.
+
+    {mots: {id: fiche}, vedettes: {mot: [ids]}, manquants: {ids, mots}} ;
+    une vedette peut désigner plusieurs entrées (homographes).
+    """
+    try:
+        ids, vedettes = lire_lot()
+    except LotInvalide as e:
+        return jsonify({'error': str(e)}), 400
+
+    mots = instantane(modele)
+    fiches = {}
+    manquants = []
+    for mot_id in ids:
+        fiche = mots.mot(mot_id)
+        if fiche is None:
+            manquants.append(mot_id)
+        else:
+            fiches[mot_id] = fiche
+    par_vedette = {}
+    vedettes_manquantes = []
+    for vedette in vedettes:
+        trouvees = mots.vedette(vedette)
+        if trouvees:
+            par_vedette[vedette] = [fiche.id for fiche in trouvees]
+            for fiche in trouvees:
+                fiches.setdefault(fiche.id, fiche)
+        else:
+            vedettes_manquantes.append(vedette)
+
+    return jsonify({
+        'mots': {str(mot_id): serialiser(fiche) for mot_id, fiche in fiches.items()},
+        'vedettes': par_vedette,
+        'manquants': {'ids': manquants, 'mots': vedettes_manquantes},
+        'revision': mots.revision,
+    })
@@ -0,0 +1,43 @@
+# utils/normalisation.py
+
+import unicodedata
+
+# Le tilde de « ñ » fait partie de la lettre, ce n'est pas un ton
+TILDE = '̃'
+
+
+def normaliser(texte):
+    """Forme canonique pour la recherche exacte : NFC, casse repliée, espaces réduits"""
+    if not texte:
+        return ''
+    texte = unicodedata.normalize('NFC', str(texte)).casefold()
+    return ' '.join(texte.split())
+
+
+def plier(texte):
+    """Clé pliée : normaliser() sans les tons ni les accents (é → e, ɛ́ → ɛ), en gardant ñ"""
+    decompose = unicodedata.normalize('NFD', normaliser(texte))
+    resultat = []
+    base = ''
+    for caractere in decompose:
+        if unicodedata.combining(caractere):
+            if caractere == TILDE and base == 'n':
+                resultat.append(caractere)
+            continue
+        base = caractere
+        resultat.append(caractere)
+    return unicodedata.normalize('NFC', ''.join(resultat))
+
+
+# Transcription des lettres kabiyè vers l'ASCII, telle que les tapent les
+# utilisateurs sans clavier adapté (e pour ɛ, o pour ɔ, n pour ŋ...)
+_SQUELETTE = str.maketrans({
+    'ɖ': 'd', 'ɛ': 'e', 'ɣ': 'g', 'ɩ': 'i', 'ŋ': 'n', 'ɔ': 'o', 'ʋ': 'u', 'ñ': 'n',
+    'œ': 'oe', 'æ': 'ae',
+})
+
+
+def squelette(texte):
+    """Clé approximative : pliée, lettres kabiyè transcrites, ponctuation retirée"""
+    texte = plier(texte).translate(_SQUELETTE)
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in texte).split())
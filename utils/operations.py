@@ -0,0 +1,180 @@
+# utils/operations.py
+
+from datetime import datetime
+
+from flask import request, jsonify
+from sqlalchemy import select, update, delete
+
+from database import get_session, noter_modifications
+from utils.baux import baux_disponibles, baux_actifs, liberer
+from utils.helpers import supprimer_image_cloudinary
+
+# Ids acceptés par opération (une seule transaction)
+TAILLE_OPERATION_MAX = 500
+
+OPERATIONS = ('statut', 'categorie', 'verificateur', 'supprimer')
+STATUTS = ('valide', 'en_attente', 'a_reviser', 'rejete')
+
+
+class OperationInvalide(ValueError):
+    pass
+
+
+def _texte(donnees, cle):
+    valeur = donnees.get(cle)
+    if valeur is not None and not isinstance(valeur, str):
+        raise OperationInvalide(f"{cle} doit être une chaîne")
+    return valeur
+
+
+def lire_operation(file, validateur):
+    """(operation, ids, versions, valeurs) du corps JSON.
+
+    {"operation": "statut", "valeur": "valide", "notes": "..."}
+    {"operation": "categorie", "categorie": "nom", "sous_categorie": "..."}
+    {"operation": "verificateur", "valeur": "Benjamin"}
+    {"operation": "supprimer"}
+    avec "ids": [...] et, facultatif, "versions": {id: version lue}.
+    valeurs : colonnes affectées aux mots retenus (vide pour une suppression).
+    """
+    donnees = request.get_json(silent=True)
+    if not isinstance(donnees, dict):
+        raise OperationInvalide("Corps JSON attendu : {\"operation\": ..., \"ids\": [...]}")
+    operation = donnees.get('operation')
+    if operation not in OPERATIONS:
+        raise OperationInvalide(f"operation doit valoir {', '.join(OPERATIONS)}")
+
+    ids = donnees.get('ids')
+    if not isinstance(ids, list) or not ids:
+        raise OperationInvalide("ids doit être une liste non vide")
+    try:
+        ids = list(dict.fromkeys(int(mot_id) for mot_id in ids))
+        versions = {int(mot_id): int(version) for mot_id, version in (donnees.get('versions') or {}).items()
+                    if version not in (None, '')}
+    except (TypeError, ValueError, AttributeError):
+        raise OperationInvalide("ids et versions doivent contenir des entiers")
+    if len(ids) > TAILLE_OPERATION_MAX:
+        raise OperationInvalide(f"Au plus {TAILLE_OPERATION_MAX} ids par opération")
+
+    maintenant = datetime.now()
+    valeurs = {}
+    if operation == 'statut':
+        statut = donnees.get('valeur')
+        if statut not in STATUTS:
+            raise OperationInvalide(f"valeur doit valoir {', '.join(STATUTS)}")
+        if file.colonnes_validation():
+            valeurs = {'statut_validation': statut, 'date_validation': maintenant, 'verifie_par': validateur}
+            if 'notes' in donnees:
+                valeurs['notes_validation'] = _texte(donnees, 'notes') or ''
+        elif statut in ('valide', 'en_attente'):
+            # Ancien schéma : seul verifie_par distingue un mot validé
+            valeurs = {'verifie_par': validateur if statut == 'valide' else None}
+        else:
+            raise OperationInvalide("Statut indisponible avant la migration des colonnes de validation")
+    elif operation == 'categorie':
+        if 'categorie' in donnees:
+            valeurs['categorie_grammaticale'] = _texte(donnees, 'categorie')
+        if 'sous_categorie' in donnees:
+            valeurs['sous_categorie'] = _texte(donnees, 'sous_categorie')
+        if not valeurs:
+            raise OperationInvalide("categorie ou sous_categorie attendu")
+    elif operation == 'verificateur':
+        valeurs = {'verifie_par': _texte(donnees, 'valeur') or None}
+    if valeurs:
+        valeurs['date_modification'] = maintenant
+    return operation, ids, versions, valeurs
+
+
+def appliquer(session, modele, validateur, operation, ids, versions, valeurs):
+    """Appliquer l'opération aux mots en quelques requêtes ensemblistes.
+
+    Les mots absents, réservés par un autre validateur ou dont la version a
+    changé depuis la lecture sont écartés ; les autres sont modifiés (ou
+    supprimés avec leurs valeurs) par un seul UPDATE / DELETE ... WHERE id IN.
+    Le journal et la révision sont mis à jour une fois pour toute l'opération.
+    Retourne (resultats {id: statut}, versions nouvelles, images à supprimer).
+    """
+    table = modele.__table__
+    connection = session.connection()
+    dialecte = connection.dialect.name
+    if dialecte == 'sqlite':
+        # Verrou d'écriture dès la lecture : les versions lues restent exactes jusqu'au commit
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+    lignes = select(table.c.id, table.c.version, table.c.image_url).where(table.c.id.in_(ids))
+    if dialecte == 'postgresql':
+        lignes = lignes.with_for_update()
+    existants = {ligne.id: ligne for ligne in session.execute(lignes)}
+    reserves = baux_actifs(session, modele) if baux_disponibles() else {}
+
+    resultats = {}
+    retenus = []
+    for mot_id in ids:
+        ligne = existants.get(mot_id)
+        if ligne is None:
+            resultats[mot_id] = 'introuvable'
+        elif reserves.get(mot_id, validateur) != validateur:
+            resultats[mot_id] = 'reserve'
+        elif mot_id in versions and versions[mot_id] != ligne.version:
+            resultats[mot_id] = 'conflit'
+        else:
+            resultats[mot_id] = 'ok'
+            retenus.append(mot_id)
+    if not retenus:
+        return resultats, {}, []
+
+    if operation == 'supprimer':
+        # Les valeurs d'abord : la cascade de la clé étrangère n'est pas active sous SQLite
+        valeurs_mots = modele.__mapper__.relationships['valeurs'].mapper.local_table
+        session.execute(delete(valeurs_mots).where(valeurs_mots.c.mot_id.in_(retenus)))
+        session.execute(delete(table).where(table.c.id.in_(retenus)))
+        nouvelles_versions = {}
+        images = [existants[mot_id].image_url for mot_id in retenus if existants[mot_id].image_url]
+    else:
+        session.execute(
+            update(table).where(table.c.id.in_(retenus))
+            .values(**valeurs, version=table.c.version + 1)
+        )
+        nouvelles_versions = {mot_id: existants[mot_id].version + 1 for mot_id in retenus}
+        images = []
+
+    if reserves:
+        liberer(session, modele, validateur, retenus)
+    journal = 'delete' if operation == 'supprimer' else 'update'
+    noter_modifications(session, {table.name: [(mot_id, journal) for mot_id in retenus]})
+    return resultats, nouvelles_versions, images
+
+
+def repondre_operation(file, validateur):
+    """{success, resultats: {id: ok|introuvable|reserve|conflit}, modifies, versions, revision}"""
+    modele = file.modele
+    try:
+        operation, ids, versions, valeurs = lire_operation(file, validateur)
+    except OperationInvalide as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    session = get_session()
+    try:
+        resultats, nouvelles_versions, images = appliquer(
+            session, modele, validateur, operation, ids, versions, valeurs)
+        revision = session.info.get('revisions_transaction', {}).get(modele.__tablename__)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"Erreur dans operations_en_masse: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+    finally:
+        session.close()
+
+    # Comme pour une suppression unitaire ; une image orpheline n'annule pas l'opération
+    for image_url in images:
+        supprimer_image_cloudinary(image_url)
+
+    return jsonify({
+        'success': True,
+        'operation': operation,
+        'resultats': {str(mot_id): resultat for mot_id, resultat in resultats.items()},
+        'modifies': sum(1 for resultat in resultats.values() if resultat == 'ok'),
+        'versions': {str(mot_id): version for mot_id, version in nouvelles_versions.items()},
+        'revision': revision,
+    })
@@ -0,0 +1,193 @@
+# utils/pagination.py
+
+import base64
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+from urllib.parse import urlencode
+
+from flask import request
+from sqlalchemy import tuple_, literal, literal_column, func
+
+TAILLE_PAGE = 50
+TAILLE_MAX = 500
+
+# Lignes par page des listes HTML (/mots, /francais/mots_francais)
+TAILLE_PAGE_LISTE = 100
+
+
+class CurseurInvalide(ValueError):
+    pass
+
+
+# Ordres de parcours proposés : (noms des champs), sens commun, et valeurs
+# remplaçant NULL, en mémoire comme en SQL (COALESCE) : une ligne sans date
+# ou sans clé de tri se range en tête et la borne d'un curseur n'est jamais
+# NULL. Chaque ordre se termine par l'id pour être total, et correspond à un
+# index composite sur les mêmes expressions (voir migration.py).
+ORDRES = {
+    'recents': (('date_modification', 'id'), True, (datetime.min, 0)),
+    'alpha': (('cle_tri', 'id'), False, ('', 0)),
+}
+
+
+def _litteral_sql(valeur):
+    if isinstance(valeur, datetime):
+        # Format des dates stockées par SQLite, lu tel quel par PostgreSQL
+        valeur = f"{valeur.year:04d}-{valeur:%m-%d %H:%M:%S.%f}"
+    return "'" + valeur.replace("'", "''") + "'"
+
+
+def sans_null(colonne, defaut):
+    """COALESCE(colonne, defaut), defaut écrit en clair pour correspondre aux index d'expression"""
+    return func.coalesce(colonne, literal_column(_litteral_sql(defaut), colonne.type))
+
+
+def colonnes_ordre(modele, ordre):
+    """Expressions SQL de l'ordre, NULL remplacé comme dans cle_ordre()"""
+    noms, _, defauts = ORDRES[ordre]
+    return [getattr(modele, nom) if nom == 'id' else sans_null(getattr(modele, nom), defaut)
+            for nom, defaut in zip(noms, defauts)]
+
+
+def _encoder_valeur(valeur):
+    if isinstance(valeur, datetime):
+        return {'d': valeur.isoformat()}
+    return valeur
+
+
+def _decoder_valeur(valeur):
+    if isinstance(valeur, dict):
+        return datetime.fromisoformat(valeur['d'])
+    return valeur
+
+
+def encoder_curseur(ordre, sens, valeurs):
+    """Curseur opaque : ordre, sens ('>' page suivante, '<' précédente) et clé de la ligne limite"""
+    charge = json.dumps([ordre, sens, [_encoder_valeur(v) for v in valeurs]],
+                        ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(charge.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decoder_curseur(curseur, ordre):
+    try:
+        charge = base64.urlsafe_b64decode(curseur + '=' * (-len(curseur) % 4))
+        nom, sens, valeurs = json.loads(charge)
+        valeurs = [_decoder_valeur(v) for v in valeurs]
+    except (ValueError, TypeError, KeyError):
+        raise CurseurInvalide("Curseur de pagination illisible")
+    if nom != ordre or sens not in ('>', '<') or len(valeurs) != len(ORDRES[ordre][0]):
+        raise CurseurInvalide("Curseur de pagination incompatible avec cet ordre")
+    return sens, valeurs
+
+
+class Page:
+    __slots__ = ('elements', 'next_cursor', 'prev_cursor')
+
+    def __init__(self, elements, next_cursor, prev_cursor):
+        self.elements = elements
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    def curseurs(self):
+        return {'next_cursor': self.next_cursor, 'prev_cursor': self.prev_cursor}
+
+
+def url_page(curseur):
+    """Lien vers la requête courante avec un autre curseur (None si pas de page)"""
+    if curseur is None:
+        return None
+    parametres = request.args.to_dict()
+    parametres['curseur'] = curseur
+    return f"{request.path}?{urlencode(parametres)}"
+
+
+def taille_page(valeur, defaut=TAILLE_PAGE):
+    return min(max(valeur or defaut, 1), TAILLE_MAX)
+
+
+def paginer(query, modele, ordre='recents', curseur=None, taille=TAILLE_PAGE):
+    """Page de la requête après (ou avant) le curseur, par clé et non par décalage.
+
+    Chaque page lit au plus taille + 1 lignes, quelle que soit sa position.
+    Lève CurseurInvalide si le curseur ne correspond pas à l'ordre demandé.
+    """
+    descendant = ORDRES[ordre][1]
+    colonnes = colonnes_ordre(modele, ordre)
+    sens, valeurs = decoder_curseur(curseur, ordre) if curseur else ('>', None)
+
+    # En arrière, on parcourt l'ordre inverse puis on remet la page à l'endroit
+    inverse = sens == '<'
+    if valeurs is not None:
+        # Valeurs typées comme les colonnes (format des dates stockées par SQLite)
+        cle = tuple_(*colonnes)
+        borne = tuple_(*(literal(valeur, colonne.type) for colonne, valeur in zip(colonnes, valeurs)))
+        query = query.filter(cle < borne if descendant != inverse else cle > borne)
+    if descendant != inverse:
+        query = query.order_by(*(colonne.desc() for colonne in colonnes))
+    else:
+        query = query.order_by(*colonnes)
+
+    elements = query.limit(taille + 1).all()
+    encore = len(elements) > taille
+    elements = elements[:taille]
+    if inverse:
+        elements.reverse()
+
+    def cle_de(element):
+        return cle_ordre(element, ordre)
+
+    suivant = precedent = None
+    if elements:
+        if encore or inverse:
+            suivant = encoder_curseur(ordre, '>', cle_de(elements[-1]))
+        if (encore and inverse) or (valeurs is not None and not inverse):
+            precedent = encoder_curseur(ordre, '<', cle_de(elements[0]))
+    return Page(elements, suivant, precedent)
+
+
+def cle_ordre(element, ordre):
+    """Clé de tri en mémoire d'un élément (NULL remplacé par une valeur comparable)"""
+    noms, _, defauts = ORDRES[ordre]
+    return tuple(
+        defaut if valeur is None else valeur
+        for valeur, defaut in zip((getattr(element, nom) for nom in noms), defauts)
+    )
+
+
+def paginer_trie(cles, elements, ordre='recents', curseur=None, taille=TAILLE_PAGE):
+    """Même pagination que paginer(), sur des éléments déjà triés en mémoire.
+
+    cles est la liste croissante des cle_ordre() et elements la liste
+    parallèle ; la borne du curseur est retrouvée par dichotomie.
+    """
+    descendant = ORDRES[ordre][1]
+    n = len(cles)
+    sens, valeurs = decoder_curseur(curseur, ordre) if curseur else ('>', None)
+
+    # Positions dans l'ordre demandé (l'ordre inverse des listes si descendant)
+    if valeurs is None:
+        debut = 0
+        fin = min(taille, n)
+    elif sens == '>':
+        cle = tuple(valeurs)
+        debut = n - bisect_left(cles, cle) if descendant else bisect_right(cles, cle)
+        fin = min(debut + taille, n)
+    else:
+        cle = tuple(valeurs)
+        fin = n - bisect_right(cles, cle) if descendant else bisect_left(cles, cle)
+        debut = max(fin - taille, 0)
+
+    if descendant:
+        page = [elements[n - 1 - i] for i in range(debut, fin)]
+    else:
+        page = elements[debut:fin]
+
+    suivant = precedent = None
+    if page:
+        if fin < n:
+            suivant = encoder_curseur(ordre, '>', cle_ordre(page[-1], ordre))
+        if debut > 0:
+            precedent = encoder_curseur(ordre, '<', cle_ordre(page[0], ordre))
+    return Page(page, suivant, precedent)
@@ -0,0 +1,153 @@
+# utils/recherche.py
+
+import re
+
+from sqlalchemy import text, or_, false, column, Integer
+
+from database import a_colonnes, a_table, correspondance_valeurs
+
+# Champs indexés en plein texte et leur poids dans le classement.
+# Sur PostgreSQL chaque champ reçoit une des classes de poids A-D.
+CHAMPS_FTS = {
+    'mots_kabye': [
+        ('mot_kabye', 10.0, 'A'),
+        ('variantes_orthographiques', 6.0, 'A'),
+        ('synonymes', 4.0, 'A'),
+        ('traduction_francaise', 5.0, 'B'),
+        ('sens_multiple', 3.0, 'B'),
+        ('api', 2.0, 'C'),
+        ('exemple_usage', 1.0, 'D'),
+    ],
+    'mots_francais': [
+        ('mot_francais', 10.0, 'A'),
+        ('variantes_orthographiques', 6.0, 'A'),
+        ('synonymes', 4.0, 'A'),
+        ('traduction_kabye', 5.0, 'B'),
+        ('sens_multiple', 3.0, 'B'),
+        ('exemple_usage', 1.0, 'D'),
+    ],
+}
+
+# Groupes de champs proposés dans les formulaires de recherche (paramètre « champ »)
+GROUPES_CHAMPS = {
+    'mots_kabye': {
+        'kabye': ['mot_kabye', 'variantes_orthographiques', 'synonymes'],
+        'francais': ['traduction_francaise', 'sens_multiple'],
+    },
+    'mots_francais': {
+        'francais': ['mot_francais', 'variantes_orthographiques', 'synonymes'],
+        'kabye': ['traduction_kabye', 'sens_multiple'],
+    },
+}
+
+LIMITE_RESULTATS = 200
+
+_MOTS = re.compile(r'\w+', re.UNICODE)
+
+
+def table_fts(table):
+    return f'{table}_fts'
+
+
+def recherche_plein_texte_disponible(table, dialecte):
+    """L'index plein texte a-t-il été créé par les migrations ?"""
+    if dialecte == 'sqlite':
+        return a_table(table_fts(table))
+    if dialecte == 'postgresql':
+        return a_colonnes(table, 'recherche_tsv')
+    return False
+
+
+def _champs(table, champs):
+    tous = [nom for nom, _, _ in CHAMPS_FTS[table]]
+    if not champs:
+        return tous
+    return [nom for nom in tous if nom in champs]
+
+
+def _requete_fts5(table, mots, champs):
+    # Chaque mot est cité (aucune syntaxe FTS5 possible) et cherché par préfixe
+    expression = ' '.join(f'"{mot}"*' for mot in mots)
+    return f"{{{' '.join(champs)}}} : ({expression})"
+
+
+def _requete_tsquery(table, mots, champs):
+    poids = ''.join(sorted({classe for nom, _, classe in CHAMPS_FTS[table] if nom in champs}))
+    return ' & '.join(f'{mot}:*{poids}' for mot in mots)
+
+
+def _condition_repli(modele, terme, champs):
+    """Sans index plein texte : sous-chaîne sur les colonnes texte, préfixe indexé sur les champs listes"""
+    motif = f"%{terme.strip()}%"
+    listes = [nom for nom in champs if nom in modele.CHAMPS_LISTES]
+    conditions = [getattr(modele, nom).ilike(motif) for nom in champs if nom not in modele.CHAMPS_LISTES]
+    if listes:
+        conditions.append(correspondance_valeurs(modele, listes, terme))
+    return or_(*conditions)
+
+
+def rechercher_ids(session, modele, terme, champs=None, limite=LIMITE_RESULTATS):
+    """Ids des mots correspondant au terme, du plus pertinent au moins pertinent.
+
+    Passe par FTS5 (SQLite) ou le tsvector pondéré (PostgreSQL) ; sans index
+    plein texte, se rabat sur une recherche ILIKE limitée au même nombre de mots.
+    """
+    table = modele.__tablename__
+    mots = _MOTS.findall(terme or '')
+    if not mots:
+        return []
+    champs = _champs(table, champs)
+    dialecte = session.get_bind().dialect.name
+
+    if recherche_plein_texte_disponible(table, dialecte):
+        if dialecte == 'sqlite':
+            fts = table_fts(table)
+            poids = ', '.join(str(p) for _, p, _ in CHAMPS_FTS[table])
+            sql = (f"SELECT rowid FROM {fts} WHERE {fts} MATCH :requete "
+                   f"ORDER BY bm25({fts}, {poids}) LIMIT :limite")
+            parametres = {'requete': _requete_fts5(table, mots, champs), 'limite': limite}
+        else:
+            sql = (f"SELECT id FROM {table} "
+                   f"WHERE recherche_tsv @@ to_tsquery('simple', :requete) "
+                   f"ORDER BY ts_rank(recherche_tsv, to_tsquery('simple', :requete), 1) DESC, id "
+                   f"LIMIT :limite")
+            parametres = {'requete': _requete_tsquery(table, mots, champs), 'limite': limite}
+        return [ligne[0] for ligne in session.execute(text(sql), parametres)]
+
+    requete = session.query(modele.id).filter(_condition_repli(modele, terme, champs)) \
+        .order_by(modele.cle_tri).limit(limite)
+    return [ligne.id for ligne in requete]
+
+
+def condition_recherche(session, modele, terme, champs=None):
+    """Condition SQL : le mot correspond au terme, sans limite ni classement.
+
+    Même correspondance que rechercher_ids(), à combiner avec les autres
+    filtres d'une requête paginée ou comptée (file de validation) : tous les
+    mots trouvés restent dans la sélection.
+    """
+    table = modele.__tablename__
+    mots = _MOTS.findall(terme or '')
+    if not mots:
+        return false()
+    champs = _champs(table, champs)
+    dialecte = session.get_bind().dialect.name
+
+    if recherche_plein_texte_disponible(table, dialecte):
+        if dialecte == 'sqlite':
+            fts = table_fts(table)
+            return modele.id.in_(
+                text(f"SELECT rowid FROM {fts} WHERE {fts} MATCH :requete_fts")
+                .bindparams(requete_fts=_requete_fts5(table, mots, champs))
+                .columns(column('rowid', Integer))
+            )
+        return text(f"{table}.recherche_tsv @@ to_tsquery('simple', :requete_fts)") \
+            .bindparams(requete_fts=_requete_tsquery(table, mots, champs))
+
+    return _condition_repli(modele, terme, champs)
+
+
+def ordonner_selon(mots, ids):
+    """Remettre des objets chargés par id IN (...) dans l'ordre de pertinence"""
+    rang = {mot_id: position for position, mot_id in enumerate(ids)}
+    return sorted(mots, key=lambda mot: rang.get(mot.id, len(rang)))
@@ -0,0 +1,128 @@
+# utils/serialisation.py
+
+import json
+from datetime import datetime
+
+from flask import Response, jsonify
+
+from database import abonner_modifications, MotKabye, MotFrancais
+from utils.instantane import charger_fiches
+
+FORMAT_DATE = "%Y-%m-%d %H:%M:%S"
+
+
+def _date(valeur):
+    return valeur.strftime(FORMAT_DATE) if valeur else ''
+
+
+class Serialiseur:
+    """Représentation JSON publique des fiches d'un modèle.
+
+    Chaque fiche est encodée une seule fois en octets UTF-8 par version de
+    ligne ; les listes et les exports sont des concaténations de ces
+    fragments. Un commit qui modifie une entrée oublie ses fragments.
+    """
+
+    def __init__(self, modele, champs, champs_validation):
+        self.modele = modele
+        self.champs = champs
+        self.champs_validation = champs_validation
+        self._fragments = {}  # (statut, id) -> (version, octets)
+
+    def en_dict(self, mot, statut=True):
+        """Champs publics (et de validation si statut), dates en texte"""
+        resultat = {champ: getattr(mot, champ) for champ in self.champs}
+        if statut:
+            for champ in self.champs_validation:
+                valeur = getattr(mot, champ)
+                resultat[champ] = _date(valeur) if isinstance(valeur, datetime) else valeur
+        else:
+            resultat['verifie_par'] = mot.verifie_par
+        resultat['date_ajout'] = _date(mot.date_ajout)
+        resultat['date_modification'] = _date(mot.date_modification)
+        return resultat
+
+    def noms(self, statut=True):
+        """Clés produites par en_dict(), dans l'ordre"""
+        return self.champs + (self.champs_validation if statut else ('verifie_par',)) \
+            + ('date_ajout', 'date_modification')
+
+    def fragment(self, mot, statut=True):
+        """Octets JSON de la fiche, encodés au premier usage pour cette version de la ligne"""
+        cle = (statut, mot.id)
+        version = mot.version
+        entree = self._fragments.get(cle)
+        if entree is None or entree[0] != version:
+            octets = json.dumps(self.en_dict(mot, statut), ensure_ascii=False,
+                                separators=(',', ':')).encode('utf-8')
+            entree = (version, octets)
+            self._fragments[cle] = entree
+        return entree[1]
+
+    def fragments(self, mots, statut=True):
+        for mot in mots:
+            yield self.fragment(mot, statut)
+
+    def liste(self, mots, statut=True):
+        """Tableau JSON des fiches (octets)"""
+        return b'[' + b','.join(self.fragments(mots, statut)) + b']'
+
+    def reponse(self, mot, statut=True):
+        return Response(self.fragment(mot, statut), mimetype='application/json')
+
+    def reponse_liste(self, mots, cle='mots', statut=True, **autres):
+        """Réponse {cle: [fiches], **autres} assemblée à partir des fragments"""
+        suite = json.dumps(autres, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        corps = b'{' + json.dumps(cle).encode('utf-8') + b':' + self.liste(mots, statut)
+        corps += (b',' + suite[1:]) if autres else b'}'
+        return Response(corps, mimetype='application/json')
+
+    def oublier(self, ids):
+        for mot_id in ids:
+            self._fragments.pop((True, mot_id), None)
+            self._fragments.pop((False, mot_id), None)
+
+
+KABYE = Serialiseur(
+    MotKabye,
+    champs=('id', 'mot_kabye', 'variantes_orthographiques', 'api', 'traduction_francaise',
+            'sens_multiple', 'synonymes', 'categorie_grammaticale', 'sous_categorie', 'origine_mot',
+            'exemple_usage', 'traduction_exemple', 'expressions_associees', 'notes_usage', 'image_url'),
+    champs_validation=('statut_validation', 'notes_validation', 'verifie_par', 'date_validation', 'version'),
+)
+
+FRANCAIS = Serialiseur(
+    MotFrancais,
+    champs=('id', 'mot_francais', 'variantes_orthographiques', 'traduction_kabye', 'sens_multiple',
+            'synonymes', 'antonymes', 'categorie_grammaticale', 'sous_categorie', 'exemple_usage',
+            'traduction_exemple', 'expressions_associees', 'notes_usage', 'image_url'),
+    champs_validation=('statut_validation', 'notes_validation', 'verifie_par', 'date_validation', 'version'),
+)
+
+SERIALISEURS = {serialiseur.modele.__tablename__: serialiseur for serialiseur in (KABYE, FRANCAIS)}
+
+
+def reponse_conflit(session, modele, mot_id):
+    """409 après un conflit de version : annuler la transaction et renvoyer la ligne courante"""
+    session.rollback()
+    # Fiche relue comme celles de l'instantané : même forme que les réponses de l'API
+    fiches = charger_fiches(modele, session.connection(), [mot_id])
+    mot = fiches[0] if fiches else None
+    if mot is None:
+        return jsonify({'success': False, 'conflit': True, 'error': 'Ce mot a été supprimé entre-temps'}), 409
+    return jsonify({
+        'success': False,
+        'conflit': True,
+        'error': f'Ce mot a été modifié entre-temps (par {mot.verifie_par or "un autre utilisateur"}, '
+                 f'le {_date(mot.date_modification)}) : rechargez-le avant d\'enregistrer',
+        'version': mot.version,
+        'mot': SERIALISEURS[modele.__tablename__].en_dict(mot),
+    }), 409
+
+
+@abonner_modifications
+def _oublier_fragments(tables):
+    for table, ids in tables.items():
+        serialiseur = SERIALISEURS.get(table)
+        if serialiseur is not None:
+            serialiseur.oublier(ids)
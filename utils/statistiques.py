@@ -0,0 +1,167 @@
+# utils/statistiques.py
+
+from sqlalchemy import select, insert, delete, update, func, literal, case
+
+from database import get_engine, a_table, a_colonnes, RevisionDictionnaire, StatistiqueContribution, MotKabye
+from utils.collation import lettre_initiale
+
+# Compteurs de la page de validation, par valeur de statut_validation (NULL : en attente)
+COMPTEURS_STATUT = {'valide': 'valides', 'en_attente': 'en_attente', 'a_reviser': 'a_reviser', 'rejete': 'rejetes'}
+
+
+def _agregats(connection, modele):
+    """SELECT contributeur, mois, catégorie, nombre, dernier ajout ... GROUP BY sur la table de mots"""
+    if connection.dialect.name == 'postgresql':
+        mois = func.to_char(modele.date_ajout, 'YYYY-MM')
+    else:
+        mois = func.strftime('%Y-%m', modele.date_ajout)
+    return (
+        select(literal(modele.__tablename__), modele.verifie_par, mois, modele.categorie_grammaticale,
+               func.count(), func.max(modele.date_ajout))
+        .group_by(modele.verifie_par, mois, modele.categorie_grammaticale)
+    )
+
+
+def rafraichir_statistiques(connection, modele, revision=None):
+    """Recalculer l'agrégat de la table en une requête (INSERT ... SELECT ... GROUP BY)"""
+    table = modele.__tablename__
+    stats = StatistiqueContribution.__table__
+    connection.execute(delete(stats).where(stats.c.nom_table == table))
+    connection.execute(insert(stats).from_select(
+        ['nom_table', 'contributeur', 'mois', 'categorie', 'nombre', 'derniere_activite'],
+        _agregats(connection, modele)
+    ))
+    if revision is not None:
+        revisions = RevisionDictionnaire.__table__
+        connection.execute(update(revisions).where(revisions.c.nom_table == table)
+                           .values(revision_statistiques=revision))
+
+
+def _lignes_agregees(connection, modele):
+    """Lignes (contributeur, mois, catégorie, nombre, dernier ajout), recalculées si la table a changé"""
+    table = modele.__tablename__
+    if not a_table(StatistiqueContribution.__tablename__):
+        # Ancien schéma : même agrégat, calculé à chaque appel
+        return [tuple(ligne)[1:] for ligne in connection.execute(_agregats(connection, modele))]
+
+    revisions = RevisionDictionnaire.__table__
+    requete = select(revisions.c.revision, revisions.c.revision_statistiques).where(revisions.c.nom_table == table)
+    if connection.dialect.name == 'postgresql':
+        # Un seul worker recalcule ; les écritures attendent la fin du recalcul
+        requete = requete.with_for_update()
+    etat = connection.execute(requete).one_or_none()
+    if etat is not None and etat.revision != etat.revision_statistiques:
+        rafraichir_statistiques(connection, modele, etat.revision)
+
+    stats = StatistiqueContribution.__table__
+    return connection.execute(
+        select(stats.c.contributeur, stats.c.mois, stats.c.categorie, stats.c.nombre, stats.c.derniere_activite)
+        .where(stats.c.nom_table == table)
+    ).all()
+
+
+def lire_statistiques(modele):
+    """Statistiques des contributions, en O(contributeurs × mois × catégories)"""
+    with get_engine().begin() as connection:
+        lignes = _lignes_agregees(connection, modele)
+    return calculer_statistiques(lignes)
+
+
+def calculer_statistiques(lignes):
+    """Mettre en forme l'agrégat pour la page de statistiques (par personne et globales)"""
+    stats_par_personne = {}
+    total_mots = 0
+
+    for contributeur, mois, categorie, nombre, derniere in lignes:
+        verifie_par = contributeur or 'Non spécifié'
+        personne = stats_par_personne.setdefault(verifie_par, {
+            'total_mots': 0,
+            'mots_par_mois': {},
+            'derniere_activite': None,
+            'categories': {},
+            'evolution_temporelle': []
+        })
+        personne['total_mots'] += nombre
+        total_mots += nombre
+
+        categorie = categorie or 'Non spécifiée'
+        personne['categories'][categorie] = personne['categories'].get(categorie, 0) + nombre
+
+        if mois:
+            personne['mots_par_mois'][mois] = personne['mots_par_mois'].get(mois, 0) + nombre
+        if derniere and (personne['derniere_activite'] is None or derniere > personne['derniere_activite']):
+            personne['derniere_activite'] = derniere
+
+    # Évolution cumulée, mois par mois
+    for data in stats_par_personne.values():
+        evolution = []
+        cumul = 0
+        for mois in sorted(data['mots_par_mois']):
+            cumul += data['mots_par_mois'][mois]
+            evolution.append({
+                'mois': mois,
+                'nouveaux_mots': data['mots_par_mois'][mois],
+                'total_cumule': cumul
+            })
+        data['evolution_temporelle'] = evolution
+        derniere = data['derniere_activite']
+        data['derniere_activite'] = derniere.strftime("%Y-%m-%d %H:%M:%S") if derniere else ''
+
+    stats_globales = {
+        'total_mots': total_mots,
+        'nombre_contributeurs': len(stats_par_personne),
+        'moyenne_mots_par_contributeur': total_mots / len(stats_par_personne) if stats_par_personne else 0,
+        'contributeurs_actifs': len([p for p, d in stats_par_personne.items() if d['total_mots'] >= 5])
+    }
+
+    return {
+        'par_personne': stats_par_personne,
+        'globales': stats_globales
+    }
+
+
+
+def _compteurs_vides():
+    return {'total': 0, **{compteur: 0 for compteur in COMPTEURS_STATUT.values()}}
+
+
+def compteurs_validation(modele):
+    """Compteurs par statut, au total, par lettre initiale et par contributeur, en un seul GROUP BY"""
+    if a_colonnes(modele.__tablename__, 'statut_validation'):
+        statut = func.coalesce(modele.statut_validation, 'en_attente')
+    else:
+        # Ancien schéma : un mot vérifié par quelqu'un compte comme validé
+        statut = case((modele.verifie_par.isnot(None), 'valide'), else_='en_attente')
+    initiale = func.substr(modele.cle_tri, 1, 1)
+    requete = (
+        select(statut, modele.verifie_par, initiale, func.count())
+        .group_by(statut, modele.verifie_par, initiale)
+    )
+    with get_engine().connect() as connection:
+        lignes = connection.execute(requete).all()
+
+    globaux = _compteurs_vides()
+    par_lettre = {}
+    par_contributeur = {}
+    for valeur, contributeur, cle, nombre in lignes:
+        # La clé de tri kabiyè code la lettre sur un caractère (kp compris) ;
+        # la clé française commence par la lettre elle-même
+        if modele is MotKabye:
+            lettre = lettre_initiale(cle)
+        else:
+            lettre = cle if cle and cle.isalpha() else ''
+        compteur = COMPTEURS_STATUT.get(valeur)
+        for compteurs in (globaux,
+                          par_lettre.setdefault(lettre or 'autre', _compteurs_vides()),
+                          par_contributeur.setdefault(contributeur or 'Non spécifié', _compteurs_vides())):
+            compteurs['total'] += nombre
+            if compteur:
+                compteurs[compteur] += nombre
+
+    total = globaux['total']
+    return {
+        **globaux,
+        'pourcentage_valide': (globaux['valides'] / total * 100) if total > 0 else 0,
+        'par_lettre': par_lettre,
+        'par_contributeur': par_contributeur,
+    }
@@ -0,0 +1,218 @@
+# utils/trigrammes.py
+
+import heapq
+import threading
+from array import array
+from collections import Counter
+
+from sqlalchemy import select, text
+
+from database import get_engine, abonner_modifications, revision_dictionnaire, ids_modifies_depuis
+from utils.normalisation import squelette
+
+SEUIL_DEFAUT = 0.3
+
+# Part d'entrées remplacées (unités mortes dans les postings) au-delà de
+# laquelle l'index est reconstruit en arrière-plan
+FRAGMENTATION_MAX = 0.25
+
+
+def trigrammes(texte):
+    """Trigrammes d'un texte déjà squelettisé, à la manière de pg_trgm"""
+    resultat = set()
+    for mot in texte.split():
+        mot = f'  {mot} '
+        for i in range(len(mot) - 2):
+            resultat.add(mot[i:i + 3])
+    return resultat
+
+
+class IndexTrigrammes:
+    """Listes de postings trigramme -> unités (vedette ou glose d'une entrée).
+
+    Une entrée modifiée est ajoutée à la fin et son ancienne position
+    oubliée (None) : les unités mortes restent dans les postings et sont
+    ignorées par la recherche jusqu'à la prochaine reconstruction.
+    """
+
+    __slots__ = ('entrees', 'positions', 'retirees', 'unite_entree', 'taille_unite', 'postings')
+
+    def __init__(self, lignes):
+        # lignes : (id, mot, traduction, cle_squelette, glose_squelette)
+        self.entrees = []
+        self.positions = {}  # id -> position dans entrees
+        self.retirees = 0
+        self.unite_entree = array('I')
+        self.taille_unite = array('H')
+        self.postings = {}
+        for ligne in lignes:
+            self._indexer(ligne)
+
+    def _indexer(self, ligne):
+        position = len(self.entrees)
+        self.entrees.append((ligne[0], ligne[1], ligne[2]))
+        self.positions[ligne[0]] = position
+        for texte in (ligne[3], ligne[4]):
+            grammes = trigrammes(texte or '')
+            if not grammes:
+                continue
+            unite = len(self.unite_entree)
+            self.unite_entree.append(position)
+            self.taille_unite.append(min(len(grammes), 0xFFFF))
+            for gramme in grammes:
+                self.postings.setdefault(gramme, array('I')).append(unite)
+
+    def retirer(self, mot_id):
+        position = self.positions.pop(mot_id, None)
+        if position is not None:
+            self.entrees[position] = None
+            self.retirees += 1
+
+    def ajouter(self, ligne):
+        self.retirer(ligne[0])
+        self._indexer(ligne)
+
+    def fragmente(self):
+        return self.retirees > FRAGMENTATION_MAX * len(self.positions)
+
+    def rechercher(self, requete, k=10, seuil=SEUIL_DEFAUT):
+        """Les k entrées les plus proches, similarité = |A∩B| / |A∪B| (comme pg_trgm)"""
+        grammes = trigrammes(squelette(requete))
+        if not grammes:
+            return []
+        communs = Counter()
+        for gramme in grammes:
+            liste = self.postings.get(gramme)
+            if liste is not None:
+                communs.update(liste)
+
+        taille_requete = len(grammes)
+        # similarité <= communs / taille_requete : on écarte d'abord les unités trop lointaines
+        minimum = seuil * taille_requete
+        meilleures = {}
+        for unite, nombre in communs.items():
+            if nombre < minimum:
+                continue
+            similarite = nombre / (taille_requete + self.taille_unite[unite] - nombre)
+            if similarite >= seuil:
+                position = self.unite_entree[unite]
+                if self.entrees[position] is None:
+                    continue
+                if similarite > meilleures.get(position, 0):
+                    meilleures[position] = similarite
+
+        resultats = []
+        for position, similarite in heapq.nlargest(k, meilleures.items(), key=lambda item: item[1]):
+            mot_id, mot, traduction = self.entrees[position]
+            resultats.append({
+                'id': mot_id,
+                'mot': mot,
+                'traduction': traduction,
+                'similarite': round(similarite, 4),
+            })
+        return resultats
+
+
+# Un index par table, (révision, index). Les ids modifiés par les commits du
+# processus sont réappliqués à la requête suivante ; les écritures d'un autre
+# worker sont rattrapées par le journal. Une reconstruction complète (journal
+# purgé, index trop fragmenté) se fait en arrière-plan, l'ancien index
+# continuant de servir jusqu'à ce que le nouveau soit prêt.
+_index = {}
+_en_attente = {}
+_reconstructions = set()
+_verrou = threading.Lock()
+
+
+@abonner_modifications
+def _noter_modifications(tables):
+    with _verrou:
+        for table, ids in tables.items():
+            if table in _index:
+                modifies, commits = _en_attente.get(table, (set(), 0))
+                _en_attente[table] = (modifies | ids, commits + 1)
+
+
+def _lignes(modele, ids=None):
+    requete = select(
+        modele.id,
+        getattr(modele, modele.CHAMP_MOT),
+        getattr(modele, modele.CHAMP_GLOSE),
+        modele.cle_squelette,
+        modele.glose_squelette,
+    )
+    if ids is not None:
+        requete = requete.where(modele.id.in_(ids))
+    return requete
+
+
+def _reconstruire(modele):
+    table = modele.__tablename__
+    try:
+        # Révision lue avant les lignes : au pire des ids déjà indexés sont réappliqués
+        revision = revision_dictionnaire(table)
+        with get_engine().connect() as connection:
+            index = IndexTrigrammes(connection.execute(_lignes(modele)))
+        with _verrou:
+            _index[table] = (revision, index)
+    except Exception as e:
+        print(f"Erreur dans reconstruire_trigrammes: {e}")
+    finally:
+        with _verrou:
+            _reconstructions.discard(table)
+
+
+def _reconstruire_en_arriere_plan(modele):
+    table = modele.__tablename__
+    if table not in _reconstructions:
+        _reconstructions.add(table)
+        threading.Thread(target=_reconstruire, args=(modele,), daemon=True).start()
+
+
+def index_trigrammes(session, modele):
+    table = modele.__tablename__
+    revision = revision_dictionnaire(table)
+    with _verrou:
+        entree = _index.get(table)
+        if entree is None:
+            # Première construction : rien d'autre à servir en attendant
+            index = IndexTrigrammes(session.execute(_lignes(modele)))
+            _index[table] = (revision, index)
+            return index
+
+        revision_index, index = entree
+        ids, commits = _en_attente.pop(table, (set(), 0))
+        if None not in (revision, revision_index) and revision != revision_index + commits:
+            autres = ids_modifies_depuis(session, table, revision_index)
+            if autres is None:
+                _reconstruire_en_arriere_plan(modele)
+            else:
+                ids = ids | autres
+        if ids:
+            for mot_id in ids:
+                index.retirer(mot_id)
+            for ligne in session.execute(_lignes(modele, ids)):
+                index.ajouter(tuple(ligne))
+        if index.fragmente():
+            _reconstruire_en_arriere_plan(modele)
+        _index[table] = (revision, index)
+    return index
+
+
+def recherche_floue(session, modele, requete, k=10, seuil=SEUIL_DEFAUT):
+    """Entrées dont la vedette ou la glose ressemble à la requête, par similarité décroissante"""
+    if session.get_bind().dialect.name == 'postgresql':
+        table = modele.__tablename__
+        session.execute(text("SELECT set_config('pg_trgm.similarity_threshold', :seuil, true)"),
+                        {'seuil': str(seuil)})
+        lignes = session.execute(text(
+            f"SELECT id, {modele.CHAMP_MOT}, {modele.CHAMP_GLOSE}, "
+            f"GREATEST(similarity(cle_squelette, :q), similarity(glose_squelette, :q)) AS similarite "
+            f"FROM {table} WHERE cle_squelette % :q OR glose_squelette % :q "
+            f"ORDER BY similarite DESC, id LIMIT :k"
+        ), {'q': squelette(requete), 'k': k})
+        return [
+            {'id': ligne[0], 'mot': ligne[1], 'traduction': ligne[2], 'similarite': round(float(ligne[3]), 4)}
+            for ligne in lignes
+        ]
+    return index_trigrammes(session, modele).rechercher(requete, k, seuil)
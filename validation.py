@@ -1,47 +1,22 @@
 
 
 from flask import Blueprint, redirect, render_template, jsonify, request, url_for
-from database import get_session, MotKabye
+from database import get_session, verifier_version, ConflitVersion, MotKabye
+from sqlalchemy.orm.exc import StaleDataError
+from utils.cache_http import conditionnel
+from utils.instantane import instantane
+from utils.lots import repondre_lot
+from utils.serialisation import reponse_conflit
+from utils.file_validation import FILE_KABYE, validateur_demande
+from utils.baux import (baux_disponibles, titulaire, liberer, validateur_bail, repondre_reservation,
+                        repondre_prolongation, repondre_liberation, repondre_baux_actifs)
+from utils.operations import repondre_operation
+from utils.statistiques import compteurs_validation
 from datetime import datetime
 import json
 
 validation_bp = Blueprint('validation', __name__)
 
-def json_to_list(data):
-    """Convertir les données JSON stockées en liste"""
-    if not data:
-        return []
-    try:
-        if isinstance(data, list):
-            return data
-        return json.loads(data)
-    except json.JSONDecodeError:
-        if isinstance(data, str):
-            if ';' in data:
-                return [item.strip() for item in data.split(';') if item.strip()]
-            return [data.strip()] if data.strip() else []
-        return []
-
-def colonnes_existantes(db_session):
-    """Vérifier si les colonnes de validation existent dans la table"""
-    try:
-        # Tester plusieurs colonnes pour être sûr
-        test = db_session.query(
-            MotKabye.id,
-            MotKabye.statut_validation,
-            MotKabye.notes_validation,
-            MotKabye.date_validation
-        ).limit(1).first()
-        return True
-    except Exception as e:
-        error_str = str(e).lower()
-        if 'no such column' in error_str or 'has no attribute' in error_str or 'unrecognized column' in error_str:
-            print(f"Colonnes de validation non trouvées: {e}")
-            return False
-        # Pour d'autres erreurs (connexion, etc.), on relève
-        raise e
-
-
 # Définir la liste des validateurs autorisés
 VALIDATEURS_AUTORISES = {
     'Benjamin': {'role': 'expert', 'nom_complet': 'Benjamin Officiel'},
@@ -91,301 +66,134 @@ def logout():
     return redirect(url_for('validation.login_page'))
 
 @validation_bp.route('/api/mots-a-valider')
+@conditionnel(MotKabye, prive=True)
 def mots_a_valider():
-    """Récupérer les mots à valider avec filtres"""
-    # Récupérer les paramètres
-    validateur = request.args.get('validateur', '')
-    statut_filter = request.args.get('statut', 'tous')
-    search_filter = request.args.get('search', '')
-    lettre_filter = request.args.get('lettre', '')  
-    contributeur_filter = request.args.get('contributeur', '') 
-    
-    # Si pas dans les paramètres, essayer de le déduire de l'URL de référence
-    if not validateur:
-        referrer = request.headers.get('Referer', '')
-        if referrer:
-            from urllib.parse import urlparse, parse_qs
-            parsed = urlparse(referrer)
-            params = parse_qs(parsed.query)
-            validateur = params.get('validateur', [''])[0]
-    
-    # Vérifier l'accès
+    """Page de la file de validation (?statut, ?lettre, ?contributeur, ?search, ?limite, ?curseur)"""
+    if not is_validateur_autorise(validateur_demande()):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    return FILE_KABYE.reponse_page()
+
+
+@validation_bp.route('/api/mots-a-valider/total')
+@conditionnel(MotKabye, prive=True)
+def total_a_valider():
+    """Nombre de mots de la file pour les mêmes filtres, demandé une fois par sélection"""
+    if not is_validateur_autorise(validateur_demande()):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    return FILE_KABYE.reponse_total()
+
+
+@validation_bp.route('/api/baux')
+def baux_en_cours():
+    """Mots réservés en ce moment, et par qui"""
+    if not is_validateur_autorise(validateur_demande()):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    return repondre_baux_actifs(MotKabye)
+
+
+@validation_bp.route('/api/baux/reserver', methods=['POST'])
+def reserver_mots():
+    """Réserver un lot de mots en attente ({"validateur", "nombre"}, filtres de la file en paramètres)"""
+    validateur = validateur_bail()
     if not is_validateur_autorise(validateur):
         return jsonify({'error': 'Accès non autorisé'}), 403
-    
-    db_session = get_session()
-    
-    try:
-        # Liste des lettres spéciales autorisées
-        lettres_speciales = ['a', 'b', 'c', 'd', 'ɖ', 'e', 'ɛ', 'f', 'g', 'ɣ', 'h', 'i', 'ɩ', 'j', 'k', 'l', 'm', 'n', 
-                           'ñ', 'ŋ', 'o', 'ɔ', 'p', 's', 't', 'u', 'ʋ', 'v', 'w', 'y', 'z' ]
-        
-        # Fonction de tri personnalisée
-        def custom_sort_key(mot):
-            """
-            Crée une clé de tri selon l'ordre alphabétique spécifié.
-            Ignore la casse (majuscule/minuscule).
-            """
-            mot_kabye = mot.get('mot_kabye', '')
-            if not mot_kabye:
-                return ''
-            
-            mot_lower = mot_kabye.lower()
-            
-            # Créer une clé de tri
-            sort_key = []
-            
-            i = 0
-            while i < len(mot_lower):
-                # Vérifier les digrammes d'abord (comme 'kp')
-                if i + 1 < len(mot_lower) and mot_lower[i:i+2] == 'kp':
-                    # Attribuer une valeur spéciale pour 'kp' (après 'k')
-                    sort_key.append('k' + chr(1))  # k suivi d'un caractère spécial
-                    i += 2
-                else:
-                    char = mot_lower[i]
-                    # Trouver l'index dans la liste des lettres spéciales
-                    if char in lettres_speciales:
-                        # Utiliser l'index de la liste comme valeur de tri
-                        # Format: index sur 2 chiffres + le caractère lui-même
-                        index = lettres_speciales.index(char)
-                        sort_key.append(f"{index:02d}{char}")
-                    else:
-                        # Pour les caractères non dans la liste, les mettre à la fin
-                        sort_key.append(f"99{char}")
-                    i += 1
-            
-            # Retourner la clé de tri comme une chaîne
-            return ''.join(sort_key)
-        
-        # Fonction pour trier une liste de mots
-        def sort_mots_list(mots_list):
-            return sorted(mots_list, key=custom_sort_key)
-        
-        # Vérifier si les colonnes de validation existent
-        if not colonnes_existantes(db_session):
-            # Mode ancienne base de données (sans colonnes de validation)
-            query = db_session.query(MotKabye)
-            
-            # Appliquer le filtre par lettre initiale
-            if lettre_filter and lettre_filter in lettres_speciales:
-                # Pour 'kp' qui a deux caractères
-                if lettre_filter == 'kp':
-                    query = query.filter(
-                        (MotKabye.mot_kabye.ilike('kp%')) |
-                        (MotKabye.mot_kabye.ilike('Kp%')) |
-                        (MotKabye.mot_kabye.ilike('KP%'))
-                    )
-                else:
-                    query = query.filter(
-                        (MotKabye.mot_kabye.ilike(f'{lettre_filter}%')) |
-                        (MotKabye.mot_kabye.ilike(f'{lettre_filter.upper()}%'))
-                    )
-            
-            # Appliquer la recherche textuelle
-            if search_filter:
-                search = f"%{search_filter}%"
-                query = query.filter(
-                    (MotKabye.mot_kabye.ilike(search)) |
-                    (MotKabye.traduction_francaise.ilike(search)) |
-                    (MotKabye.exemple_usage.ilike(search))
-                )
-            
-            # Appliquer le filtre de statut simplifié
-            if statut_filter == 'valide':
-                query = query.filter(MotKabye.verifie_par != None)
-            elif statut_filter == 'en_attente':
-                query = query.filter(MotKabye.verifie_par == None)
-            # Pour 'tous', 'a_reviser', 'rejete' - pas de filtre car non supportés
-            
-            mots = query.all()  # Ne pas trier ici
-            
-            result = []
-            for mot in mots:
-                statut = 'valide' if mot.verifie_par else 'en_attente'
-                
-                # Si on filtre par 'a_reviser' ou 'rejete' et qu'on est dans l'ancien schéma,
-                # ces statuts n'existent pas, donc on peut retourner une liste vide
-                if statut_filter in ['a_reviser', 'rejete'] and statut != statut_filter:
-                    continue
-                
-                result.append({
-                    'id': mot.id,
-                    'mot_kabye': mot.mot_kabye,
-                    'api': mot.api or '',
-                    'traduction_francaise': mot.traduction_francaise,
-                    'sens_multiple': json_to_list(mot.sens_multiple),
-                    'exemple_usage': mot.exemple_usage or '',
-                    'traduction_exemple': mot.traduction_exemple or '',
-                    'categorie_grammaticale': mot.categorie_grammaticale or '',
-                    'statut_validation': statut,
-                    'notes_validation': '',
-                    'verifie_par': mot.verifie_par or '',
-                    'date_validation': mot.date_modification.strftime("%Y-%m-%d") if mot.date_modification else ''
+    return repondre_reservation(FILE_KABYE, validateur)
+
+
+@validation_bp.route('/api/baux/prolonger', methods=['POST'])
+def prolonger_baux():
+    """Prolonger les réservations du validateur (appelé régulièrement par la page ouverte)"""
+    validateur = validateur_bail()
+    if not is_validateur_autorise(validateur):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    return repondre_prolongation(MotKabye, validateur)
+
+
+@validation_bp.route('/api/baux/liberer', methods=['POST'])
+def liberer_baux():
+    """Rendre les mots réservés ({"ids": [...]}, tous par défaut) ; appelé aussi à la fermeture de la page"""
+    validateur = validateur_bail()
+    if not is_validateur_autorise(validateur):
+        return jsonify({'error': 'Accès non autorisé'}), 403
+    return repondre_liberation(MotKabye, validateur)
+
+
+
+def formater_expressions(expressions):
+    """Expressions associées en dicts {expression, traduction} (« expression: traduction » pour le texte)"""
+    expressions_formatees = []
+    for expr in expressions:
+        if isinstance(expr, dict):
+            expressions_formatees.append(expr)
+        elif isinstance(expr, str):
+            # Essayer de parser "expression: traduction"
+            if ':' in expr:
+                parts = expr.split(':', 1)
+                expressions_formatees.append({
+                    'expression': parts[0].strip(),
+                    'traduction': parts[1].strip() if len(parts) > 1 else ''
                 })
-            
-            # Trier avec notre fonction personnalisée
-            result = sort_mots_list(result)
-            return jsonify(result)
-        
-        # Mode nouvelle base de données (avec colonnes de validation)
-        query = db_session.query(MotKabye)
-        
-        # Appliquer le filtre par lettre initiale
-        if lettre_filter and lettre_filter in lettres_speciales:
-            # Pour 'kp' qui a deux caractères
-            if lettre_filter == 'kp':
-                query = query.filter(
-                    (MotKabye.mot_kabye.ilike('kp%')) |
-                    (MotKabye.mot_kabye.ilike('Kp%')) |
-                    (MotKabye.mot_kabye.ilike('KP%'))
-                )
             else:
-                query = query.filter(
-                    (MotKabye.mot_kabye.ilike(f'{lettre_filter}%')) |
-                    (MotKabye.mot_kabye.ilike(f'{lettre_filter.upper()}%'))
-                )
-        
-        # Appliquer les filtres de statut
-        if statut_filter != 'tous':
-            if statut_filter == 'en_attente':
-                query = query.filter(
-                    (MotKabye.statut_validation == 'en_attente') | 
-                    (MotKabye.statut_validation == None) |
-                    (MotKabye.statut_validation == '')
-                )
-            elif statut_filter == 'valide':
-                query = query.filter(MotKabye.statut_validation == 'valide')
-            elif statut_filter == 'a_reviser':
-                query = query.filter(MotKabye.statut_validation == 'a_reviser')
-            elif statut_filter == 'rejete':
-                query = query.filter(MotKabye.statut_validation == 'rejete')
-        
-        # Appliquer le filtre par contributeur
-        if contributeur_filter and contributeur_filter != 'tous':
-            # Utilisez 'creer_par' comme nom de colonne (à adapter selon votre modèle)
-            query = query.filter(MotKabye.verifie_par == contributeur_filter)
-        
-        
-        # Appliquer la recherche
-        if search_filter:
-            search = f"%{search_filter}%"
-            query = query.filter(
-                (MotKabye.mot_kabye.ilike(search)) |
-                (MotKabye.traduction_francaise.ilike(search)) |
-                (MotKabye.exemple_usage.ilike(search)) |
-                (MotKabye.api.ilike(search))
-            )
-        
-        # Pour le filtre 'tous', on montre tous les mots
-        # (pas de filtre supplémentaire)
-        
-        mots = query.all()  # Ne pas trier ici avec .order_by()
-        
-        result = []
-        for mot in mots:
-            result.append({
-                'id': mot.id,
-                'mot_kabye': mot.mot_kabye,
-                'api': mot.api or '',
-                'traduction_francaise': mot.traduction_francaise,
-                'sens_multiple': json_to_list(mot.sens_multiple),
-                'exemple_usage': mot.exemple_usage or '',
-                'traduction_exemple': mot.traduction_exemple or '',
-                'categorie_grammaticale': mot.categorie_grammaticale or '',
-                'statut_validation': mot.statut_validation or 'en_attente',
-                'notes_validation': mot.notes_validation or '',
-                'verifie_par': mot.verifie_par or '',
-                'date_validation': mot.date_validation.strftime("%Y-%m-%d") if mot.date_validation else ''
-            })
-        
-        # Trier avec notre fonction personnalisée
-        result = sort_mots_list(result)
-        return jsonify(result)
-        
-    except Exception as e:
-        print(f"Erreur dans mots_a_valider: {e}")
-        return jsonify({'error': str(e), 'details': 'Erreur serveur lors du filtrage'}), 500
-    finally:
-        db_session.close()
+                expressions_formatees.append({
+                    'expression': expr.strip(),
+                    'traduction': ''
+                })
+    return expressions_formatees
+
 
+def detail_validation(mot):
+    """Détails complets d'une fiche de l'instantané, pour l'écran de validation"""
+    # Les champs listes de l'instantané sont déjà décodés
+    def formater_champ_json(valeur):
+        return valeur if isinstance(valeur, list) else []
+
+    return {
+        'id': mot.id,
+        'mot_kabye': mot.mot_kabye or '',
+        'variantes_orthographiques': formater_champ_json(mot.variantes_orthographiques),
+        'api': mot.api or '',
+        'traduction_francaise': mot.traduction_francaise or '',
+        'sens_multiple': formater_champ_json(mot.sens_multiple),
+        'synonymes': formater_champ_json(mot.synonymes),
+        'categorie_grammaticale': mot.categorie_grammaticale or '',
+        'sous_categorie': mot.sous_categorie or '',
+        'origine_mot': mot.origine_mot or '',
+        'exemple_usage': mot.exemple_usage or '',
+        'traduction_exemple': mot.traduction_exemple or '',
+        'expressions_associees': formater_expressions(formater_champ_json(mot.expressions_associees)),
+        'notes_usage': mot.notes_usage or '',
+        'image_url': mot.image_url or '',
+        'statut_validation': mot.statut_validation or 'en_attente',
+        'notes_validation': mot.notes_validation or '',
+        'verifie_par': mot.verifie_par or '',
+        'date_validation': mot.date_validation.strftime("%Y-%m-%d") if mot.date_validation else '',
+        'version': mot.version
+    }
 
 
 @validation_bp.route('/api/mot/<int:mot_id>')
+@conditionnel(MotKabye, prive=True)
 def get_mot_detail(mot_id):
     """Récupérer les détails complets d'un mot avec formatage JSON"""
-    db_session = get_session()
     try:
-        mot = db_session.query(MotKabye).filter(MotKabye.id == mot_id).first()
+        mot = instantane(MotKabye).mot(mot_id)
         if mot:
-            # Fonction pour formater les champs JSON
-            def formater_champ_json(data, champ_name):
-                valeur = getattr(mot, champ_name, '')
-                if not valeur:
-                    return []
-                try:
-                    if isinstance(valeur, str):
-                        return json.loads(valeur)
-                    elif isinstance(valeur, list):
-                        return valeur
-                    else:
-                        return []
-                except json.JSONDecodeError:
-                    # Si ce n'est pas du JSON valide, traiter comme texte simple
-                    if ';' in valeur:
-                        return [item.strip() for item in valeur.split(';') if item.strip()]
-                    return [valeur.strip()] if valeur.strip() else []
-            
-            # Formater les expressions associées
-            expressions = formater_champ_json(mot.expressions_associees, 'expressions_associees')
-            # Si expressions est une liste de strings, convertir en liste de dicts
-            expressions_formatees = []
-            for expr in expressions:
-                if isinstance(expr, dict):
-                    expressions_formatees.append(expr)
-                elif isinstance(expr, str):
-                    # Essayer de parser "expression: traduction"
-                    if ':' in expr:
-                        parts = expr.split(':', 1)
-                        expressions_formatees.append({
-                            'expression': parts[0].strip(),
-                            'traduction': parts[1].strip() if len(parts) > 1 else ''
-                        })
-                    else:
-                        expressions_formatees.append({
-                            'expression': expr.strip(),
-                            'traduction': ''
-                        })
-            
-            result = {
-                'id': mot.id,
-                'mot_kabye': mot.mot_kabye or '',
-                'variantes_orthographiques': formater_champ_json(mot.variantes_orthographiques, 'variantes_orthographiques'),
-                'api': mot.api or '',
-                'traduction_francaise': mot.traduction_francaise or '',
-                'sens_multiple': formater_champ_json(mot.sens_multiple, 'sens_multiple'),
-                'synonymes': formater_champ_json(mot.synonymes, 'synonymes'),
-                'categorie_grammaticale': mot.categorie_grammaticale or '',
-                'sous_categorie': mot.sous_categorie or '',
-                'origine_mot': mot.origine_mot or '',
-                'exemple_usage': mot.exemple_usage or '',
-                'traduction_exemple': mot.traduction_exemple or '',
-                'expressions_associees': expressions_formatees,
-                'notes_usage': mot.notes_usage or '',
-                'image_url': mot.image_url or '',
-                'statut_validation': mot.statut_validation or 'en_attente',
-                'notes_validation': mot.notes_validation or '',
-                'verifie_par': mot.verifie_par or '',
-                'date_validation': mot.date_validation.strftime("%Y-%m-%d") if mot.date_validation else ''
-            }
-            return jsonify(result)
+            return jsonify(detail_validation(mot))
         else:
             return jsonify({'error': 'Mot non trouvé'}), 404
     except Exception as e:
         print(f"Erreur dans get_mot_detail: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        db_session.close()
+
+
+@validation_bp.route('/api/mots/batch', methods=['POST'])
+def get_mots_detail():
+    """Détails de plusieurs mots en une requête (préchargement de la file)"""
+    try:
+        return repondre_lot(MotKabye, detail_validation)
+    except Exception as e:
+        print(f"Erreur dans get_mots_detail: {e}")
+        return jsonify({'error': str(e)}), 500
 
 
 @validation_bp.route('/api/valider/<int:mot_id>', methods=['POST'])
@@ -405,6 +213,16 @@ def valider_mot(mot_id):
         if not mot:
             return jsonify({'success': False, 'error': 'Mot non trouvé'}), 404
         
+        # Un mot réservé par un autre validateur lui reste acquis jusqu'à la fin du bail
+        if baux_disponibles():
+            reserve_par = titulaire(db_session, MotKabye, mot_id)
+            if reserve_par and reserve_par != validateur:
+                return jsonify({'success': False, 'error': f'Mot réservé par {reserve_par}',
+                                'reserve_par': reserve_par}), 409
+            liberer(db_session, MotKabye, validateur, [mot_id])
+        
+        verifier_version(mot, data.get('version'))
+        
         # Mettre à jour les champs de validation
         mot.verifie_par = validateur
         mot.date_modification = datetime.now()
@@ -451,9 +269,12 @@ def valider_mot(mot_id):
             'success': True,
             'message': f'Mot "{mot.mot_kabye}" mis à jour avec succès',
             'statut': data.get('statut', 'valide'),
-            'date_validation': mot.date_validation.strftime("%Y-%m-%d") if mot.date_validation else None
+            'date_validation': mot.date_validation.strftime("%Y-%m-%d") if mot.date_validation else None,
+            'version': mot.version
         })
         
+    except (ConflitVersion, StaleDataError):
+        return reponse_conflit(db_session, MotKabye, mot_id)
     except Exception as e:
         db_session.rollback()
         print(f"Erreur dans valider_mot: {e}")
@@ -463,6 +284,7 @@ def valider_mot(mot_id):
 
 
 @validation_bp.route('/api/contributeurs')
+@conditionnel(MotKabye, prive=True)
 def get_contributeurs():
     """Récupérer la liste des contributeurs uniques"""
     db_session = get_session()
@@ -480,37 +302,25 @@ def get_contributeurs():
 
 
 
+@validation_bp.route('/api/mots/operations', methods=['POST'])
+def operations_en_masse():
+    """Changer le statut, la catégorie ou le vérificateur de plusieurs mots, ou les supprimer, en une transaction"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}
+    # La suppression est réservée aux experts
+    role = 'expert' if data.get('operation') == 'supprimer' else None
+    validateur = data.get('validateur', '')
+    if not is_validateur_autorise(validateur, role):
+        return jsonify({'success': False, 'error': 'Accès non autorisé'}), 403
+    return repondre_operation(FILE_KABYE, validateur)
+
 @validation_bp.route('/api/statistiques-validation')
+@conditionnel(MotKabye, prive=True)
 def statistiques_validation():
-    """Statistiques de validation"""
-    db_session = get_session()
+    """Statistiques de validation : compteurs par statut, par lettre initiale et par contributeur"""
     try:
-        total = db_session.query(MotKabye).count()
-        
-        try:
-            valides = db_session.query(MotKabye).filter(MotKabye.statut_validation == 'valide').count()
-            en_attente = db_session.query(MotKabye).filter(
-                (MotKabye.statut_validation == 'en_attente') | 
-                (MotKabye.statut_validation == None)
-            ).count()
-            a_reviser = db_session.query(MotKabye).filter(MotKabye.statut_validation == 'a_reviser').count()
-            rejetes = db_session.query(MotKabye).filter(MotKabye.statut_validation == 'rejete').count()
-        except:
-            valides = db_session.query(MotKabye).filter(MotKabye.verifie_par != None).count()
-            en_attente = db_session.query(MotKabye).filter(MotKabye.verifie_par == None).count()
-            a_reviser = 0
-            rejetes = 0
-        
-        pourcentage_valide = (valides / total * 100) if total > 0 else 0
-        
-        return jsonify({
-            'total': total,
-            'valides': valides,
-            'en_attente': en_attente,
-            'a_reviser': a_reviser,
-            'rejetes': rejetes,
-            'pourcentage_valide': pourcentage_valide
-        })
+        return jsonify(compteurs_validation(MotKabye))
     except Exception as e:
         print(f"Erreur dans statistiques_validation: {e}")
         return jsonify({
@@ -519,7 +329,7 @@ def statistiques_validation():
             'en_attente': 0,
             'a_reviser': 0,
             'rejetes': 0,
-            'pourcentage_valide': 0
-        })
-    finally:
-        db_session.close()
\ No newline at end of file
+            'pourcentage_valide': 0,
+            'par_lettre': {},
+            'par_contributeur': {}
+        })
\ No newline at end of file